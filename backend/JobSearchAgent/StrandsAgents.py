@@ -23,6 +23,7 @@ from bedrock_agentcore.runtime import BedrockAgentCoreApp
 
 from tools import get_student_profile, sanitize_email_for_actor_id, save_job_recommendations, get_job_recommendations, retrieve
 from tools.retrieve import get_top_sources_for_current_request, clear_current_request_sources
+from tools.profile_cache import profile_cache
 
 # SubAgentResult for streaming events from career advice agent
 @dataclass
@@ -583,6 +584,9 @@ async def handle_agent_request(payload):
     # Clear any previous sources from other requests (runtime dies after each query)
     clear_current_request_sources()
 
+    # Memoize profile lookups for this request (cached profiles are revalidated every PROFILE_VERSION_CHECK_SECONDS)
+    profile_cache.begin_request()
+
     try:
         # Initialize the multi-agent orchestrator system with memory support
         orchestrator_system = MultiAgentJobSearchSystem(session_id=session_id, email=email, source=source)
@@ -5,40 +5,98 @@ Contains functions for managing student profiles in DynamoDB.
 """
 
 import os
+import threading
+import time
+import zlib
 import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.config import Config
 from typing import Any, Dict, Optional
 from pydantic import BaseModel, Field
 from strands import tool
 
+from .job_catalog import JOB_CATALOG_TABLE_NAME, REFS_ATTRIBUTE, JobCatalog
+from .identity import sanitize_email_for_actor_id
+from .job_codec import decode_job_information, encode_job_information
+from .profile_cache import profile_cache
+from .retention import EXPIRES_ATTRIBUTE, not_expired_filter
+
 # Environment Variables
 STUDENT_PROFILE_TABLE_NAME = os.getenv('STUDENT_PROFILE_TABLE_NAME')
 JOB_RECOMMENDATIONS_TABLE_NAME = os.getenv('JOB_RECOMMENDATIONS_TABLE_NAME')
 AWS_REGION = os.getenv('AWS_REGION')
 
-def sanitize_email_for_actor_id(email: str) -> str:
+# Unsent recommendations carry pendingShard/pendingKey, which form the sparse
+# PendingRecommendationsIndex GSI the notification sender queries. Spreading items over
+# a few shard values avoids a single hot GSI partition on the daily batch writes.
+PENDING_INDEX_SHARDS = int(os.getenv('PENDING_INDEX_SHARDS', '4'))
+
+# Connection settings for the long-lived AgentCore container: a larger keep-alive
+# connection pool and adaptive client-side retries for throttling
+DYNAMODB_CONFIG = Config(
+    max_pool_connections=int(os.getenv('DYNAMODB_MAX_POOL_CONNECTIONS', '32')),
+    tcp_keepalive=True,
+    connect_timeout=2,
+    read_timeout=5,
+    retries={'max_attempts': int(os.getenv('DYNAMODB_MAX_ATTEMPTS', '5')), 'mode': 'adaptive'},
+)
+
+_session = None
+_session_lock = threading.Lock()
+_thread_local = threading.local()
+
+# GSI on email + createdAt, so a user's newest recommendations across all categories
+# are read with a query instead of a table scan
+EMAIL_INDEX_NAME = os.getenv('EMAIL_INDEX_NAME', 'EmailCreatedAtIndex')
+
+# Recommendations expire (expiresAt, the table's TTL attribute) this many days after
+# they are saved and are then archived to S3 by the recommendation archiver; 0 keeps
+# them forever. Readers skip expired items that TTL has not deleted yet.
+RECOMMENDATION_RETENTION_DAYS = int(os.getenv('RECOMMENDATION_RETENTION_DAYS', '30'))
+
+# Upper bound for the limit argument of get_job_recommendations
+MAX_RECOMMENDATIONS_LIMIT = 100
+
+_job_catalog = None
+_job_catalog_lock = threading.Lock()
+
+def pending_shard_for(email: str) -> str:
+    """Partition key value of the pending index for a user's unsent recommendations"""
+    return f"pending#{zlib.crc32(email.encode('utf-8')) % PENDING_INDEX_SHARDS}"
+
+def get_table(table_name: str):
     """
-    Global sanitization function for email to actor_id conversion.
-
-    This function is used consistently across the entire application:
-    - JobSearchAgent for actor_id creation
-    - DynamoDB functions for database keys
-    - Memory namespaces for AWS Bedrock compatibility
-
-    Args:
-        email: Original email address
+    Shared Table resource for table_name, created on first use.
 
-    Returns:
-        Sanitized email safe for AWS Bedrock Agent Core
+    Tool calls reuse the same resource and its open connections instead of building
+    a new resource per call. boto3 sessions and resources are not thread-safe, so
+    there is one session, resources are created under a lock, and each thread that
+    runs tools gets its own resource and connection pool.
     """
-    if not email:
-        return ""
-
-    # Replace any character not in allowed set with underscore
-    sanitized = ''.join('_' if c not in 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_/*' else c for c in email)
-    # Fix consecutive colons
-    sanitized = sanitized.replace('::', ':_')
-
-    return sanitized
+    tables = getattr(_thread_local, 'tables', None)
+    if tables is None:
+        tables = _thread_local.tables = {}
+    table = tables.get(table_name)
+    if table is None:
+        global _session
+        with _session_lock:
+            if _session is None:
+                _session = boto3.session.Session(region_name=AWS_REGION)
+            resource = getattr(_thread_local, 'resource', None)
+            if resource is None:
+                resource = _thread_local.resource = _session.resource('dynamodb', config=DYNAMODB_CONFIG)
+            table = tables[table_name] = resource.Table(table_name)
+    return table
+
+def get_job_catalog() -> Optional[JobCatalog]:
+    """Shared job catalog (and its posting cache), or None when JOB_CATALOG_TABLE_NAME is not set"""
+    global _job_catalog
+    if not JOB_CATALOG_TABLE_NAME:
+        return None
+    with _job_catalog_lock:
+        if _job_catalog is None:
+            _job_catalog = JobCatalog(get_table(JOB_CATALOG_TABLE_NAME))
+    return _job_catalog
 
 class StudentProfile(BaseModel):
     """Student profile information for storing in DynamoDB."""
@@ -66,17 +124,7 @@ def get_student_profile(email: str) -> Dict[str, Any]:
                 "message": "Email is required"
             }
 
-        # Initialize DynamoDB client
-        dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
-        table = dynamodb.Table(STUDENT_PROFILE_TABLE_NAME)
-
-        # Sanitize email to get the actor_id for database lookup using global function
-        sanitized_actor_id = sanitize_email_for_actor_id(email)
-
-        # Get the student profile directly using the primary key (actionID)
-        response = table.get_item(Key={'actionID': sanitized_actor_id})
-
-        item = response.get('Item')
+        item = load_student_profile(email)
 
         if not item:
             return {
@@ -98,6 +146,33 @@ def get_student_profile(email: str) -> Dict[str, Any]:
             "message": f"Error retrieving student profile: {str(e)}"
         }
 
+def load_student_profile(email: str) -> Optional[Dict[str, Any]]:
+    """
+    Student profile item for email, or None if there is none.
+
+    Reads through the profile cache: repeated lookups within a request are memoized,
+    and a cached profile is reused without a read for PROFILE_VERSION_CHECK_SECONDS,
+    then revalidated by reading its timestamp (see profile_cache.py).
+    """
+    # Sanitize email to get the actor_id for database lookup using global function
+    sanitized_actor_id = sanitize_email_for_actor_id(email)
+
+    def load():
+        # Get the student profile directly using the primary key (actionID)
+        return get_table(STUDENT_PROFILE_TABLE_NAME).get_item(Key={'actionID': sanitized_actor_id}).get('Item')
+
+    def version():
+        # Every save-profile write sets timestamp. Eventually consistent: half the read
+        # units, and its lag is small next to the check interval
+        item = get_table(STUDENT_PROFILE_TABLE_NAME).get_item(
+            Key={'actionID': sanitized_actor_id},
+            ProjectionExpression='#timestamp',
+            ExpressionAttributeNames={'#timestamp': 'timestamp'}
+        ).get('Item')
+        return item.get('timestamp') if item else None
+
+    return profile_cache.get(sanitized_actor_id, load, version)
+
 @tool
 def save_job_recommendations(email: str, job_category: str, jobInformation: list) -> Dict[str, Any]:
     """
@@ -106,7 +181,12 @@ def save_job_recommendations(email: str, job_category: str, jobInformation: list
     This tool stores job recommendations with the following structure:
     - userJobKey: "email#job_category" (e.g., "john@gmail.com#software-engineer")
     - createdAt: ISO timestamp when recommendation was saved
-    - jobInformation: List of structured job data objects
+    - jobInformation: List of structured job data objects (stored compressed when
+      JOB_INFO_COMPRESSION is set, see job_codec.py). With a job catalog configured,
+      postings are stored once in the catalog and the item keeps jobRefs with each
+      job's fit text instead (see job_catalog.py)
+    - pendingShard/pendingKey: sparse pending-index keys, removed once the item is sent
+    - expiresAt: epoch seconds after which the item expires (RECOMMENDATION_RETENTION_DAYS)
 
     Args:
         email: User's email address
@@ -130,9 +210,7 @@ def save_job_recommendations(email: str, job_category: str, jobInformation: list
                 "message": "Job information must be provided as a non-empty list"
             }
 
-        # Initialize DynamoDB client
-        dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
-        table = dynamodb.Table(JOB_RECOMMENDATIONS_TABLE_NAME)
+        table = get_table(JOB_RECOMMENDATIONS_TABLE_NAME)
 
         # Create composite partition key
         user_job_key = f"{email}#{job_category}"
@@ -148,11 +226,21 @@ def save_job_recommendations(email: str, job_category: str, jobInformation: list
             'email': email,
             'jobCategory': job_category,
             'jobInformation': jobInformation,
-            'sentToUser': False  # Always false for batch processing
+            'sentToUser': False,  # Always false for batch processing
+            # Pending index entry; sorted by user so the sender can group a user's items
+            'pendingShard': pending_shard_for(email),
+            'pendingKey': f"{email}#{created_at}"
         }
+        if RECOMMENDATION_RETENTION_DAYS > 0:
+            item[EXPIRES_ATTRIBUTE] = int(time.time()) + RECOMMENDATION_RETENTION_DAYS * 86400
+
+        job_catalog = get_job_catalog()
+        if job_catalog and all(isinstance(job, dict) for job in jobInformation):
+            item[REFS_ATTRIBUTE] = job_catalog.store(jobInformation)
+            del item['jobInformation']
 
         # Put item in DynamoDB
-        table.put_item(Item=item)
+        table.put_item(Item=encode_job_information(item))
 
         return {
             "success": True,
@@ -183,34 +271,31 @@ def get_job_recommendations(email: str, job_category: str = None, limit: int = 1
         List of job recommendations for the user
     """
     try:
-        # Initialize DynamoDB client
-        dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
-        table = dynamodb.Table(JOB_RECOMMENDATIONS_TABLE_NAME)
+        table = get_table(JOB_RECOMMENDATIONS_TABLE_NAME)
+
+        limit = max(1, min(int(limit or 10), MAX_RECOMMENDATIONS_LIMIT))
 
         if job_category:
             # Query for specific job category
             user_job_key = f"{email}#{job_category}"
-
-            response = table.query(
-                KeyConditionExpression=boto3.dynamodb.conditions.Key('userJobKey').eq(user_job_key),
-                ScanIndexForward=False,  # Most recent first
-                Limit=limit
-            )
+            query_kwargs = {
+                'KeyConditionExpression': Key('userJobKey').eq(user_job_key),
+            }
         else:
-            # Query for all job categories for this user
-            # This requires a GSI with email as partition key
-            # For now, we'll scan with filter (less efficient but works)
-            response = table.scan(
-                FilterExpression=boto3.dynamodb.conditions.Attr('email').eq(email),
-                Limit=limit
-            )
-
-            # Sort by createdAt descending (most recent first)
-            items = response.get('Items', [])
-            items.sort(key=lambda x: x.get('createdAt', ''), reverse=True)
-            response['Items'] = items[:limit]
+            # Newest recommendations across all job categories from the email index
+            query_kwargs = {
+                'IndexName': EMAIL_INDEX_NAME,
+                'KeyConditionExpression': Key('email').eq(email),
+            }
+        # Expired items can outlive their expiry until TTL deletes them
+        query_kwargs['FilterExpression'] = not_expired_filter()
 
-        items = response.get('Items', [])
+        items = [decode_job_information(item) for item in query_newest(table, query_kwargs, limit)]
+        if any(REFS_ATTRIBUTE in item for item in items):
+            job_catalog = get_job_catalog()
+            if not job_catalog:
+                raise ValueError("Recommendations reference the job catalog but JOB_CATALOG_TABLE_NAME is not set")
+            job_catalog.resolve(items)
 
         return {
             "success": True,
@@ -226,4 +311,20 @@ def get_job_recommendations(email: str, job_category: str = None, limit: int = 1
             "recommendations": []
         }
 
+def query_newest(table, query_kwargs: Dict[str, Any], limit: int) -> list:
+    """
+    Page through a query, most recent first, until limit items are collected.
 
+    Pages can end early at DynamoDB's 1 MB response limit, and Limit counts items
+    before any FilterExpression, so this follows LastEvaluatedKey rather than
+    trusting a single page.
+    """
+    items = []
+    query_kwargs = dict(query_kwargs, ScanIndexForward=False)
+    while len(items) < limit:
+        response = table.query(Limit=limit - len(items), **query_kwargs)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            break
+        query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return items
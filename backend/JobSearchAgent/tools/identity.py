@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+User identity keys: the email -> actionID mapping used as the student profile key, as
+memory actor id and in Bedrock AgentCore namespaces.
+
+The Lambda functions use the copy in the common Lambda layer
+(lambda/layers/common/python/jobsearch_common/identity.py). Everything below this
+docstring must stay identical to it; tests/test_identity.py checks that.
+"""
+
+ALLOWED_CHARACTERS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_/*'
+
+# ASCII emails (nearly all of them) are mapped with one bytes.translate call
+_ASCII_TABLE = bytes(c if chr(c) in ALLOWED_CHARACTERS else ord('_') for c in range(256))
+
+
+class _UnicodeTable(dict):
+    """str.translate table that maps every character outside ALLOWED_CHARACTERS to '_'"""
+
+    def __missing__(self, codepoint):
+        value = codepoint if chr(codepoint) in ALLOWED_CHARACTERS else ord('_')
+        self[codepoint] = value
+        return value
+
+
+_UNICODE_TABLE = _UnicodeTable()
+
+
+def sanitize_email_for_actor_id(email):
+    """Replace every character outside [A-Za-z0-9-_/*] with '_'.
+
+    ':' is replaced too, so the "::" -> ":_" fix-up of the original implementation never applies.
+    """
+    if not email:
+        return ""
+    if email.isascii():
+        return email.encode('ascii').translate(_ASCII_TABLE).decode('ascii')
+    return email.translate(_UNICODE_TABLE)
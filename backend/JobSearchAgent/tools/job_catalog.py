@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Job catalog: each job posting stored once, referenced from recommendation items.
+
+With JOB_CATALOG_TABLE_NAME set, save_job_recommendations splits every job into
+the posting itself and the per-user fit text. Postings are keyed by a hash of
+their content (jobKey = "job#<sha256 prefix>") and written to the catalog table
+only if they are not there yet; the recommendation item stores
+jobRefs = [{"jobKey": ..., "fit": ...}] instead of jobInformation. Storage and
+write volume grow with distinct postings rather than with recipients.
+
+Readers call JobCatalog.resolve on the items they read, which rebuilds
+jobInformation from the catalog with BatchGetItem. Postings never change under
+a given key, so resolved postings are kept in an LRU cache without expiry.
+
+The Lambda functions that read the table use the copy in the common Lambda layer
+(lambda/layers/common/python/jobsearch_common/); keep the two in sync
+(tests/test_job_catalog.py fails when their code differs).
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List
+
+JOB_CATALOG_TABLE_NAME = os.getenv('JOB_CATALOG_TABLE_NAME')
+JOB_CATALOG_CACHE_SIZE = int(os.getenv('JOB_CATALOG_CACHE_SIZE', '4096'))
+
+REFS_ATTRIBUTE = 'jobRefs'
+# Per-user text kept on the recommendation item rather than in the shared posting
+FIT_FIELD = 'fit'
+
+BATCH_GET_SIZE = 100  # BatchGetItem accepts at most 100 keys
+BATCH_WRITE_SIZE = 25  # BatchWriteItem accepts at most 25 requests
+MAX_ATTEMPTS = 8
+
+
+def job_key(posting: Dict[str, Any]) -> str:
+    """Content-addressed catalog key of a posting (without its fit text)"""
+    canonical = json.dumps({k: v for k, v in posting.items() if k != FIT_FIELD},
+                           sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return f"job#{hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:32]}"
+
+
+def _backoff(attempt: int) -> None:
+    time.sleep(min(0.05 * (2 ** attempt), 2))
+
+
+class JobCatalog:
+    """Catalog table access through the table resource's (thread-safe) client, with an LRU of postings"""
+
+    def __init__(self, table, cache_size: int = JOB_CATALOG_CACHE_SIZE):
+        self._client = table.meta.client
+        self._table_name = table.name
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, key):
+        with self._lock:
+            posting = self._cache.get(key)
+            if posting is not None:
+                self._cache.move_to_end(key)
+            return posting
+
+    def _remember(self, key, posting):
+        with self._lock:
+            self._cache[key] = posting
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Postings by jobKey, from the cache or BatchGetItem; keys not in the catalog are absent"""
+        postings = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            posting = self._cached(key)
+            if posting is not None:
+                postings[key] = posting
+            else:
+                missing.append(key)
+        with self._lock:
+            self.hits += len(postings)
+            self.misses += len(missing)
+
+        for start in range(0, len(missing), BATCH_GET_SIZE):
+            request = {self._table_name: {'Keys': [{'jobKey': key} for key in missing[start:start + BATCH_GET_SIZE]]}}
+            attempt = 0
+            while request:
+                response = self._client.batch_get_item(RequestItems=request)
+                for item in response.get('Responses', {}).get(self._table_name, []):
+                    postings[item['jobKey']] = item['posting']
+                    self._remember(item['jobKey'], item['posting'])
+                request = response.get('UnprocessedKeys') or {}
+                if request:
+                    attempt += 1
+                    if attempt >= MAX_ATTEMPTS:
+                        raise RuntimeError(f"Job catalog reads still unprocessed after {attempt} attempts")
+                    _backoff(attempt)
+        return postings
+
+    def store(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Write the postings of jobs that are not in the catalog yet; returns their jobRefs"""
+        refs = []
+        postings = {}
+        for job in jobs:
+            posting = {k: v for k, v in job.items() if k != FIT_FIELD}
+            key = job_key(posting)
+            postings[key] = posting
+            ref = {'jobKey': key}
+            if job.get(FIT_FIELD) is not None:
+                ref[FIT_FIELD] = job[FIT_FIELD]
+            refs.append(ref)
+
+        existing = self.get_many(postings)
+        new = [(key, posting) for key, posting in postings.items() if key not in existing]
+        now = datetime.now(timezone.utc).isoformat()
+        for start in range(0, len(new), BATCH_WRITE_SIZE):
+            chunk = new[start:start + BATCH_WRITE_SIZE]
+            request = {self._table_name: [
+                {'PutRequest': {'Item': {'jobKey': key, 'posting': posting, 'createdAt': now}}} for key, posting in chunk
+            ]}
+            attempt = 0
+            while request:
+                response = self._client.batch_write_item(RequestItems=request)
+                request = response.get('UnprocessedItems') or {}
+                if request:
+                    attempt += 1
+                    if attempt >= MAX_ATTEMPTS:
+                        raise RuntimeError(f"Job catalog writes still unprocessed after {attempt} attempts")
+                    _backoff(attempt)
+            for key, posting in chunk:
+                self._remember(key, posting)
+        return refs
+
+    def resolve(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Rebuild jobInformation in place for items that store jobRefs; other items are unchanged"""
+        referencing = [item for item in items if item and REFS_ATTRIBUTE in item]
+        if not referencing:
+            return items
+        postings = self.get_many(ref['jobKey'] for item in referencing for ref in item[REFS_ATTRIBUTE])
+        for item in referencing:
+            jobs = []
+            for ref in item.pop(REFS_ATTRIBUTE):
+                posting = postings.get(ref['jobKey'])
+                if posting is None:
+                    print(f"Warning: job {ref['jobKey']} of {item.get('userJobKey')} is not in the job catalog")
+                    continue
+                job = dict(posting)
+                if FIT_FIELD in ref:
+                    job[FIT_FIELD] = ref[FIT_FIELD]
+                jobs.append(job)
+            item['jobInformation'] = jobs
+        return items
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._cache)}
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Read-through cache for student profiles.
+
+get_student_profile is called by the orchestrator and both specialized agents,
+often several times per request and again on later turns. Profiles are cached
+per process with a TTL, and memoized per request so every lookup within one
+request sees the same profile.
+
+Every profile write (save-profile, single or bulk) sets the profile's timestamp
+attribute, which serves as its version. A cached profile is served without any
+read until it was last checked PROFILE_VERSION_CHECK_SECONDS (default 30) ago;
+the next request that uses it then reads the stored timestamp and reloads the
+profile if it changed. A version read costs as much as a full get_item (read
+units follow the item size), so the saving comes from skipping reads between
+checks, not from the check itself.
+
+Staleness bound: a saved profile is seen by every runtime container within
+PROFILE_VERSION_CHECK_SECONDS plus DynamoDB's eventual-consistency lag (normally
+under a second). Entries are dropped after PROFILE_CACHE_TTL_SECONDS.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+PROFILE_CACHE_TTL_SECONDS = float(os.getenv('PROFILE_CACHE_TTL_SECONDS', '900'))
+PROFILE_CACHE_MAX_ENTRIES = int(os.getenv('PROFILE_CACHE_MAX_ENTRIES', '1024'))
+PROFILE_VERSION_CHECK_SECONDS = float(os.getenv('PROFILE_VERSION_CHECK_SECONDS', '30'))
+VERSION_ATTRIBUTE = 'timestamp'
+
+# actionID -> profile (or None) looked up during the current request
+_request_profiles: contextvars.ContextVar = contextvars.ContextVar('request_profiles', default=None)
+
+
+class ProfileCache:
+    """Thread-safe TTL + LRU cache of profiles keyed by actionID, revalidated by profile version"""
+
+    def __init__(self, ttl_seconds: float = PROFILE_CACHE_TTL_SECONDS,
+                 max_entries: int = PROFILE_CACHE_MAX_ENTRIES,
+                 version_check_seconds: float = PROFILE_VERSION_CHECK_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.version_check_seconds = version_check_seconds
+        # actionID -> (expires_at, profile, checked_at)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def get(self, action_id: str, loader: Callable[[], Optional[Dict[str, Any]]],
+            version: Optional[Callable[[], Any]] = None) -> Optional[Dict[str, Any]]:
+        """Profile for action_id: request memo, then cache, then loader() (whose result is cached).
+
+        version() returns the stored profile's current version (its timestamp, or None if
+        there is no profile); a cached profile whose version differs is reloaded.
+        """
+        memo = _request_profiles.get()
+        if memo is not None and action_id in memo:
+            return memo[action_id]
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(action_id)
+        if entry is not None and entry[0] <= now:
+            entry = None
+
+        if entry is not None and version is not None and now - entry[2] >= self.version_check_seconds:
+            cached_version = entry[1].get(VERSION_ATTRIBUTE) if entry[1] else None
+            if version() == cached_version:
+                entry = (entry[0], entry[1], now)
+                with self._lock:
+                    if action_id in self._entries:
+                        self._entries[action_id] = entry
+            else:
+                entry = None
+                with self._lock:
+                    self.stale += 1
+
+        if entry is not None:
+            with self._lock:
+                self.hits += 1
+                if action_id in self._entries:
+                    self._entries.move_to_end(action_id)
+            profile = entry[1]
+        else:
+            with self._lock:
+                self.misses += 1
+            profile = loader()
+            loaded_at = time.monotonic()
+            with self._lock:
+                self._entries[action_id] = (loaded_at + self.ttl_seconds, profile, loaded_at)
+                self._entries.move_to_end(action_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        if memo is not None:
+            memo[action_id] = profile
+        return profile
+
+    def invalidate(self, action_id: str) -> None:
+        with self._lock:
+            self._entries.pop(action_id, None)
+        memo = _request_profiles.get()
+        if memo is not None:
+            memo.pop(action_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def begin_request(self) -> None:
+        """Start request-level memoization for the current context"""
+        _request_profiles.set({})
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'stale': self.stale, 'size': len(self._entries)}
+
+
+profile_cache = ProfileCache()
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Recommendation retention: the expiresAt attribute and the filter readers use to skip
+expired recommendations.
+
+save_job_recommendations sets expiresAt (epoch seconds) from
+RECOMMENDATION_RETENTION_DAYS, and JobRecommendationsTable uses it as its TTL
+attribute. TTL deletion can lag expiry by a day or more, so get_job_recommendations
+filters with not_expired_filter as the Lambda readers do. Items without expiresAt never
+expire.
+
+The Lambda functions use the copy in the common Lambda layer
+(lambda/layers/common/python/jobsearch_common/retention.py). Everything below this
+docstring must stay identical to it; tests/test_retention.py checks that.
+"""
+
+import time
+
+EXPIRES_ATTRIBUTE = 'expiresAt'
+
+
+def not_expired_filter(now=None):
+    """FilterExpression condition that keeps items without expiresAt or expiring after now"""
+    # Imported here: boto3.dynamodb.conditions is slow to import and only needed by queries
+    from boto3.dynamodb.conditions import Attr
+
+    now = int(time.time() if now is None else now)
+    return Attr(EXPIRES_ATTRIBUTE).not_exists() | Attr(EXPIRES_ATTRIBUTE).gt(now)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold-start init cost of the Python Lambda functions
+==============================================================
+Imports each function's handler module in a fresh interpreter, as a cold start does, and
+reports the init time (module imports plus anything created at import, such as boto3
+clients). The common layer (lambda/layers/common/python) is put on the path as Lambda
+mounts it at /opt/python. Also compares the email -> actionID sanitizers.
+
+Usage:
+    python benchmarks/bench_cold_start.py
+    python benchmarks/bench_cold_start.py --runs 10
+
+To compare with an earlier revision, check it out next to this one and point --root at
+its backend directory:
+    git worktree add /tmp/before <revision>
+    python benchmarks/bench_cold_start.py --root /tmp/before/backend
+
+No AWS calls are made; clients are created against a placeholder region.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import timeit
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+FUNCTIONS = ['save-profile', 'resume-parser', 'batch-processor', 'sqs-processor',
+             'notification-sender', 'job-recommendations-api', 'recommendation-archiver']
+
+# Placeholder configuration so modules that read it at import can be loaded
+ENVIRONMENT = {
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'STUDENT_PROFILE_TABLE_NAME': 'StudentProfileTable',
+    'JOB_RECOMMENDATIONS_TABLE_NAME': 'JobRecommendationsTable',
+    'JOB_CATALOG_TABLE_NAME': 'JobCatalogTable',
+    'SQS_QUEUE_URL': 'https://sqs.us-east-1.amazonaws.com/000000000000/queue',
+}
+
+INIT_SNIPPET = (
+    "import time; start = time.perf_counter(); import index; "
+    "print((time.perf_counter() - start) * 1000)"
+)
+
+
+def init_ms(root, function):
+    """Init time of one cold import of function's index module, or None if it fails"""
+    function_dir = os.path.join(root, 'lambda', function)
+    path = [function_dir]
+    layer_dir = os.path.join(root, 'lambda', 'layers', 'common', 'python')
+    if os.path.isdir(layer_dir):
+        path.append(layer_dir)
+    env = dict(os.environ, **ENVIRONMENT, PYTHONPATH=os.pathsep.join(path), PYTHONDONTWRITEBYTECODE='1')
+    result = subprocess.run([sys.executable, '-c', INIT_SNIPPET], cwd=function_dir, env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"  {function}: import failed: {result.stderr.strip().splitlines()[-1]}")
+        return None
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def legacy_sanitize(email):
+    """The per-character sanitizer the functions used before the common layer"""
+    sanitized = ''.join('_' if c not in 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_/*' else c for c in email)
+    return sanitized.replace('::', ':_')
+
+
+def bench_sanitizers(repeat):
+    sys.path.insert(0, os.path.join(BACKEND, 'lambda', 'layers', 'common', 'python'))
+    from jobsearch_common.identity import sanitize_email_for_actor_id
+
+    print("Email sanitizing (per call):")
+    for email in ('first.last+jobs@university.edu', 'étudiant.müller@université.fr'):
+        assert sanitize_email_for_actor_id(email) == legacy_sanitize(email)
+        for name, func in (('legacy', legacy_sanitize), ('translate', sanitize_email_for_actor_id)):
+            best = min(timeit.repeat(lambda: func(email), number=20000, repeat=repeat)) / 20000
+            print(f"  {name:<10} {best * 1e6:7.2f} us  {email}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--root', default=BACKEND, help='backend directory to measure (default: this checkout)')
+    parser.add_argument('--runs', type=int, default=5, help='cold imports per function')
+    parser.add_argument('--functions', nargs='*', default=FUNCTIONS)
+    args = parser.parse_args()
+
+    print(f"Cold-start init of {os.path.abspath(args.root)} ({args.runs} runs, median / min):")
+    for function in args.functions:
+        if not os.path.isdir(os.path.join(args.root, 'lambda', function)):
+            print(f"  {function:<24} not in this revision")
+            continue
+        samples = [ms for ms in (init_ms(args.root, function) for _ in range(args.runs)) if ms is not None]
+        if samples:
+            print(f"  {function:<24} {statistics.median(samples):8.1f} ms {min(samples):8.1f} ms")
+
+    bench_sanitizers(repeat=5)
+
+
+if __name__ == '__main__':
+    main()
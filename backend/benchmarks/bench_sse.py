@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark: AgentCore SSE stream decoding in the SQS processor
+=============================================================
+Compares the original str-concatenating loop with the incremental byte decoder in
+lambda/sqs-processor/sse.py over recorded AgentCore streams.
+
+Usage:
+    python benchmarks/bench_sse.py                       # synthetic stream
+    python benchmarks/bench_sse.py stream1.sse ...       # recorded raw response bodies
+
+Streams are replayed in chunks of about --chunk-size bytes to mimic the botocore event
+stream. The timed runs cut chunks at character boundaries, since the legacy loop decodes
+each chunk on its own and cannot read a multi-byte character split across two chunks.
+The split case (fixed-size byte chunks) is then run once as a correctness check.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda', 'sqs-processor'))
+
+from sse import iter_events  # noqa: E402
+
+
+def encode_event(payload):
+    """One event as AgentCore streams it: data: {json}, then a blank line"""
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode('utf-8')
+
+
+def legacy_find_result(chunks):
+    """The decoding loop sqs-processor used before the incremental decoder"""
+    buffer = ''
+    for chunk in chunks:
+        chunk_data = chunk.decode('utf-8') if isinstance(chunk, bytes) else str(chunk)
+        buffer += chunk_data
+        lines = buffer.split('\n')
+        buffer = lines.pop() or ''
+        for line in lines:
+            line = line.strip()
+            if line.startswith('data: '):
+                try:
+                    event = json.loads(line[6:])
+                except json.JSONDecodeError:
+                    continue
+                if "job_agent_result" in event:
+                    return event["job_agent_result"]
+    return None
+
+
+def decoder_find_result(chunks):
+    for sse_event in iter_events(chunks):
+        try:
+            event = sse_event.json()
+        except ValueError:
+            continue
+        if isinstance(event, dict) and "job_agent_result" in event:
+            return event["job_agent_result"]
+    return None
+
+
+def synthetic_stream(token_events=3000, result_jobs=400):
+    """A stream shaped like a batch run: many small events, then one large result"""
+    parts = [encode_event({"thinking": f"token {i} – é"}) for i in range(token_events)]
+    jobs = [{"title": f"Engineer {i}", "company": "Acme", "fit": "Strong match " * 40} for i in range(result_jobs)]
+    parts.append(encode_event({"job_agent_result": json.dumps(jobs)}))
+    parts.append(encode_event({"final_result": "done"}))
+    return b''.join(parts)
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def chunked_at_characters(data, size):
+    """Chunks of at most size bytes that never split a UTF-8 character"""
+    chunks = []
+    start = 0
+    while start < len(data):
+        end = min(start + size, len(data))
+        # Back off continuation bytes (10xxxxxx) so the chunk ends on a character boundary
+        while end < len(data) and end > start + 1 and data[end] & 0xC0 == 0x80:
+            end -= 1
+        chunks.append(data[start:end])
+        start = end
+    return chunks
+
+
+def bench(name, func, chunks, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(chunks)
+        best = min(best, time.perf_counter() - start)
+    print(f"  {name:<10} {best * 1000:9.2f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('streams', nargs='*', help='files containing recorded raw SSE response bodies')
+    parser.add_argument('--chunk-size', type=int, default=64)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    streams = [(path, open(path, 'rb').read()) for path in args.streams] or [('synthetic', synthetic_stream())]
+
+    for name, data in streams:
+        chunks = chunked_at_characters(data, args.chunk_size)
+        print(f"{name}: {len(data)} bytes in {len(chunks)} chunks of up to {args.chunk_size}")
+        legacy = bench('legacy', legacy_find_result, chunks, args.repeat)
+        current = bench('decoder', decoder_find_result, chunks, args.repeat)
+        if legacy != current:
+            print("  WARNING: results differ")
+
+        # Correctness with characters split across chunks, as the event stream delivers them
+        split_chunks = chunked(data, args.chunk_size)
+        if split_chunks == chunks:
+            print("  split characters: none in this stream")
+            continue
+        try:
+            legacy_split = legacy_find_result(split_chunks)
+            legacy_status = 'ok' if legacy_split == current else 'wrong result'
+        except UnicodeDecodeError as e:
+            legacy_status = f"fails ({e.reason})"
+        decoder_status = 'ok' if decoder_find_result(split_chunks) == current else 'wrong result'
+        print(f"  split characters: legacy {legacy_status}, decoder {decoder_status}")
+
+
+if __name__ == '__main__':
+    main()
@@ -9,24 +9,33 @@ Key Enhancements Made:
 3. Enhanced error handling and logging
 4. Fixed environment variable usage (no hardcoded values)
 5. Added proper user profile data to SQS messages for personalized job search
+6. Deadline-aware scheduling: runs are spread across the window before the notification cutoff
 
 Workflow:
-1. Scans DynamoDB for users with optInStatus = true
+1. Scans DynamoDB for users with optInStatus = true (all pages)
 2. Extracts complete user profile (name, location, job preferences, etc.)
 3. Generates unique session IDs for each user
-4. Sends user data to SQS queue for processing by SQS processor
+4. Estimates each user's run time and plans start times so all runs finish before the cutoff
+5. Sends user data to SQS queue (with delays) for processing by SQS processor
 """
 
 import json
-import boto3
-import os
 import uuid
 from boto3.dynamodb.conditions import Attr
+from jobsearch_common import env_int, env_str, lazy_client, lazy_resource
+from scheduler import epoch, estimate_cost_seconds, notification_cutoff, plan_schedule, utc_now
 
-BATCH_SIZE = 20
+BATCH_SIZE = 10  # SendMessageBatch accepts at most 10 entries
+MAX_SQS_DELAY_SECONDS = 900
 
-dynamodb = boto3.resource('dynamodb')
-sqs = boto3.client('sqs')
+# Scheduling window: runs must finish before the daily notification run (16:00 UTC cron)
+NOTIFICATION_CUTOFF_HOUR_UTC = env_int('NOTIFICATION_CUTOFF_HOUR_UTC', 16)
+SCHEDULE_MARGIN_MINUTES = env_int('SCHEDULE_MARGIN_MINUTES', 60)
+MAX_SCHEDULE_LANES = env_int('MAX_SCHEDULE_LANES', 20)
+
+# Created on first use by the layer's client registry
+dynamodb = lazy_resource('dynamodb')
+sqs = lazy_client('sqs')
 
 def lambda_handler(event, context):
     """EventBridge triggered batch processor - adds messages to SQS queue for opted-in users"""
@@ -50,9 +59,43 @@ def generate_session_id(email):
     
     return session_id
 
+def report_schedule_plan(plan, now, cutoff):
+    """Log the projected completion of the plan (compared with actuals by the SQS processor)"""
+    projected_finish = epoch(now, plan.makespan_seconds)
+    print(f"Scheduled {len(plan.jobs)} users on {plan.lanes} lanes: "
+          f"{plan.total_seconds / 3600:.1f} h of estimated work, projected completion "
+          f"{plan.makespan_seconds / 3600:.2f} h from now, window {plan.window_seconds / 3600:.2f} h")
+    if not plan.fits_window:
+        print(f"WARNING: projected completion exceeds the cutoff {cutoff.isoformat()} even with {plan.lanes} lanes")
+
+    # CloudWatch Embedded Metric Format record for dashboards/alarms
+    print(json.dumps({
+        '_aws': {
+            'Timestamp': int(now.timestamp() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': 'JobSearch/BatchSchedule',
+                'Dimensions': [[]],
+                'Metrics': [
+                    {'Name': 'ScheduledUsers', 'Unit': 'Count'},
+                    {'Name': 'ScheduleLanes', 'Unit': 'Count'},
+                    {'Name': 'EstimatedWorkSeconds', 'Unit': 'Seconds'},
+                    {'Name': 'ProjectedMakespanSeconds', 'Unit': 'Seconds'},
+                    {'Name': 'ScheduleSlackSeconds', 'Unit': 'Seconds'}
+                ]
+            }]
+        },
+        'ScheduledUsers': len(plan.jobs),
+        'ScheduleLanes': plan.lanes,
+        'EstimatedWorkSeconds': round(plan.total_seconds),
+        'ProjectedMakespanSeconds': round(plan.makespan_seconds),
+        'ScheduleSlackSeconds': round(plan.window_seconds - plan.makespan_seconds),
+        'ProjectedFinishEpoch': projected_finish,
+        'CutoffEpoch': epoch(cutoff)
+    }))
+
 def process_batch():
-    table_name = os.environ.get('STUDENT_PROFILE_TABLE_NAME')
-    queue_url = os.environ.get('SQS_QUEUE_URL')
+    table_name = env_str('STUDENT_PROFILE_TABLE_NAME')
+    queue_url = env_str('SQS_QUEUE_URL')
     
     if not table_name or not queue_url:
         error_msg = "Missing required environment variables: STUDENT_PROFILE_TABLE_NAME or SQS_QUEUE_URL"
@@ -67,18 +110,44 @@ def process_batch():
     try:
         print(f"Scanning table {table_name} for opted-in users...")
         
-        # Scan table for users with optInStatus = True
-        response = table.scan(
-            FilterExpression=Attr('optInStatus').eq(True)
+        # Scan table for users with optInStatus = True, following pagination
+        opted_in_users = []
+        scan_kwargs = {'FilterExpression': Attr('optInStatus').eq(True)}
+        while True:
+            response = table.scan(**scan_kwargs)
+            opted_in_users.extend(response['Items'])
+            if 'LastEvaluatedKey' not in response:
+                break
+            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+        print(f"Found {len(opted_in_users)} opted-in users")
+
+        users = [item for item in opted_in_users if item.get('email') and '@' in item.get('email')]
+
+        if not users:
+            print("No opted-in users found to process")
+            return {
+                'statusCode': 200,
+                'body': json.dumps('No opted-in users found to process')
+            }
+
+        # Plan start times so every run is projected to finish before the notification cutoff
+        now = utc_now()
+        cutoff = notification_cutoff(now, NOTIFICATION_CUTOFF_HOUR_UTC, SCHEDULE_MARGIN_MINUTES)
+        window_seconds = (cutoff - now).total_seconds()
+        plan = plan_schedule(
+            [(item['email'], estimate_cost_seconds(item)) for item in users],
+            window_seconds,
+            MAX_SCHEDULE_LANES
         )
-        
-        print(f"Found {len(response['Items'])} opted-in users")
-        
+        report_schedule_plan(plan, now, cutoff)
+
         messages = []
-        for item in response['Items']:
+        for item in users:
             action_id = item.get('actionID')
             email = item.get('email')
-            
+            scheduled = plan.jobs[email]
+
             # This data is passed to the SQS processor and then to AgentCore for better job recommendations
             user_profile = {
                 'fullName': item.get('fullName', ''),
@@ -88,30 +157,33 @@ def process_batch():
                 'education': item.get('education', ''),
                 'experience': item.get('experience', ''),
             }
-            
-            if email and '@' in email:
-                # Generate proper session ID for AgentCore
-                session_id = generate_session_id(email)
-                
-                messages.append({
-                    'Id': str(len(messages)),
-                    'MessageBody': json.dumps({
-                        'email': email,
-                        'action_id': action_id,
-                        'session_id': session_id,
-                        'user_profile': user_profile,  # Include full user profile for better job matching
-                        'source': 'batch'  # Important: indicates this is batch processing
-                    })
+
+            # Generate proper session ID for AgentCore
+            session_id = generate_session_id(email)
+            history = item.get('batchCostEstimateSeconds')
+
+            messages.append({
+                'Id': str(len(messages)),
+                # SQS can delay up to 15 minutes; the processor re-queues anything due later
+                'DelaySeconds': min(int(scheduled.start_offset_seconds), MAX_SQS_DELAY_SECONDS),
+                'MessageBody': json.dumps({
+                    'email': email,
+                    'action_id': action_id,
+                    'session_id': session_id,
+                    'user_profile': user_profile,  # Include full user profile for better job matching
+                    'source': 'batch',  # Important: indicates this is batch processing
+                    'schedule': {
+                        'not_before': epoch(now, scheduled.start_offset_seconds),
+                        'projected_finish': epoch(now, scheduled.finish_offset_seconds),
+                        'cutoff': epoch(cutoff),
+                        'estimated_seconds': round(scheduled.estimated_seconds),
+                        'cost_history_seconds': float(history) if history is not None else None
+                    }
                 })
-                print(f"Added user {email} to batch queue with session {session_id} and profile data")
-        
-        if not messages:
-            print("No opted-in users found to process")
-            return {
-                'statusCode': 200,
-                'body': json.dumps('No opted-in users found to process')
-            }
-        
+            })
+            print(f"Added user {email} to batch queue with session {session_id}, lane {scheduled.lane}, "
+                  f"start +{scheduled.start_offset_seconds / 60:.0f} min")
+
         # Send messages in batches with failure checking
         count = 0
         failed_count = 0
@@ -0,0 +1,115 @@
+"""
+Deadline-aware scheduling for the daily batch
+=============================================
+Spreads AgentCore job searches across the window between the batch trigger (08:00 UTC)
+and the notification run (16:00 UTC) instead of starting every user at once.
+
+1. Each user's run time is estimated from history (an EWMA written back by the SQS
+   processor), falling back to a per-role default for users without history
+2. The fewest parallel lanes that finish all work before the cutoff are chosen
+3. Users are assigned to lanes longest-first (LPT list scheduling); each user's start
+   offset becomes an SQS delay / not_before time
+
+Peak concurrency is therefore the lane count, not the number of users, and the plan
+reports the projected completion time so it can be compared with the actual one.
+"""
+
+import heapq
+import math
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_SECONDS_PER_ROLE = 180.0
+MIN_COST_SECONDS = 60.0
+
+
+@dataclass
+class ScheduledJob:
+    key: str
+    estimated_seconds: float
+    start_offset_seconds: float
+    lane: int
+
+    @property
+    def finish_offset_seconds(self) -> float:
+        return self.start_offset_seconds + self.estimated_seconds
+
+
+@dataclass
+class SchedulePlan:
+    lanes: int
+    window_seconds: float
+    makespan_seconds: float
+    total_seconds: float
+    jobs: Dict[str, ScheduledJob] = field(default_factory=dict)
+
+    @property
+    def fits_window(self) -> bool:
+        return self.makespan_seconds <= self.window_seconds
+
+
+def estimate_cost_seconds(profile: dict) -> float:
+    """Estimated AgentCore run time for one user"""
+    history = profile.get('batchCostEstimateSeconds')
+    if history is not None:
+        try:
+            return max(float(history), MIN_COST_SECONDS)
+        except (TypeError, ValueError):
+            pass
+
+    # No history: the batch agent searches once per preferred role
+    roles = [role for role in re.split(r'[,;/|]', profile.get('preferredJobRole') or '') if role.strip()]
+    return max(DEFAULT_SECONDS_PER_ROLE * max(len(roles), 1), MIN_COST_SECONDS)
+
+
+def notification_cutoff(now: datetime, cutoff_hour_utc: int, margin_minutes: int) -> datetime:
+    """Time by which all runs should be finished: today's notification run minus the margin"""
+    cutoff = now.replace(hour=cutoff_hour_utc, minute=0, second=0, microsecond=0)
+    if cutoff <= now:
+        cutoff += timedelta(days=1)
+    return cutoff - timedelta(minutes=margin_minutes)
+
+
+def plan_schedule(costs: List[Tuple[str, float]], window_seconds: float, max_lanes: int,
+                  safety_factor: float = 1.25) -> SchedulePlan:
+    """Assign each (key, estimated_seconds) a lane and start offset within the window.
+
+    Estimates are padded by safety_factor when sizing lanes. If even max_lanes cannot
+    finish in time, the plan uses max_lanes and fits_window is False.
+    """
+    padded = sorted(((key, cost * safety_factor) for key, cost in costs), key=lambda item: item[1], reverse=True)
+    total = sum(cost for _, cost in padded)
+    if not padded:
+        return SchedulePlan(lanes=0, window_seconds=window_seconds, makespan_seconds=0.0, total_seconds=0.0)
+
+    max_lanes = max(1, min(max_lanes, len(padded)))
+    lanes = 1 if window_seconds <= 0 else max(1, min(math.ceil(total / window_seconds), max_lanes))
+
+    while True:
+        plan = _assign_lanes(padded, lanes, window_seconds, total)
+        if plan.fits_window or lanes >= max_lanes:
+            return plan
+        lanes += 1
+
+
+def _assign_lanes(padded: List[Tuple[str, float]], lanes: int, window_seconds: float, total: float) -> SchedulePlan:
+    heap = [(0.0, lane) for lane in range(lanes)]
+    jobs = {}
+    makespan = 0.0
+    for key, cost in padded:
+        available, lane = heapq.heappop(heap)
+        jobs[key] = ScheduledJob(key=key, estimated_seconds=cost, start_offset_seconds=available, lane=lane)
+        makespan = max(makespan, available + cost)
+        heapq.heappush(heap, (available + cost, lane))
+    return SchedulePlan(lanes=lanes, window_seconds=window_seconds, makespan_seconds=makespan,
+                        total_seconds=total, jobs=jobs)
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def epoch(moment: datetime, offset_seconds: Optional[float] = 0.0) -> int:
+    return int(moment.timestamp() + (offset_seconds or 0.0))
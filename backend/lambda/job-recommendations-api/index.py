@@ -0,0 +1,103 @@
+"""
+JOB RECOMMENDATIONS API
+=======================
+Backs GET /job-recommendations/{userJobKey}/{createdAt} on the job recommendations REST API,
+the page opened from SMS links.
+
+Replaces the API Gateway's direct DynamoDB integration, whose mapping template could not
+decode compressed jobInformation (job_codec.py) or resolve job catalog references
+(job_catalog.py). The response keeps the same fields; jobInformation is now a plain
+JSON list instead of DynamoDB's {"L": [...]} form.
+"""
+
+import json
+from decimal import Decimal
+from urllib.parse import unquote
+
+from boto3.dynamodb.conditions import Key
+from jobsearch_common import env_str, lazy_resource
+from jobsearch_common.job_catalog import JOB_CATALOG_TABLE_NAME, JobCatalog
+from jobsearch_common.job_codec import decode_job_information
+from jobsearch_common.retention import not_expired_filter
+
+JOB_RECOMMENDATIONS_TABLE_NAME = env_str('JOB_RECOMMENDATIONS_TABLE_NAME')
+
+dynamodb = lazy_resource('dynamodb')
+
+# Postings of recommendations saved with jobRefs; cached across warm invocations
+_job_catalog = None
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+    'Access-Control-Allow-Methods': 'GET,OPTIONS',
+    'Content-Type': 'application/json',
+}
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def response(status_code, body):
+    return {
+        'statusCode': status_code,
+        'headers': CORS_HEADERS,
+        'body': json.dumps(body, default=_json_default),
+    }
+
+
+def get_job_catalog():
+    global _job_catalog
+    if not JOB_CATALOG_TABLE_NAME:
+        raise ValueError("Recommendation references the job catalog but JOB_CATALOG_TABLE_NAME is not set")
+    if _job_catalog is None:
+        _job_catalog = JobCatalog(dynamodb.Table(JOB_CATALOG_TABLE_NAME))
+    return _job_catalog
+
+
+def lambda_handler(event, context):
+    """Latest recommendation item for the userJobKey path parameter"""
+    path_parameters = event.get('pathParameters') or {}
+    # API Gateway passes path parameters still URL-encoded ("#" arrives as %23)
+    user_job_key = unquote(path_parameters.get('userJobKey') or '')
+
+    not_found = {
+        'error': 'Job recommendation not found',
+        'userJobKey': '',
+        'createdAt': '',
+        'email': '',
+        'jobCategory': '',
+        'jobInformation': []
+    }
+    if not user_job_key:
+        return response(404, not_found)
+
+    try:
+        table = dynamodb.Table(JOB_RECOMMENDATIONS_TABLE_NAME)
+        items = table.query(
+            KeyConditionExpression=Key('userJobKey').eq(user_job_key),
+            # An expired latest item means the link has expired; TTL may not have deleted it yet
+            FilterExpression=not_expired_filter(),
+            ScanIndexForward=False,
+            Limit=1
+        ).get('Items', [])
+        if not items:
+            print(f"❌ No recommendations found for {user_job_key}")
+            return response(404, not_found)
+
+        item = decode_job_information(items[0])
+        if 'jobRefs' in item:
+            get_job_catalog().resolve([item])
+        return response(200, {
+            'userJobKey': item.get('userJobKey', ''),
+            'createdAt': item.get('createdAt', ''),
+            'email': item.get('email', ''),
+            'jobCategory': item.get('jobCategory', ''),
+            'jobInformation': item.get('jobInformation') or []
+        })
+    except Exception as e:
+        print(f"❌ Error retrieving job recommendations for {user_job_key}: {str(e)}")
+        return response(500, {'error': 'Failed to retrieve job recommendations'})
@@ -0,0 +1,9 @@
+"""
+Shared code for the Python Lambda functions, deployed as the common Lambda layer
+(lambda/layers/common, mounted at /opt/python). For local runs, add
+lambda/layers/common/python to PYTHONPATH.
+"""
+
+from .clients import client, lazy_client, lazy_resource, resource
+from .config import env_bool, env_choice, env_float, env_int, env_str, require_env
+from .identity import sanitize_email_for_actor_id
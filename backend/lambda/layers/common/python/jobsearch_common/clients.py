@@ -0,0 +1,117 @@
+"""
+AWS Client Registry
+===================
+One place where the functions get their boto3 clients and resources:
+
+- created on first use, not at import: a function pays only for the services the
+  invocation actually calls, and boto3 itself is imported on the first request
+- cached per process, so warm invocations reuse the client and its open connections
+- built from one session (created under a lock; sessions are not thread-safe) with
+  tuned per-service settings: short DynamoDB timeouts with adaptive retries, long
+  read timeouts for Bedrock, keep-alive connections everywhere
+
+Clients are thread-safe and can be shared by worker threads. Resources are not: worker
+threads should use resource.meta.client (or Table.meta.client).
+
+lazy_client/lazy_resource return a stand-in that creates the client on first attribute
+access, for module-level names such as `sqs = lazy_client('sqs')`.
+"""
+
+import threading
+
+from .config import env_int
+
+# Settings for every client; SERVICE_CONFIGS entries override them per service
+DEFAULT_CONFIG = {
+    'connect_timeout': 5,
+    'read_timeout': 30,
+    'tcp_keepalive': True,
+    'max_pool_connections': env_int('AWS_MAX_POOL_CONNECTIONS', 10),
+    'retries': {'mode': 'standard', 'max_attempts': env_int('AWS_MAX_ATTEMPTS', 3)},
+}
+
+SERVICE_CONFIGS = {
+    # Item-sized requests: fail fast and let adaptive retries absorb throttling
+    'dynamodb': {
+        'connect_timeout': 2,
+        'read_timeout': 5,
+        'max_pool_connections': env_int('DYNAMODB_MAX_POOL_CONNECTIONS', 32),
+        'retries': {'mode': 'adaptive', 'max_attempts': env_int('DYNAMODB_MAX_ATTEMPTS', 5)},
+    },
+    # Document understanding of a whole resume can take minutes
+    'bedrock-runtime': {'connect_timeout': 10, 'read_timeout': 300},
+    # Agent sessions stream for up to the Lambda timeout; throttling is shaped by the caller
+    'bedrock-agentcore': {
+        'connect_timeout': 10,
+        'read_timeout': 900,
+        'retries': {'mode': 'standard', 'total_max_attempts': 1},
+    },
+}
+
+_lock = threading.Lock()
+_session = None
+_clients = {}
+_resources = {}
+
+
+def _config(service_name, overrides):
+    from botocore.config import Config
+
+    settings = dict(DEFAULT_CONFIG)
+    settings.update(SERVICE_CONFIGS.get(service_name, {}))
+    settings.update(overrides)
+    return Config(**settings)
+
+
+def _get_session():
+    global _session
+    if _session is None:
+        import boto3
+        _session = boto3.session.Session()
+    return _session
+
+
+def client(service_name, **overrides):
+    """Shared client for service_name; overrides are botocore Config settings"""
+    key = (service_name, repr(sorted(overrides.items())))
+    existing = _clients.get(key)
+    if existing is not None:
+        return existing
+    with _lock:
+        if key not in _clients:
+            _clients[key] = _get_session().client(service_name, config=_config(service_name, overrides))
+        return _clients[key]
+
+
+def resource(service_name, **overrides):
+    """Shared resource for service_name (use its meta.client from worker threads)"""
+    key = (service_name, repr(sorted(overrides.items())))
+    existing = _resources.get(key)
+    if existing is not None:
+        return existing
+    with _lock:
+        if key not in _resources:
+            _resources[key] = _get_session().resource(service_name, config=_config(service_name, overrides))
+        return _resources[key]
+
+
+class _Lazy:
+    __slots__ = ('_factory', '_target')
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._target = None
+
+    def __getattr__(self, name):
+        target = self._target
+        if target is None:
+            target = self._target = self._factory()
+        return getattr(target, name)
+
+
+def lazy_client(service_name, **overrides):
+    return _Lazy(lambda: client(service_name, **overrides))
+
+
+def lazy_resource(service_name, **overrides):
+    return _Lazy(lambda: resource(service_name, **overrides))
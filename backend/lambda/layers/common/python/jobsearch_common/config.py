@@ -0,0 +1,56 @@
+"""
+Environment Configuration
+=========================
+Typed readers for the environment variables every function is configured with. An unset
+or empty variable gives the default; a value that does not parse raises ValueError naming
+the variable, so a misconfigured function fails at import with a clear message.
+"""
+
+import os
+
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+
+def env_str(name, default=None):
+    value = os.environ.get(name)
+    return default if value is None or value == '' else value
+
+
+def env_int(name, default):
+    value = env_str(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer, got {value!r}") from None
+
+
+def env_float(name, default):
+    value = env_str(name)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number, got {value!r}") from None
+
+
+def env_bool(name, default=False):
+    value = env_str(name)
+    return default if value is None else value.strip().lower() in TRUE_VALUES
+
+
+def env_choice(name, default, choices):
+    """Lower-cased value of name, which must be one of choices"""
+    value = (env_str(name) or default).strip().lower()
+    if value not in choices:
+        raise ValueError(f"{name} must be one of {', '.join(choices)}, got {value!r}")
+    return value
+
+
+def require_env(name):
+    value = env_str(name)
+    if value is None:
+        raise ValueError(f"{name} environment variable not set")
+    return value
@@ -0,0 +1,76 @@
+"""
+Compressed jobInformation
+=========================
+Decodes the compressed form of a recommendation's jobInformation (binary attribute
+jobInformationZ plus jobInformationEncoding, e.g. "gzip/1"), written by the agent's
+save_job_recommendations when JOB_INFO_COMPRESSION is set. Items without it keep the
+plain jobInformation list and are returned unchanged.
+
+The agent runtime (not a Lambda function) has its own copy in
+JobSearchAgent/tools/job_codec.py; keep the two in sync
+(tests/test_job_codec.py fails when their code differs).
+"""
+
+import gzip
+import json
+import os
+from typing import Any, Dict
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; gzip is always available
+    zstandard = None
+
+JOB_INFO_COMPRESSION = os.getenv('JOB_INFO_COMPRESSION', 'none').lower()
+
+COMPRESSED_ATTRIBUTE = 'jobInformationZ'
+ENCODING_ATTRIBUTE = 'jobInformationEncoding'
+FORMAT_VERSION = 1
+
+
+def encode_job_information(item: Dict[str, Any], compression: str = None) -> Dict[str, Any]:
+    """Replace item['jobInformation'] with its compressed form, if compression is enabled"""
+    compression = (compression or JOB_INFO_COMPRESSION).lower()
+    if compression in ('', 'none') or 'jobInformation' not in item:
+        return item
+    if compression == 'zstd' and zstandard is None:
+        print("Warning: JOB_INFO_COMPRESSION=zstd but zstandard is not installed; using gzip")
+        compression = 'gzip'
+
+    payload = json.dumps(item['jobInformation'], separators=(',', ':'), ensure_ascii=False, default=str).encode('utf-8')
+    if compression == 'gzip':
+        data = gzip.compress(payload, mtime=0)
+    elif compression == 'zstd':
+        data = zstandard.ZstdCompressor().compress(payload)
+    else:
+        raise ValueError(f"Unsupported JOB_INFO_COMPRESSION: {compression}")
+
+    encoded = {key: value for key, value in item.items() if key != 'jobInformation'}
+    encoded[COMPRESSED_ATTRIBUTE] = data
+    encoded[ENCODING_ATTRIBUTE] = f"{compression}/{FORMAT_VERSION}"
+    return encoded
+
+
+def decode_job_information(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Restore item['jobInformation'] in place from its compressed form; plain items are returned as is"""
+    if not item or COMPRESSED_ATTRIBUTE not in item:
+        return item
+    data = item.pop(COMPRESSED_ATTRIBUTE)
+    encoding = item.pop(ENCODING_ATTRIBUTE, f"gzip/{FORMAT_VERSION}")
+    # Binary attributes come back from boto3 as Binary wrappers
+    data = getattr(data, 'value', data)
+
+    compression, _, version = encoding.partition('/')
+    if version != str(FORMAT_VERSION):
+        raise ValueError(f"Unsupported jobInformation format version: {encoding}")
+    if compression == 'gzip':
+        payload = gzip.decompress(data)
+    elif compression == 'zstd':
+        if zstandard is None:
+            raise ValueError("jobInformation is zstd-compressed but zstandard is not installed")
+        payload = zstandard.ZstdDecompressor().decompress(data)
+    else:
+        raise ValueError(f"Unsupported jobInformation encoding: {encoding}")
+
+    item['jobInformation'] = json.loads(payload)
+    return item
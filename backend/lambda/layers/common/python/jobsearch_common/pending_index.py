@@ -0,0 +1,29 @@
+"""
+Pending Recommendations Index
+=============================
+Unsent job recommendation items carry pendingShard and pendingKey, the keys of the sparse
+PendingRecommendationsIndex GSI that the notification sender reads. The agent's
+save_job_recommendations writes them on new items (its copy of pending_shard_for is in
+JobSearchAgent/tools/dynamodb_tools.py and must stay the same), mark_jobs_as_sent
+removes them, and scripts/backfill_pending_index.py adds them to items saved before
+the index existed.
+
+pendingShard spreads users over PENDING_INDEX_SHARDS partitions by a CRC32 of the
+email; pendingKey = "email#createdAt" keeps a user's items together within a shard.
+"""
+
+import zlib
+
+from .config import env_int
+
+PENDING_INDEX_SHARDS = env_int('PENDING_INDEX_SHARDS', 4)
+
+
+def pending_shard_for(email, shards=None):
+    """pendingShard value of a user's unsent recommendations"""
+    return f"pending#{zlib.crc32(email.encode('utf-8')) % (shards or PENDING_INDEX_SHARDS)}"
+
+
+def pending_key_for(email, created_at):
+    """pendingKey value of one unsent recommendation"""
+    return f"{email}#{created_at}"
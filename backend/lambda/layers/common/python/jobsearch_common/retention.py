@@ -0,0 +1,29 @@
+"""
+Recommendation Retention
+========================
+Job recommendation items carry expiresAt (epoch seconds), written by the agent's
+save_job_recommendations from RECOMMENDATION_RETENTION_DAYS. JobRecommendationsTable
+uses it as its TTL attribute, so DynamoDB deletes expired items and the recommendation
+archiver copies them to S3 from the table's stream.
+
+TTL deletion runs in the background and can lag expiry by a day or more, so readers
+also skip expired items themselves with not_expired_filter. Items
+without expiresAt, saved before retention was configured, never expire.
+
+The agent runtime (not a Lambda function) has its own copy in
+JobSearchAgent/tools/retention.py; keep the two in sync
+(tests/test_retention.py fails when their code differs).
+"""
+
+import time
+
+EXPIRES_ATTRIBUTE = 'expiresAt'
+
+
+def not_expired_filter(now=None):
+    """FilterExpression condition that keeps items without expiresAt or expiring after now"""
+    # Imported here: boto3.dynamodb.conditions is slow to import and only needed by queries
+    from boto3.dynamodb.conditions import Attr
+
+    now = int(time.time() if now is None else now)
+    return Attr(EXPIRES_ATTRIBUTE).not_exists() | Attr(EXPIRES_ATTRIBUTE).gt(now)
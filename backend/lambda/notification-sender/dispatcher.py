@@ -0,0 +1,190 @@
+"""
+Rate-limited Notification Dispatcher
+====================================
+Sends email and SMS concurrently instead of one message at a time. Each channel has
+its own worker pool and token bucket, sized to the provider limit:
+
+- email: the SES account's maximum send rate (SES_MAX_SEND_RATE messages/second)
+- sms:   the origination number's throughput (SMS_MPS messages/second)
+
+A bulk call that sends to N recipients takes N tokens, even when N exceeds the bucket's burst. Throttling errors are retried
+with backoff and counted; each channel reports its throughput, throttle count and
+send latency percentiles (per provider call, excluding rate-limit waits) at the end of
+the run.
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from botocore.exceptions import ClientError
+
+from metrics import Reservoir, summarize
+
+THROTTLE_ERROR_CODES = {
+    'Throttling',  # SES: "Maximum sending rate exceeded"
+    'ThrottlingException',
+    'TooManyRequestsException',
+    'LimitExceededException',
+}
+
+
+def is_throttle_error(error):
+    if not isinstance(error, ClientError):
+        return False
+    return error.response.get('Error', {}).get('Code', '') in THROTTLE_ERROR_CODES
+
+
+class TokenBucket:
+    """Thread-safe token bucket: rate_per_second refill, up to burst tokens"""
+
+    def __init__(self, rate_per_second, burst=None):
+        self.rate_per_second = rate_per_second
+        self.burst = burst if burst is not None else max(1.0, rate_per_second)
+        self._tokens = self.burst
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` are paid for.
+
+        The full cost is always charged: a request larger than the tokens available (or
+        than burst, such as a 50-recipient bulk send) puts the bucket into debt, and the
+        caller waits until the debt has refilled. Later callers queue behind the debt, so
+        the sustained rate never exceeds rate_per_second.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate_per_second)
+            self._last_refill = now
+            self._tokens -= tokens
+            wait_for = -self._tokens / self.rate_per_second if self._tokens < 0 else 0.0
+        if wait_for > 0:
+            time.sleep(wait_for)
+
+
+class Channel:
+    """One delivery channel: bounded worker pool, token bucket and counters"""
+
+    def __init__(self, name, rate_per_second, workers, max_attempts=4, queue_depth=None):
+        self.name = name
+        self.bucket = TokenBucket(rate_per_second)
+        self.max_attempts = max_attempts
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-sender")
+        # Bound queued work so the caller cannot page far ahead of what is being sent
+        self._slots = threading.BoundedSemaphore(queue_depth or workers * 4)
+        self._lock = threading.Lock()
+        self._started = None
+        self._finished = None
+        self.sent = 0
+        self.failed = 0
+        self.throttled = 0
+        self.latencies = Reservoir()
+
+    def submit(self, func, *args, cost=1, **kwargs):
+        """Queue func(*args, **kwargs); returns a Future. Blocks while the queue is full."""
+        self._slots.acquire()
+        with self._lock:
+            if self._started is None:
+                self._started = time.monotonic()
+        try:
+            future = self._executor.submit(self._run, func, args, kwargs, cost)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _run(self, func, args, kwargs, cost):
+        for attempt in range(1, self.max_attempts + 1):
+            self.bucket.acquire(cost)
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                self._observe(time.perf_counter() - start)
+                if is_throttle_error(e):
+                    with self._lock:
+                        self.throttled += 1
+                    if attempt < self.max_attempts:
+                        time.sleep(min(0.2 * (2 ** attempt), 5.0))
+                        continue
+                self._record(failed=cost)
+                raise
+            self._observe(time.perf_counter() - start)
+            self._record(sent=cost)
+            return result
+
+    def _observe(self, latency):
+        with self._lock:
+            self.latencies.add(latency)
+
+    def _record(self, sent=0, failed=0):
+        with self._lock:
+            self.sent += sent
+            self.failed += failed
+            self._finished = time.monotonic()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def stats(self):
+        with self._lock:
+            elapsed = (self._finished - self._started) if self._started and self._finished else 0.0
+            stats = {
+                'Sent': self.sent,
+                'Failed': self.failed,
+                'Throttles': self.throttled,
+                'SendSeconds': round(elapsed, 3),
+                'MessagesPerSecond': round(self.sent / elapsed, 2) if elapsed > 0 else float(self.sent),
+            }
+            stats.update(summarize(self.latencies.samples, 'LatencyMs', 1000.0))
+            return stats
+
+
+class Dispatcher:
+    """Email and SMS channels sharing one lifecycle"""
+
+    def __init__(self, email_rate, email_workers, sms_rate, sms_workers):
+        self.channels = {
+            'email': Channel('email', email_rate, email_workers),
+            'sms': Channel('sms', sms_rate, sms_workers),
+        }
+
+    def submit(self, channel, func, *args, **kwargs):
+        return self.channels[channel].submit(func, *args, **kwargs)
+
+    def close(self):
+        """Wait for every queued message to finish"""
+        for channel in self.channels.values():
+            channel.shutdown()
+
+    def report(self):
+        """Per-channel stats, printed as a summary and as CloudWatch EMF lines"""
+        stats = {name: channel.stats() for name, channel in self.channels.items()}
+        for name, values in stats.items():
+            print(f"📊 {name}: {values['Sent']} sent, {values['Failed']} failed, "
+                  f"{values['Throttles']} throttled, {values['MessagesPerSecond']}/s, "
+                  f"p50 {values['LatencyMsP50']} ms, p99 {values['LatencyMsP99']} ms")
+            print(json.dumps(emf_record(name, values)))
+        return stats
+
+
+def emf_record(channel, values, namespace='JobSearch/NotificationSender'):
+    units = {'SendSeconds': 'Seconds', 'MessagesPerSecond': 'Count/Second'}
+    units.update({name: 'Milliseconds' for name in values if name.startswith('LatencyMs')})
+    record = {
+        '_aws': {
+            'Timestamp': int(datetime.now(timezone.utc).timestamp() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': namespace,
+                'Dimensions': [['Channel']],
+                'Metrics': [{'Name': name, 'Unit': units.get(name, 'Count')} for name in values],
+            }],
+        },
+        'Channel': channel,
+    }
+    record.update(values)
+    return record
@@ -6,21 +6,14 @@ Generates HTML and text email content for job recommendation notifications.
 import os
 from urllib.parse import quote
 
-def generate_html_email(first_name, category_display, job_recommendations, user_email=None, job_category=None, category_for_unsubscribe=None):
-    """Generate HTML email content for job recommendations"""
-    
-    # Create HTML email content
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <style>
-            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-            .container {{ max-width: 600px; margin: 0 auto; background-color: white; }}
-            .header {{ background: linear-gradient(135deg, #8B1538, #FFC627); color: white; padding: 20px; text-align: center; }}
-            .content {{ padding: 20px; }}
-            .greeting {{ font-size: 18px; margin-bottom: 20px; color: #8B1538; }}
-            .job-item {{ 
+# Shared by the rendered emails and the SES digest template (ses_templates.py)
+EMAIL_STYLES = """\
+            body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+            .container { max-width: 600px; margin: 0 auto; background-color: white; }
+            .header { background: linear-gradient(135deg, #8B1538, #FFC627); color: white; padding: 20px; text-align: center; }
+            .content { padding: 20px; }
+            .greeting { font-size: 18px; margin-bottom: 20px; color: #8B1538; }
+            .job-item { 
                 border: 1px solid #e0e0e0; 
                 border-radius: 8px; 
                 margin-bottom: 20px; 
@@ -28,75 +21,75 @@ def generate_html_email(first_name, category_display, job_recommendations, user_
                 background: white; 
                 box-shadow: 0 2px 4px rgba(0,0,0,0.1);
                 border-left: 4px solid #FFC627;
-            }}
-            .job-header {{ display: flex; justify-content: space-between; align-items: flex-start; margin-bottom: 8px; }}
-            .job-title {{ 
+            }
+            .job-header { display: flex; justify-content: space-between; align-items: flex-start; margin-bottom: 8px; }
+            .job-title { 
                 font-size: 18px; 
                 font-weight: bold; 
                 color: #333; 
                 margin: 0;
                 line-height: 1.3;
-            }}
-            .job-company {{ 
+            }
+            .job-company { 
                 color: #666; 
                 font-size: 14px; 
                 margin-bottom: 12px; 
                 font-weight: 500;
-            }}
-            .job-meta {{ 
+            }
+            .job-meta { 
                 display: flex; 
                 flex-wrap: wrap; 
                 gap: 15px; 
                 margin-bottom: 12px; 
                 font-size: 13px;
                 color: #666;
-            }}
-            .job-meta span {{ 
+            }
+            .job-meta span { 
                 display: inline-flex; 
                 align-items: center; 
                 gap: 4px;
-            }}
-            .job-location {{ color: #666; }}
-            .job-salary {{ color: #2d5016; font-weight: 500; }}
-            .job-category {{ color: #666; }}
-            .job-type {{ 
+            }
+            .job-location { color: #666; }
+            .job-salary { color: #2d5016; font-weight: 500; }
+            .job-category { color: #666; }
+            .job-type { 
                 background: #f0f0f0; 
                 padding: 2px 8px; 
                 border-radius: 12px; 
                 font-size: 12px;
                 color: #333;
-            }}
-            .job-description {{ 
+            }
+            .job-description { 
                 color: #333; 
                 line-height: 1.5; 
                 margin-bottom: 12px; 
                 font-size: 14px;
-            }}
-            .job-requirements {{ 
+            }
+            .job-requirements { 
                 color: #333; 
                 font-size: 13px; 
                 margin-bottom: 12px; 
                 line-height: 1.4;
-            }}
-            .match-section {{ 
+            }
+            .match-section { 
                 background: #f8f9fa; 
                 border-radius: 6px; 
                 padding: 12px; 
                 margin: 15px 0; 
                 border-left: 3px solid #8B1538;
-            }}
-            .match-title {{ 
+            }
+            .match-title { 
                 font-weight: bold; 
                 color: #8B1538; 
                 font-size: 14px; 
                 margin-bottom: 6px;
-            }}
-            .match-text {{ 
+            }
+            .match-text { 
                 color: #333; 
                 font-size: 13px; 
                 line-height: 1.4;
-            }}
-            .apply-btn {{ 
+            }
+            .apply-btn { 
                 background: #8B1538; 
                 color: white !important; 
                 padding: 10px 20px; 
@@ -108,10 +101,21 @@ def generate_html_email(first_name, category_display, job_recommendations, user_
                 margin-top: 10px;
                 border: none;
                 cursor: pointer;
-            }}
-            .apply-btn:hover {{ background: #6B1028; color: white !important; }}
-            .footer {{ background-color: #f8f8f8; padding: 15px; text-align: center; color: #666; }}
-        </style>
+            }
+            .apply-btn:hover { background: #6B1028; color: white !important; }
+            .footer { background-color: #f8f8f8; padding: 15px; text-align: center; color: #666; }
+"""
+
+def generate_html_email(first_name, category_display, job_recommendations, user_email=None, job_category=None, category_for_unsubscribe=None):
+    """Generate HTML email content for job recommendations"""
+    
+    # Create HTML email content
+    html_content = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <style>
+{EMAIL_STYLES}        </style>
     </head>
     <body>
         <div class="container">
@@ -128,6 +132,131 @@ def generate_html_email(first_name, category_display, job_recommendations, user_
     """
     
     # Add job listings from jobInformation field - show ALL jobs in each recommendation
+    html_content += _html_job_cards(job_recommendations)
+    
+    html_content += f"""
+                </div>
+                
+                <p style="margin-top: 20px;">Ready to take the next step? These opportunities are waiting for you!</p>
+            </div>
+            
+            <div class="footer">
+    """
+    
+    # Add opt-out links if user_email is provided
+    if user_email:
+        html_content += _html_optout_links(user_email, [(job_category, category_display, category_for_unsubscribe)])
+    
+    html_content += """
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+    
+    return html_content
+
+
+
+def join_category_names(names):
+    """Join category names for a sentence: A / A and B / A, B and C"""
+    names = list(names)
+    if len(names) <= 1:
+        return ''.join(names)
+    return f"{', '.join(names[:-1])} and {names[-1]}"
+
+
+def generate_html_digest(first_name, sections, user_email=None):
+    """Generate one HTML email covering several job categories.
+    
+    sections is a list of (job_category, category_display, job_recommendations); each
+    category gets its own heading and job list.
+    """
+    categories_display = join_category_names(display for _, display, _ in sections)
+    
+    html_content = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <style>
+{EMAIL_STYLES}        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                <h1>Your Daily Job Recommendations</h1>
+            </div>
+            
+            <div class="content">
+                <div class="greeting">Good morning, {first_name}! 👋</div>
+                
+                <p style="color: #8B1538; font-weight: 500;">Here are your personalized {categories_display.lower()} recommendations for today:</p>
+    """
+    
+    for _, category_display, job_recommendations in sections:
+        html_content += f"""
+                <h2 style="color: #8B1538; font-size: 20px; border-bottom: 2px solid #FFC627; padding-bottom: 6px; margin: 25px 0 15px;">{category_display}</h2>
+                <div class="job-list">
+        """
+        html_content += _html_job_cards(job_recommendations)
+        html_content += """
+                </div>
+        """
+    
+    html_content += f"""
+                <p style="margin-top: 20px;">Ready to take the next step? These opportunities are waiting for you!</p>
+            </div>
+            
+            <div class="footer">
+    """
+    
+    # Add opt-out links if user_email is provided (one per category plus "all")
+    if user_email:
+        html_content += _html_optout_links(user_email, [(job_category, category_display, category_display) for job_category, category_display, _ in sections])
+    
+    html_content += """
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+    
+    return html_content
+
+
+def generate_text_digest(first_name, sections, user_email=None):
+    """Generate the plain text version of generate_html_digest"""
+    categories_display = join_category_names(display for _, display, _ in sections)
+    
+    text_content = f"""
+Good morning, {first_name}!
+
+Here are your personalized {categories_display.lower()} recommendations for today:
+
+"""
+    
+    job_counter = 1
+    for _, category_display, job_recommendations in sections:
+        text_content += f"""
+== {category_display} ==
+"""
+        section_text, job_counter = _text_job_list(job_recommendations, job_counter)
+        text_content += section_text
+    
+    text_content += """
+Ready to take the next step? These opportunities are waiting for you!
+
+"""
+    
+    # Add opt-out links if user_email is provided (one per category plus "all")
+    if user_email:
+        text_content += _text_optout_links(user_email, [(job_category, category_display, category_display) for job_category, category_display, _ in sections])
+    
+    return text_content
+
+def _html_job_cards(job_recommendations):
+    """HTML job cards for all jobs in the recommendations"""
+    html_content = ""
     job_counter = 1
     for rec in job_recommendations:
         job_information = rec.get('jobInformation', [])
@@ -194,24 +323,20 @@ def generate_html_email(first_name, category_display, job_recommendations, user_
                     </div>
             """
     
-    html_content += f"""
-                </div>
-                
-                <p style="margin-top: 20px;">Ready to take the next step? These opportunities are waiting for you!</p>
-            </div>
-            
-            <div class="footer">
-    """
+    return html_content
+
+
+def _html_optout_links(user_email, categories):
+    """Unsubscribe links for the footer; categories holds (job_category, category_display, category_for_unsubscribe)"""
+    html_content = ""
+    base_url = os.environ.get('AMPLIFY_APP_URL', 'https://your-amplify-app-url.com')
+    encoded_email = quote(user_email)
     
-    # Add opt-out links if user_email is provided
-    if user_email:
-        base_url = os.environ.get('AMPLIFY_APP_URL', 'https://your-amplify-app-url.com')
-        encoded_email = quote(user_email)
-        
-        # Link to opt out of all notifications
-        optout_all_url = f"{base_url}/unsubscribe?email={encoded_email}&action=all"
-        
-        # Link to opt out of specific job category
+    # Link to opt out of all notifications
+    optout_all_url = f"{base_url}/unsubscribe?email={encoded_email}&action=all"
+    
+    # Link to opt out of each specific job category
+    for job_category, category_display, category_for_unsubscribe in categories:
         if job_category and job_category != 'general':
             # Use category_display (e.g., "Software Engineer") instead of job_category (e.g., "software-engineer")
             category_to_encode = category_for_unsubscribe if category_for_unsubscribe else category_display
@@ -222,8 +347,8 @@ def generate_html_email(first_name, category_display, job_recommendations, user_
                     <a href="{optout_category_url}" style="color: #666; text-decoration: underline;">Unsubscribe from {category_display} notifications</a>
                 </p>
             """
-        
-        html_content += f"""
+    
+    html_content += f"""
                 <p style="font-size: 12px; margin: 5px 0;">
                     <a href="{optout_all_url}" style="color: #666; text-decoration: underline;">Unsubscribe from all job notifications</a>
                 </p>
@@ -231,14 +356,6 @@ def generate_html_email(first_name, category_display, job_recommendations, user_
                     You can also manage your communication preferences (email/SMS) from the unsubscribe page.
                 </p>
         """
-    
-    html_content += """
-            </div>
-        </div>
-    </body>
-    </html>
-    """
-    
     return html_content
 
 
@@ -253,7 +370,23 @@ Here are your personalized {category_display.lower()} recommendations for today:
 
 """
     
-    job_counter = 1
+    text_content += _text_job_list(job_recommendations)[0]
+    
+    text_content += """
+Ready to take the next step? These opportunities are waiting for you!
+
+"""
+    
+    # Add opt-out links if user_email is provided
+    if user_email:
+        text_content += _text_optout_links(user_email, [(job_category, category_display, category_for_unsubscribe)])
+    
+    return text_content
+
+
+def _text_job_list(job_recommendations, job_counter=1):
+    """Numbered plain text job list; returns (text, next job number)"""
+    text_content = ""
     for rec in job_recommendations:
         job_information = rec.get('jobInformation', [])
         if job_information and len(job_information) > 0:
@@ -281,32 +414,28 @@ Here are your personalized {category_display.lower()} recommendations for today:
 """
                 job_counter += 1
     
-    text_content += """
-Ready to take the next step? These opportunities are waiting for you!
+    return text_content, job_counter
 
-"""
+
+def _text_optout_links(user_email, categories):
+    """Plain text unsubscribe links; categories holds (job_category, category_display, category_for_unsubscribe)"""
+    base_url = os.environ.get('AMPLIFY_APP_URL', 'https://your-amplify-app-url.com')
+    encoded_email = quote(user_email)
     
-    # Add opt-out links if user_email is provided
-    if user_email:
-        base_url = os.environ.get('AMPLIFY_APP_URL', 'https://your-amplify-app-url.com')
-        encoded_email = quote(user_email)
-        
-        # Link to opt out of all notifications
-        optout_all_url = f"{base_url}/unsubscribe?email={encoded_email}&action=all"
-        
-        text_content += "---\n"
-        
-        # Link to opt out of specific job category
+    # Link to opt out of all notifications
+    optout_all_url = f"{base_url}/unsubscribe?email={encoded_email}&action=all"
+    
+    text_content = "---\n"
+    
+    # Link to opt out of each specific job category
+    for job_category, category_display, category_for_unsubscribe in categories:
         if job_category and job_category != 'general':
             # Use category_display (e.g., "Software Engineer") instead of job_category (e.g., "software-engineer")
             category_to_encode = category_for_unsubscribe if category_for_unsubscribe else category_display
             encoded_category = quote(category_to_encode)
             optout_category_url = f"{base_url}/unsubscribe?email={encoded_email}&action=category&category={encoded_category}"
             text_content += f"Unsubscribe from {category_display} notifications: {optout_category_url}\n\n"
-        
-        text_content += f"Unsubscribe from all job notifications: {optout_all_url}\n\n"
-        text_content += "You can also manage your communication preferences (email/SMS) from the unsubscribe page.\n"
     
+    text_content += f"Unsubscribe from all job notifications: {optout_all_url}\n\n"
+    text_content += "You can also manage your communication preferences (email/SMS) from the unsubscribe page.\n"
     return text_content
-
-
@@ -0,0 +1,115 @@
+"""
+Sharded Notification Fan-out
+============================
+Splits one notification run across many worker invocations (NOTIFICATION_MODE=fanout):
+
+1. The coordinator (the scheduled invocation) pages opted-in users with unsent
+   recommendations and enqueues them to the shard queue, SHARD_SIZE users per message
+2. Each message is delivered by a worker invocation of the same Lambda, triggered by the
+   queue; workers run in parallel, up to the event source's maximum concurrency
+3. Every shard adds its delivery counts to the run's SUMMARY item in the run table, so
+   a run's totals are available once its last shard completes
+
+A shard that fails is returned to the queue; its users' already-delivered recommendations
+have left the pending index and the run's send ledger (run_ledger.py) skips sends that
+went out before marking, so a retry only sends what is still unsent.
+"""
+
+import json
+import time
+from datetime import datetime, timezone
+
+SUMMARY_KEY = 'SUMMARY'
+SEND_BATCH_SIZE = 10  # SendMessageBatch accepts at most 10 entries
+SEND_MAX_ATTEMPTS = 4
+
+# Counters each shard adds to the run summary
+TOTAL_COUNTERS = ('email_sent', 'sms_sent', 'skipped', 'failed', 'marked', 'mark_failed')
+
+
+def iter_shards(emails, shard_size):
+    """Group a stream of emails into lists of at most shard_size"""
+    shard = []
+    for email in emails:
+        shard.append(email)
+        if len(shard) >= shard_size:
+            yield shard
+            shard = []
+    if shard:
+        yield shard
+
+
+def shard_message(run_id, shard_index, users):
+    return json.dumps({'runId': run_id, 'shardIndex': shard_index, 'users': users})
+
+
+def parse_shard_message(record):
+    """(run_id, shard_index, users) from an SQS record of the shard queue"""
+    body = json.loads(record['body'])
+    return body['runId'], body.get('shardIndex'), body.get('users', [])
+
+
+def enqueue_shards(sqs_client, queue_url, run_id, shards):
+    """Send shards to the queue with SendMessageBatch, retrying entries SQS reports as failed.
+
+    Returns (shards_enqueued, users_enqueued, shards_failed).
+    """
+    enqueued = users = failed = 0
+    batch = []
+
+    def flush(batch):
+        entries = {str(index): (shard_message(run_id, index, shard), len(shard)) for index, shard in batch}
+        sent_shards = sent_users = 0
+        for attempt in range(1, SEND_MAX_ATTEMPTS + 1):
+            response = sqs_client.send_message_batch(
+                QueueUrl=queue_url,
+                Entries=[{'Id': entry_id, 'MessageBody': body} for entry_id, (body, _) in entries.items()]
+            )
+            for success in response.get('Successful', []):
+                sent_shards += 1
+                sent_users += entries.pop(success['Id'])[1]
+            if not entries:
+                break
+            if attempt < SEND_MAX_ATTEMPTS:
+                time.sleep(min(0.1 * (2 ** attempt), 2.0))
+        for failure in response.get('Failed', []):
+            print(f"❌ Failed to enqueue shard {failure['Id']} of {run_id}: {failure.get('Message')}")
+        return sent_shards, sent_users, len(entries)
+
+    for shard_index, shard in enumerate(shards):
+        batch.append((shard_index, shard))
+        if len(batch) >= SEND_BATCH_SIZE:
+            sent_shards, sent_users, failed_shards = flush(batch)
+            enqueued, users, failed = enqueued + sent_shards, users + sent_users, failed + failed_shards
+            batch = []
+    if batch:
+        sent_shards, sent_users, failed_shards = flush(batch)
+        enqueued, users, failed = enqueued + sent_shards, users + sent_users, failed + failed_shards
+    return enqueued, users, failed
+
+
+def start_run(run_table, run_id, shards_total, users_total):
+    """Record how many shards the coordinator enqueued; counters already added by fast workers are kept"""
+    run_table.update_item(
+        Key={'runId': run_id, 'itemKey': SUMMARY_KEY},
+        UpdateExpression='SET shardsTotal = :shards, usersTotal = :users, startedAt = if_not_exists(startedAt, :now)',
+        ExpressionAttributeValues={
+            ':shards': shards_total,
+            ':users': users_total,
+            ':now': datetime.now(timezone.utc).isoformat(),
+        }
+    )
+
+
+def record_shard(run_table, run_id, totals):
+    """Atomically add one shard's delivery counts to the run summary; returns the updated summary"""
+    values = {f":{name}": totals.get(name, 0) for name in TOTAL_COUNTERS}
+    values.update({':one': 1, ':users': totals.get('users', 0), ':now': datetime.now(timezone.utc).isoformat()})
+    response = run_table.update_item(
+        Key={'runId': run_id, 'itemKey': SUMMARY_KEY},
+        UpdateExpression=('ADD ' + ', '.join(f"{name} :{name}" for name in TOTAL_COUNTERS)
+                          + ', shardsCompleted :one, usersProcessed :users SET updatedAt = :now'),
+        ExpressionAttributeValues=values,
+        ReturnValues='ALL_NEW'
+    )
+    return response.get('Attributes', {})
@@ -4,217 +4,690 @@ COMMUNICATION BATCH PROCESS - EMAIL NOTIFICATIONS
 Sends daily job recommendation emails to all users with job recommendations every morning at 9 AM.
 
 Simple workflow:
-1. Get job recommendations from DynamoDB table
-2. Send personalized emails to all users with job recommendations
-3. Use environment variables for all configuration
+1. Page through unsent job recommendations in the sparse pending index (reads scale with unsent items)
+2. Join each user's recommendations with their profile (batched lookups, bounded memory)
+3. Send personalized emails/SMS to opted-in users while paging continues, concurrently
+   per channel and paced to the SES and SMS provider limits (dispatcher.py)
+4. Use environment variables for all configuration
+5. Emit per-stage timings, counts and latency percentiles as CloudWatch EMF (metrics.py)
+6. Record a checkpoint and a send ledger per daily run (run_ledger.py), so a retried
+   run resumes after the last settled user and never repeats a delivered send
+7. Resolve recommendations saved as job catalog references into full postings
+   (job_catalog.py), once per profile batch
+
+With NOTIFICATION_MODE=fanout the scheduled run only enqueues shards of users, and
+worker invocations triggered by the shard queue deliver them in parallel (fanout.py).
 """
 
 import json
-import boto3
-import os
-from boto3.dynamodb.conditions import Attr
-from email_template import generate_html_email, generate_text_email
-
-# Initialize AWS clients
-dynamodb = boto3.resource('dynamodb')
-ses = boto3.client('ses')
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+from email_template import (generate_html_digest, generate_html_email, generate_text_digest,
+                            generate_text_email, join_category_names)
+from ses_templates import MAX_BULK_DESTINATIONS, digest_template_data, ensure_digest_template, send_bulk_chunk
+from dispatcher import Dispatcher
+from fanout import enqueue_shards, iter_shards, parse_shard_message, record_shard, start_run
+from run_ledger import CLAIMED, FAILED, IN_FLIGHT, SENT, SKIPPED, RunLedger, ledger_key, run_id_for
+from metrics import RunMetrics
+from jobsearch_common import env_bool, env_choice, env_float, env_int, env_str, lazy_client, lazy_resource, sanitize_email_for_actor_id
+from jobsearch_common.job_codec import decode_job_information
+from jobsearch_common.job_catalog import JOB_CATALOG_TABLE_NAME, JobCatalog
+from jobsearch_common.pending_index import PENDING_INDEX_SHARDS, pending_shard_for
+from jobsearch_common.retention import not_expired_filter
+
+# AWS clients, created on first use by the layer's client registry: a run only pays for
+# the services it calls (e.g. no SMS client without SMS users, no SQS outside fan-out)
+dynamodb = lazy_resource('dynamodb')
+if env_bool('SES_STUB'):
+    # Local runs: render and record emails instead of sending them
+    from ses_stub import StubSESClient
+    ses = StubSESClient(outbox=env_str('SES_STUB_OUTBOX'))
+else:
+    ses = lazy_client('ses')
 # AWS End User Messaging SMS Voice v2 client
-sms_voice_v2 = boto3.client('pinpoint-sms-voice-v2')
+sms_voice_v2 = lazy_client('pinpoint-sms-voice-v2')
+sqs = lazy_client('sqs')
+
+# Sparse GSI holding only unsent recommendations (keys: jobsearch_common/pending_index.py)
+PENDING_INDEX_NAME = env_str('PENDING_INDEX_NAME', 'PendingRecommendationsIndex')
+
+# 'single' renders each email here and calls SendEmail; 'bulk' sends an SES template
+# with SendBulkTemplatedEmail, up to 50 destinations per call
+EMAIL_SEND_MODE = env_choice('EMAIL_SEND_MODE', 'single', ('single', 'bulk'))
+
+# Digest mode: one email and one SMS per user with a section per job category, instead
+# of one per (user, category)
+DIGEST_MODE = env_bool('DIGEST_MODE')
+
+# Provider limits for the concurrent dispatcher: SES account max send rate and the
+# origination number's SMS throughput (messages per second)
+SES_MAX_SEND_RATE = env_float('SES_MAX_SEND_RATE', 14.0)
+EMAIL_WORKERS = env_int('EMAIL_WORKERS', 8)
+SMS_MPS = env_float('SMS_MPS', 1.0)
+SMS_WORKERS = env_int('SMS_WORKERS', 2)
+# Longest SMS body a digest may produce (default three concatenated GSM-7 segments);
+# digest SMS link each category's recommendations while they fit
+SMS_MAX_LENGTH = env_int('SMS_MAX_LENGTH', 459)
+
+# 'single' delivers the whole run in the scheduled invocation; 'fanout' enqueues shards
+# of SHARD_SIZE users and lets up to WORKER_CONCURRENCY worker invocations deliver them.
+# Each worker takes an equal share of the SES and SMS rates.
+NOTIFICATION_MODE = env_choice('NOTIFICATION_MODE', 'single', ('single', 'fanout'))
+SHARD_QUEUE_URL = env_str('SHARD_QUEUE_URL')
+SHARD_SIZE = env_int('SHARD_SIZE', 50)
+NOTIFICATION_RUN_TABLE_NAME = env_str('NOTIFICATION_RUN_TABLE_NAME')
+WORKER_CONCURRENCY = env_int('WORKER_CONCURRENCY', 4)
+
+# Stage timings and latency samples of the current run (or shard), reset per run
+run_metrics = RunMetrics()
+
+# Users whose profiles are fetched together with one BatchGetItem (max 100 keys)
+PROFILE_BATCH_SIZE = 25
+PROFILE_BATCH_MAX_ATTEMPTS = 8
+
+# Postings of recommendations saved with jobRefs; cached across users and warm invocations
+_job_catalog = None
+
+# Concurrent conditional updates used to mark recommendations as sent
+MARK_SENT_CONCURRENCY = env_int('MARK_SENT_CONCURRENCY', 16)
+MARK_SENT_MAX_ATTEMPTS = 4
+# Pool for those updates, created on first use and kept across users and warm invocations
+_mark_executor = None
+RETRYABLE_ERROR_CODES = {'ProvisionedThroughputExceededException', 'ThrottlingException',
+                         'RequestLimitExceeded', 'InternalServerError', 'ServiceUnavailable'}
 
 def lambda_handler(event, context):
     """Send daily job recommendations to opted-in users via their preferred communication method"""
     
+    # Worker invocation: deliver the user shards enqueued by a fan-out run
+    if event and event.get('Records'):
+        return process_shard_records(event['Records'])
+    
     try:
         # Get configuration from environment variables (no hardcoding)
-        job_recommendations_table_name = os.environ.get('JOB_RECOMMENDATIONS_TABLE_NAME')
-        student_profile_table_name = os.environ.get('STUDENT_PROFILE_TABLE_NAME')
-        sender_email = os.environ.get('SENDER_EMAIL')
+        job_recommendations_table_name = env_str('JOB_RECOMMENDATIONS_TABLE_NAME')
+        student_profile_table_name = env_str('STUDENT_PROFILE_TABLE_NAME')
+        sender_email = env_str('SENDER_EMAIL')
         
         if not all([job_recommendations_table_name, student_profile_table_name, sender_email]):
             raise ValueError("Missing required environment variables")
         
-        print(f"📧 Starting notification process...")
+        print(f"📧 Starting notification process (email mode: {EMAIL_SEND_MODE}, digest: {DIGEST_MODE})...")
+        
+        bulk_email = EMAIL_SEND_MODE == 'bulk'
+        if bulk_email:
+            ensure_digest_template(ses)
         
         # Get tables
         job_table = dynamodb.Table(job_recommendations_table_name)
-        profile_table = dynamodb.Table(student_profile_table_name)
         
-        # Step 1: Scan student profile table for opted-in users
-        print(f"🔍 Scanning student profiles for opted-in users...")
-        profile_response = profile_table.scan(
-            FilterExpression=Attr('optInStatus').eq(True)
-        )
+        # Fan-out mode: this invocation only splits the run into shards for the workers
+        if NOTIFICATION_MODE == 'fanout':
+            return coordinate_run(event, job_table, student_profile_table_name)
         
-        opted_in_users = profile_response['Items']
-        print(f"📊 Found {len(opted_in_users)} opted-in users")
+        # Stream users with unsent recommendations out of the pending index and join each
+        # batch of users with their profiles, so memory stays bounded and sending starts
+        # while later pages are still being read
+        print(f"🔍 Streaming unsent job recommendations joined with opted-in profiles...")
         
-        if not opted_in_users:
-            return {
-                'statusCode': 200,
-                'body': json.dumps('No opted-in users found')
-            }
+        # Resume after the last settled user if an earlier attempt of today's run stopped partway
+        ledger = None
+        resume_after = None
+        if NOTIFICATION_RUN_TABLE_NAME:
+            ledger = RunLedger(dynamodb.Table(NOTIFICATION_RUN_TABLE_NAME), run_id_for(event))
+            resume_after = ledger.resume_point()
+            if resume_after:
+                print(f"⏩ Resuming {ledger.run_id} after {resume_after}")
         
-        # Step 2: Get all unsent job recommendations
-        print(f"🔍 Scanning for unsent job recommendations...")
-        job_response = job_table.scan(
-            FilterExpression=Attr('sentToUser').eq(False)
-        )
+        users = iter_opted_in_users_with_pending(job_table, student_profile_table_name, start_after=resume_after)
+        totals = deliver_notifications(users, job_table, sender_email, bulk_email, ledger=ledger)
+        if ledger is not None:
+            ledger.save_checkpoint(completed=True)
         
-        unsent_jobs = job_response['Items']
-        print(f"📊 Found {len(unsent_jobs)} unsent job recommendations")
+        print(f"📊 Processed {totals['users']} opted-in users with unsent job recommendations")
         
-        if not unsent_jobs:
-            return {
-                'statusCode': 200,
-                'body': json.dumps('No unsent job recommendations')
-            }
-        
-        # Group unsent jobs by email and job category
-        jobs_by_user = {}
-        for job in unsent_jobs:
-            email = job.get('email')
-            job_category = job.get('jobCategory', 'general')
-            
-            if email and '@' in email:
-                if email not in jobs_by_user:
-                    jobs_by_user[email] = {}
-                if job_category not in jobs_by_user[email]:
-                    jobs_by_user[email][job_category] = []
-                jobs_by_user[email][job_category].append(job)
+        result = (f"Sent {totals['email_sent']} emails, {totals['sms_sent']} SMS messages, {totals['failed']} failed, "
+                  f"{totals['skipped']} already sent; "
+                  f"marked {totals['marked']} recommendations as sent, {totals['mark_failed']} not marked")
+        print(f"📊 {result}")
         
-        # Step 3: Process notifications for opted-in users with unsent jobs
-        email_sent_count = 0
-        sms_sent_count = 0
-        failed_count = 0
+        return {
+            'statusCode': 200,
+            'body': json.dumps(result)
+        }
         
-        for user_profile in opted_in_users:
+    except Exception as e:
+        error_msg = f"Error in notification sender: {str(e)}"
+        print(f"❌ {error_msg}")
+        return {
+            'statusCode': 500,
+            'body': json.dumps(error_msg)
+        }
+
+def deliver_notifications(users, job_table, sender_email, bulk_email, email_rate=None, sms_rate=None, ledger=None, mode='single'):
+    """Send notifications for (user_profile, {job_category: [recommendations]}) pairs.
+    
+    With a RunLedger, sends already delivered in this run are skipped and the run's
+    checkpoint advances as users are settled.
+    
+    Returns the run totals: users, email_sent, sms_sent, skipped, failed, marked, mark_failed.
+    Stage metrics are reported as EMF under the given mode.
+    """
+    run_metrics.reset()
+    email_rate = email_rate or SES_MAX_SEND_RATE
+    sms_rate = sms_rate or SMS_MPS
+    totals = {'users': 0, 'email_sent': 0, 'sms_sent': 0, 'skipped': 0, 'failed': 0, 'marked': 0, 'mark_failed': 0}
+    # Bulk mode: (email, template_data, jobs, ledger_key) waiting for the next SendBulkTemplatedEmail call
+    bulk_batch = []
+    # Sends still in flight, oldest first; settled (counted and marked) in order
+    pending = deque()
+    
+    # Email and SMS go out concurrently, each channel paced to its provider limit
+    dispatcher = Dispatcher(email_rate, EMAIL_WORKERS, sms_rate, SMS_WORKERS)
+    
+    # Time blocked on a full channel queue means the run is bound by the provider rate
+    def submit(channel, key, func, *args):
+        with run_metrics.stage('SendBackpressure'):
+            if ledger is None:
+                return dispatcher.submit(channel, func, *args)
+            return dispatcher.submit(channel, ledger.send_once, key, func, *args)
+    
+    def flush_bulk_batch(batch, checkpoint):
+        with run_metrics.stage('SendBackpressure'):
+            future = dispatcher.submit('email', send_bulk_batch, sender_email, batch, ledger, cost=len(batch))
+        pending.append({'sends': [('bulk', f"{len(batch)} destinations", future)], 'jobs': [], 'batch': batch,
+                        'checkpoint': checkpoint})
+    
+    try:
+        user_email = None
+        for user_profile, categories in users:
+            totals['users'] += 1
+            run_metrics.count('UsersNotified')
             user_email = user_profile.get('email')
             communication_method = user_profile.get('communicationMethod', 'email')
             phone = user_profile.get('phone')
             
-            # Check if user has unsent jobs
-            if user_email not in jobs_by_user:
-                continue
-            
-            categories = jobs_by_user[user_email]
-            
             try:
-                # Send notifications for each job category
-                for job_category, jobs in categories.items():
+                # Send notifications for each job category, or for all of them at once in digest mode
+                groups = [list(categories.items())] if DIGEST_MODE else [[item] for item in categories.items()]
+                for group in groups:
+                    jobs = [job for _, category_jobs in group for job in category_jobs]
+                    group_label = ', '.join(job_category for job_category, _ in group)
+                    sends = []
+                    
                     # Send email if communication method is 'email' or 'both'
-                    if communication_method in ['email', 'both']:
-                        try:
-                            send_job_email(user_email, jobs, user_profile, sender_email, job_category)
-                            email_sent_count += 1
-                            print(f"✅ Email sent to {user_email} for {job_category} jobs")
-                        except Exception as e:
-                            print(f"❌ Failed to send email to {user_email}: {str(e)}")
-                            failed_count += 1
+                    if communication_method in ['email', 'both'] and bulk_email:
+                        with run_metrics.stage('Render', sample='RenderLatency'):
+                            first_name, sections = email_sections(user_profile, group)
+                            template_data = digest_template_data(first_name, sections, user_email)
+                        bulk_batch.append((user_email, template_data, jobs, ledger_key(user_email, group_label, 'email')))
+                    elif communication_method in ['email', 'both'] and len(group) > 1:
+                        future = submit('email', ledger_key(user_email, group_label, 'email'),
+                                        send_digest_email, user_email, group, user_profile, sender_email)
+                        sends.append(('email', f"{user_email} for {group_label} jobs", future))
+                    elif communication_method in ['email', 'both']:
+                        job_category, category_jobs = group[0]
+                        future = submit('email', ledger_key(user_email, group_label, 'email'),
+                                        send_job_email, user_email, category_jobs, user_profile, sender_email, job_category)
+                        sends.append(('email', f"{user_email} for {group_label} jobs", future))
                     
                     # Send SMS if communication method is 'phone' or 'both'
                     if communication_method in ['phone', 'both'] and phone:
-                        try:
-                            send_sms_notification(phone, user_profile.get('fullName', 'Job Seeker'), jobs, job_category, user_email)
-                            sms_sent_count += 1
-                            print(f"✅ SMS sent to {phone} for {user_email}")
-                        except Exception as e:
-                            print(f"❌ Failed to send SMS to {phone}: {str(e)}")
-                            failed_count += 1
+                        sms_key = ledger_key(user_email, group_label, 'sms')
+                        if len(group) > 1:
+                            sms_sections = [(email_greeting(user_profile, job_category)[1], category_jobs) for job_category, category_jobs in group]
+                            future = submit('sms', sms_key, send_sms_notification, phone, user_profile.get('fullName', 'Job Seeker'), jobs, None, user_email, sms_sections)
+                        else:
+                            future = submit('sms', sms_key, send_sms_notification, phone, user_profile.get('fullName', 'Job Seeker'), jobs, group[0][0], user_email)
+                        sends.append(('sms', f"{phone} for {user_email}", future))
                     
-                    # Mark jobs as sent only after successful notification
-                    if communication_method in ['email', 'both'] or (communication_method == 'phone' and phone):
-                        mark_jobs_as_sent(jobs, job_table)
+                    # Mark jobs as sent only after every notification of the group has gone out
+                    # (bulk emails are marked per destination once their batch has been sent)
+                    if (communication_method in ['email', 'both'] and not bulk_email) or (communication_method == 'phone' and phone):
+                        pending.append({'sends': sends, 'jobs': jobs})
+                    elif sends:
+                        pending.append({'sends': sends, 'jobs': []})
                     
             except Exception as e:
-                failed_count += 1
+                totals['failed'] += 1
                 print(f"❌ Failed to process notifications for {user_email}: {str(e)}")
+                # Keeps the checkpoint before this user
+                pending.append({'sends': [], 'jobs': [], 'delivered': False})
+            
+            if len(bulk_batch) >= MAX_BULK_DESTINATIONS:
+                flush_bulk_batch(bulk_batch, user_email)
+                bulk_batch = []
+            elif not bulk_email:
+                # Settles after all of this user's sends, so the checkpoint never passes an unsent user
+                pending.append({'sends': [], 'jobs': [], 'checkpoint': user_email})
+            
+            settle_sends(pending, job_table, totals, ledger)
         
-        result = f'Sent {email_sent_count} emails, {sms_sent_count} SMS messages, {failed_count} failed'
-        print(f"📊 {result}")
-        
-        return {
-            'statusCode': 200,
-            'body': json.dumps(result)
+        if bulk_batch:
+            flush_bulk_batch(bulk_batch, user_email)
+    finally:
+        with run_metrics.stage('SendDrain'):
+            dispatcher.close()
+    
+    settle_sends(pending, job_table, totals, ledger, wait=True)
+    dispatcher.report()
+    if _job_catalog:
+        print(f"📊 Job catalog cache: {_job_catalog.stats()}")
+    print(json.dumps(run_metrics.report(mode)))
+    return totals
+
+def send_bulk_batch(sender_email, batch, ledger=None):
+    """Send a bulk batch, leaving out destinations the ledger shows as already delivered.
+    
+    Returns one status per destination: 'Success', SKIPPED (delivered earlier), IN_FLIGHT
+    (claimed by another attempt) or the SES error status.
+    """
+    statuses = [None] * len(batch)
+    to_send = []
+    for i, (_, _, _, key) in enumerate(batch):
+        claim = CLAIMED if ledger is None else ledger.claim(key)
+        if claim == CLAIMED:
+            to_send.append(i)
+        else:
+            statuses[i] = SKIPPED if claim == SENT else IN_FLIGHT
+    if not to_send:
+        return statuses
+    try:
+        sent = send_bulk_chunk(ses, sender_email, [(batch[i][0], batch[i][1]) for i in to_send])
+    except Exception:
+        if ledger is not None:
+            for i in to_send:
+                ledger.record(batch[i][3], FAILED)
+        raise
+    for i, status in zip(to_send, sent):
+        statuses[i] = status
+        if ledger is not None:
+            ledger.record(batch[i][3], SENT if status == 'Success' else FAILED)
+    return statuses
+
+def coordinate_run(event, job_table, profile_table_name):
+    """Enqueue opted-in users with unsent recommendations as shards for the worker invocations"""
+    if not SHARD_QUEUE_URL:
+        raise ValueError("SHARD_QUEUE_URL must be set when NOTIFICATION_MODE is fanout")
+    
+    run_id = run_id_for(event)
+    run_metrics.reset()
+    print(f"🧩 Fan-out run {run_id}: enqueueing shards of {SHARD_SIZE} users...")
+    
+    shards_total, users_total, shards_failed = enqueue_shards(
+        sqs, SHARD_QUEUE_URL, run_id, iter_shards(iter_opted_in_emails_with_pending(job_table, profile_table_name), SHARD_SIZE)
+    )
+    if NOTIFICATION_RUN_TABLE_NAME:
+        start_run(dynamodb.Table(NOTIFICATION_RUN_TABLE_NAME), run_id, shards_total, users_total)
+    
+    result = f"Enqueued {shards_total} shards covering {users_total} users for {run_id}, {shards_failed} shards failed"
+    print(f"📊 {result}")
+    run_metrics.count('ShardsEnqueued', shards_total)
+    print(json.dumps(run_metrics.report('coordinator')))
+    return {
+        'statusCode': 500 if shards_failed else 200,
+        'body': json.dumps(result)
+    }
+
+def process_shard_records(records):
+    """Deliver each shard of users in the SQS batch; failed shards are returned to the queue"""
+    job_table = dynamodb.Table(env_str('JOB_RECOMMENDATIONS_TABLE_NAME'))
+    profile_table_name = env_str('STUDENT_PROFILE_TABLE_NAME')
+    sender_email = env_str('SENDER_EMAIL')
+    run_table = dynamodb.Table(NOTIFICATION_RUN_TABLE_NAME) if NOTIFICATION_RUN_TABLE_NAME else None
+    
+    bulk_email = EMAIL_SEND_MODE == 'bulk'
+    if bulk_email:
+        ensure_digest_template(ses)
+    
+    batch_item_failures = []
+    for record in records:
+        try:
+            run_id, shard_index, emails = parse_shard_message(record)
+            print(f"🧩 Delivering shard {shard_index} of {run_id} ({len(emails)} users)...")
+            users = iter_opted_in_users_with_pending(job_table, profile_table_name, emails)
+            # Redelivered shards skip sends already in the ledger; shards need no checkpoint
+            ledger = RunLedger(run_table, run_id, track_checkpoint=False) if run_table is not None else None
+            totals = deliver_notifications(users, job_table, sender_email, bulk_email,
+                                           SES_MAX_SEND_RATE / WORKER_CONCURRENCY, SMS_MPS / WORKER_CONCURRENCY, ledger, 'worker')
+            print(f"📊 Shard {shard_index}: sent {totals['email_sent']} emails, {totals['sms_sent']} SMS messages, "
+                  f"{totals['failed']} failed, {totals['skipped']} already sent; "
+                  f"marked {totals['marked']}, {totals['mark_failed']} not marked")
+            
+            if run_table is not None:
+                summary = record_shard(run_table, run_id, totals)
+                print(f"📊 Run {run_id}: {summary.get('shardsCompleted', 0)}/{summary.get('shardsTotal', '?')} shards, "
+                      f"{summary.get('email_sent', 0)} emails, {summary.get('sms_sent', 0)} SMS, {summary.get('failed', 0)} failed")
+        except Exception as e:
+            print(f"❌ Failed to deliver shard message {record.get('messageId')}: {str(e)}")
+            batch_item_failures.append({'itemIdentifier': record['messageId']})
+    
+    return {
+        'batchItemFailures': batch_item_failures
+    }
+
+def query_pending_recommendations(job_table, projection=None, start_after=None):
+    """Yield every unsent recommendation by paging through each shard of the pending index.
+    
+    With start_after (an email), shards are read from that user's shard onwards, starting
+    right after the user's items; the users before it are not read again.
+    """
+    first_shard = int(pending_shard_for(start_after).split('#')[1]) if start_after else 0
+    for shard in range(first_shard, PENDING_INDEX_SHARDS):
+        key_condition = Key('pendingShard').eq(f"pending#{shard}")
+        if start_after and shard == first_shard:
+            # pendingKey is "email#createdAt"; "#\uffff" sorts after every key of this user
+            key_condition = key_condition & Key('pendingKey').gt(f"{start_after}#\uffff")
+        query_kwargs = {
+            'IndexName': PENDING_INDEX_NAME,
+            'KeyConditionExpression': key_condition,
+            # Expired items are left for TTL deletion and archival, not sent
+            'FilterExpression': not_expired_filter()
         }
-        
-    except Exception as e:
-        error_msg = f"Error in notification sender: {str(e)}"
-        print(f"❌ {error_msg}")
-        return {
-            'statusCode': 500,
-            'body': json.dumps(error_msg)
+        if projection:
+            query_kwargs['ProjectionExpression'] = projection
+        while True:
+            with run_metrics.stage('Query'):
+                response = job_table.query(**query_kwargs)
+            run_metrics.count('QueryPages')
+            run_metrics.count('RecommendationsRead', len(response['Items']))
+            yield from response['Items']
+            if 'LastEvaluatedKey' not in response:
+                break
+            query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def query_pending_for_users(job_table, emails):
+    """Yield the unsent recommendations of the given users, one user after another"""
+    for email in emails:
+        query_kwargs = {
+            'IndexName': PENDING_INDEX_NAME,
+            'KeyConditionExpression': Key('pendingShard').eq(pending_shard_for(email)) & Key('pendingKey').begins_with(f"{email}#"),
+            'FilterExpression': not_expired_filter()
         }
+        while True:
+            with run_metrics.stage('Query'):
+                response = job_table.query(**query_kwargs)
+            run_metrics.count('QueryPages')
+            run_metrics.count('RecommendationsRead', len(response['Items']))
+            yield from response['Items']
+            if 'LastEvaluatedKey' not in response:
+                break
+            query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def iter_opted_in_emails_with_pending(job_table, profile_table_name):
+    """Yield each opted-in user with unsent recommendations once, reading only emails and opt-in status"""
+    batch = []
+    last_email = None
+    for item in query_pending_recommendations(job_table, projection='email'):
+        email = item.get('email')
+        if not email or '@' not in email or email == last_email:
+            continue
+        last_email = email
+        batch.append(email)
+        if len(batch) >= PROFILE_BATCH_SIZE:
+            yield from _opted_in_emails(batch, profile_table_name)
+            batch = []
+    if batch:
+        yield from _opted_in_emails(batch, profile_table_name)
+
+def _opted_in_emails(emails, profile_table_name):
+    profiles = batch_get_profiles(emails, profile_table_name, projection='actionID, optInStatus')
+    for email in emails:
+        profile = profiles.get(sanitize_email_for_actor_id(email))
+        if profile and profile.get('optInStatus') is True:
+            yield email
+
+def iter_pending_by_user(job_table, emails=None, start_after=None):
+    """Yield (email, {job_category: [recommendations]}) one user at a time.
+    
+    The pending index sorts each shard by pendingKey = "email#createdAt", so a user's
+    items are contiguous and only the current user's items are held in memory. With
+    emails, only those users' partitions of the index are read. Compressed
+    jobInformation is decoded here, before rendering and sending.
+    """
+    current_email = None
+    categories = {}
+    if emails is not None:
+        items = query_pending_for_users(job_table, emails)
+    else:
+        items = query_pending_recommendations(job_table, start_after=start_after)
+    for job in items:
+        email = job.get('email')
+        if not email or '@' not in email:
+            continue
+        if email != current_email:
+            if categories:
+                _count_user(categories)
+                yield current_email, categories
+            current_email = email
+            categories = {}
+        categories.setdefault(job.get('jobCategory', 'general'), []).append(decode_job_information(job))
+    if categories:
+        _count_user(categories)
+        yield current_email, categories
+
+def _count_user(categories):
+    run_metrics.count('UsersConsidered')
+    run_metrics.observe('RecommendationsPerUser', sum(len(jobs) for jobs in categories.values()))
+
+def iter_opted_in_users_with_pending(job_table, profile_table_name, emails=None, start_after=None):
+    """Join pending recommendations with student profiles in batches of PROFILE_BATCH_SIZE users.
+    
+    Yields (user_profile, categories) for opted-in users only, optionally limited to emails
+    or resumed after the user start_after.
+    """
+    batch = []
+    for email, categories in iter_pending_by_user(job_table, emails, start_after):
+        batch.append((email, categories))
+        if len(batch) >= PROFILE_BATCH_SIZE:
+            yield from _join_profiles(batch, profile_table_name)
+            batch = []
+    if batch:
+        yield from _join_profiles(batch, profile_table_name)
+
+def _join_profiles(batch, profile_table_name):
+    profiles = batch_get_profiles([email for email, _ in batch], profile_table_name)
+    joined = []
+    for email, categories in batch:
+        profile = profiles.get(sanitize_email_for_actor_id(email))
+        if profile and profile.get('optInStatus') is True:
+            joined.append((profile, categories))
+    # Postings of the whole batch are fetched together, and only for opted-in users
+    resolve_job_refs([job for _, categories in joined for jobs in categories.values() for job in jobs])
+    yield from joined
+
+def resolve_job_refs(jobs):
+    """Rebuild jobInformation from the job catalog for recommendations saved with jobRefs"""
+    if not any('jobRefs' in job for job in jobs):
+        return
+    global _job_catalog
+    if not JOB_CATALOG_TABLE_NAME:
+        raise ValueError("Recommendations reference the job catalog but JOB_CATALOG_TABLE_NAME is not set")
+    if _job_catalog is None:
+        _job_catalog = JobCatalog(dynamodb.Table(JOB_CATALOG_TABLE_NAME))
+    with run_metrics.stage('CatalogLookup'):
+        _job_catalog.resolve(jobs)
+
+def batch_get_profiles(emails, profile_table_name, projection=None):
+    """Fetch profiles for up to 100 emails with BatchGetItem, keyed by actionID.
+
+    Unprocessed keys are retried with backoff up to PROFILE_BATCH_MAX_ATTEMPTS calls.
+    Keys still unprocessed then are left out, like missing profiles, and counted as
+    ProfilesUnresolved: those users are skipped this run and their recommendations stay
+    pending for the next one, instead of the whole run or shard timing out.
+    """
+    keys = [{'actionID': action_id} for action_id in dict.fromkeys(sanitize_email_for_actor_id(e) for e in emails)]
+    profiles = {}
+    request = {profile_table_name: {'Keys': keys}}
+    if projection:
+        request[profile_table_name]['ProjectionExpression'] = projection
+    attempt = 0
+    while request and keys:
+        with run_metrics.stage('ProfileLookup'):
+            response = dynamodb.batch_get_item(RequestItems=request)
+        for item in response.get('Responses', {}).get(profile_table_name, []):
+            profiles[item['actionID']] = item
+        request = response.get('UnprocessedKeys') or {}
+        if request:
+            attempt += 1
+            if attempt >= PROFILE_BATCH_MAX_ATTEMPTS:
+                unresolved = len(request.get(profile_table_name, {}).get('Keys', []))
+                run_metrics.count('ProfilesUnresolved', unresolved)
+                print(f"⚠️  {unresolved} profiles still unprocessed after {attempt} attempts, "
+                      f"skipping those users until the next run")
+                break
+            run_metrics.count('ProfileRetries')
+            time.sleep(min(0.05 * (2 ** attempt), 2))
+    return profiles
 
 def mark_jobs_as_sent(job_recommendations, job_table):
-    """Mark job recommendations as sent to user"""
-    for rec in job_recommendations:
+    """Mark job recommendations as sent to user with concurrent conditional updates.
+    
+    Returns (marked, failed). Throttling and 5xx errors are retried with backoff; an item
+    that no longer exists fails its condition and is counted as failed, not recreated.
+    """
+    global _mark_executor
+    if not job_recommendations:
+        return 0, 0
+    if _mark_executor is None:
+        _mark_executor = ThreadPoolExecutor(max_workers=MARK_SENT_CONCURRENCY, thread_name_prefix='mark-sent')
+    # The resource's client is thread-safe, the Table resource itself is not
+    client = job_table.meta.client
+    table_name = job_table.name
+    # At most this many of the call's updates in flight at once
+    slots = threading.BoundedSemaphore(max(1, min(MARK_SENT_CONCURRENCY, len(job_recommendations))))
+    futures = []
+    with run_metrics.stage('Mark'):
+        for rec in job_recommendations:
+            slots.acquire()
+            try:
+                future = _mark_executor.submit(_mark_job_as_sent, client, table_name, rec)
+            except Exception:
+                slots.release()
+                raise
+            future.add_done_callback(lambda _: slots.release())
+            futures.append(future)
+        results = [future.result() for future in futures]
+    marked = sum(results)
+    return marked, len(results) - marked
+
+def _mark_job_as_sent(client, table_name, rec):
+    for attempt in range(1, MARK_SENT_MAX_ATTEMPTS + 1):
+        start = time.perf_counter()
         try:
-            # Update the sentToUser field to True
-            job_table.update_item(
+            # Update the sentToUser field to True and drop the item from the pending index
+            client.update_item(
+                TableName=table_name,
                 Key={
                     'userJobKey': rec['userJobKey'],
                     'createdAt': rec['createdAt']
                 },
-                UpdateExpression='SET sentToUser = :sent',
+                UpdateExpression='SET sentToUser = :sent REMOVE pendingShard, pendingKey',
+                ConditionExpression='attribute_exists(userJobKey)',
                 ExpressionAttributeValues={
                     ':sent': True
                 }
             )
+            run_metrics.observe('MarkLatency', time.perf_counter() - start)
+            return True
+        except ClientError as e:
+            code = e.response.get('Error', {}).get('Code', '')
+            if code in RETRYABLE_ERROR_CODES and attempt < MARK_SENT_MAX_ATTEMPTS:
+                run_metrics.count('MarkRetries')
+                time.sleep(min(0.05 * (2 ** attempt), 1.0))
+                continue
+            print(f"⚠️  Failed to mark job as sent: {str(e)}")
+            return False
         except Exception as e:
             print(f"⚠️  Failed to mark job as sent: {str(e)}")
+            return False
+    return False
+
+def recommendation_link(job):
+    """Chatbot page link for one recommendation item, or None without userJobKey and createdAt"""
+    user_job_key = job.get('userJobKey')
+    created_at = job.get('createdAt')
+    if not (user_job_key and created_at):
+        return None
+    # URL encode the parameters
+    from urllib.parse import quote
+    base_url = env_str('AMPLIFY_APP_URL', 'https://your-amplify-app-url.com')
+    return f"{base_url}/chatbot?userJobKey={quote(user_job_key)}&createdAt={quote(created_at)}"
+
+def digest_sms_links(sections, budget):
+    """Link text listing each (category_display, jobs) section, within budget characters.
+
+    Every category links to its own recommendations, in section order; categories that
+    do not fit are summarized as "+N more categories".
+    """
+    total = sum(len(jobs) for _, jobs in sections)
+    links = [(display, len(jobs), recommendation_link(jobs[0])) for display, jobs in sections if jobs]
+    links = [(display, count, url) for display, count, url in links if url]
+
+    def more(count):
+        return f" +{count} more {'category' if count == 1 else 'categories'}" if count else ""
 
-def send_sms_notification(phone, user_name='Job Seeker', job_recommendations=None, job_category=None, user_email=None):
-    """Send SMS notification via AWS End User Messaging SMS Voice v2 with clickable link"""
+    text = f" View your {total} new recommendations:"
+    included = 0
+    for display, count, url in links:
+        part = f" {display} ({count}): {url}"
+        if len(text) + len(part) + len(more(len(links) - included - 1)) > budget:
+            break
+        text += part
+        included += 1
+    if not included:
+        return ""
+    return text + more(len(links) - included)
+
+def send_sms_notification(phone, user_name='Job Seeker', job_recommendations=None, job_category=None, user_email=None, sections=None):
+    """Send SMS notification via AWS End User Messaging SMS Voice v2 with clickable links (raises on failure).
+
+    Digests pass sections, a list of (category_display, recommendations), and get one
+    link per category within SMS_MAX_LENGTH.
+    """
     try:
         # Get environment variables
-        origination_number = os.environ.get('SMS_ORIGINATION_NUMBER')
+        origination_number = env_str('SMS_ORIGINATION_NUMBER')
 
         if not origination_number:
-            print("Error: SMS_ORIGINATION_NUMBER environment variable not set. Please configure your verified phone number.")
-            return
+            raise ValueError("SMS_ORIGINATION_NUMBER environment variable not set. Please configure your verified phone number.")
 
         print(f"Sending SMS to: {phone} from: {origination_number}")
 
         # Get first name for personalization
         first_name = user_name.split()[0] if user_name and user_name != 'Job Seeker' else 'there'
-
-        # Generate clickable link if we have job recommendations
-        link_text = ""
-        if job_recommendations and len(job_recommendations) > 0:
-            # Get the first job's parameters for the link
-            first_job = job_recommendations[0]
-            user_job_key = first_job.get('userJobKey')
-            created_at = first_job.get('createdAt')
-
-            if user_job_key and created_at:
-                # URL encode the parameters
-                from urllib.parse import quote
-                encoded_user_job_key = quote(user_job_key)
-                encoded_created_at = quote(created_at)
-
-                # Generate the link to chatbot page with parameters
-                base_url = os.environ.get('AMPLIFY_APP_URL', 'https://your-amplify-app-url.com')
-                link_url = f"{base_url}/chatbot?userJobKey={encoded_user_job_key}&createdAt={encoded_created_at}"
-
-                # Display category name nicely
-                category_display = job_category.replace('-', ' ').title() if job_category else 'Job'
-
-                link_text = f" View your {len(job_recommendations)} new {category_display} recommendations: {link_url}"
+        greeting = f'Hi {first_name}! Your daily job recommendations are ready based on your preferences.'
 
         # Add opt-out link at the end (unsubscribe from all only)
         optout_text = ""
         if user_email:
             from urllib.parse import quote
-            base_url = os.environ.get('AMPLIFY_APP_URL', 'https://your-amplify-app-url.com')
+            base_url = env_str('AMPLIFY_APP_URL', 'https://your-amplify-app-url.com')
             encoded_email = quote(user_email)
             optout_url = f"{base_url}/unsubscribe?email={encoded_email}&action=all"
             optout_text = f" To unsubscribe: {optout_url}"
 
+        # Generate clickable links if we have job recommendations
+        link_text = ""
+        if sections:
+            link_text = digest_sms_links(sections, SMS_MAX_LENGTH - len(greeting) - len(optout_text))
+        elif job_recommendations:
+            # Link to the first job's recommendations
+            link_url = recommendation_link(job_recommendations[0])
+            if link_url:
+                # Display category name nicely
+                category_display = job_category.replace('-', ' ').title() if job_category else 'Job'
+                link_text = f" View your {len(job_recommendations)} new {category_display} recommendations: {link_url}"
+
         # Prepare SMS parameters
         sms_params = {
             'DestinationPhoneNumber': phone,
             'OriginationIdentity': origination_number,
-            'MessageBody': f'Hi {first_name}! Your daily job recommendations are ready based on your preferences.{link_text}{optout_text}',
+            'MessageBody': f'{greeting}{link_text}{optout_text}',
             'MessageType': 'PROMOTIONAL'  # Can be PROMOTIONAL or TRANSACTIONAL
         }
 
@@ -224,23 +697,94 @@ def send_sms_notification(phone, user_name='Job Seeker', job_recommendations=Non
         print(f"SMS sent to {phone}. Message ID: {response.get('MessageId', 'N/A')}")
 
     except Exception as e:
+        # Re-raise so the dispatcher can retry throttling and count the failure
         print(f"Failed to send SMS to {phone} via SMS Voice v2: {str(e)}")
+        raise
 
-def send_job_email(email, job_recommendations, user_profile, sender_email, job_category):
-    """Send email notifications using templates"""
-
+def email_greeting(user_profile, job_category):
+    """First name for the greeting and display name of the job category"""
     # Get user's name for greeting from fullName field
     user_name = user_profile.get('fullName', 'Job Seeker')
     first_name = user_name.split()[0] if user_name and user_name != 'Job Seeker' else 'there'
+    category_display = job_category.replace('-', ' ').title() if job_category != 'general' else 'Job'
+    return first_name, category_display
+
+def email_sections(user_profile, group):
+    """First name and (job_category, category_display, jobs) sections for a group of categories"""
+    first_name = email_greeting(user_profile, 'general')[0]
+    sections = [(job_category, email_greeting(user_profile, job_category)[1], jobs) for job_category, jobs in group]
+    return first_name, sections
+
+def settle_sends(pending, job_table, totals, ledger=None, wait=False):
+    """Count the results of finished sends and mark their recommendations as sent.
+    
+    Entries are settled oldest first; with wait=True every entry is settled. An entry's
+    recommendations are marked only if all of its sends were delivered, now or (per the
+    ledger) earlier in the run. The first entry with an undelivered send holds the
+    ledger's checkpoint, so later checkpoints never pass that user.
+    """
+    while pending and (wait or all(future.done() for _, _, future in pending[0]['sends'])):
+        entry = pending.popleft()
+        jobs_to_mark = list(entry['jobs'])
+        delivered = entry.get('delivered', True)
+        for channel, label, future in entry['sends']:
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"❌ Failed to send {channel} to {label}: {str(e)}")
+                totals['failed'] += len(entry['batch']) if channel == 'bulk' else 1
+                delivered = False
+                continue
+            
+            if channel == 'bulk':
+                # One status per destination; only delivered digests are marked as sent
+                for (email, _, jobs, _), status in zip(entry['batch'], result):
+                    if status in ('Success', SKIPPED):
+                        totals['email_sent' if status == 'Success' else 'skipped'] += 1
+                        jobs_to_mark.extend(jobs)
+                    else:
+                        totals['failed'] += 1
+                        delivered = False
+                        print(f"❌ Failed to send email to {email}: "
+                              f"{'claimed by another attempt, retry later' if status == IN_FLIGHT else status}")
+                print(f"✅ Bulk email batch of {label} sent")
+            elif result == SKIPPED:
+                totals['skipped'] += 1
+                print(f"⏭️  {'Email' if channel == 'email' else 'SMS'} to {label} already sent in this run")
+            elif result == IN_FLIGHT:
+                totals['failed'] += 1
+                delivered = False
+                print(f"⏸️  {'Email' if channel == 'email' else 'SMS'} to {label} is claimed by another attempt; "
+                      f"not marked, retry later")
+            else:
+                totals[f'{channel}_sent'] += 1
+                print(f"✅ {'Email' if channel == 'email' else 'SMS'} sent to {label}")
+        
+        # Bulk batches mark their delivered destinations even if others in the batch failed
+        if jobs_to_mark and (delivered or entry.get('batch')):
+            marked, mark_failed = mark_jobs_as_sent(jobs_to_mark, job_table)
+            totals['marked'] += marked
+            totals['mark_failed'] += mark_failed
+        
+        if ledger is not None:
+            if not delivered:
+                ledger.hold()
+            if entry.get('checkpoint'):
+                ledger.advance(entry['checkpoint'])
+
+def send_job_email(email, job_recommendations, user_profile, sender_email, job_category):
+    """Send email notifications using templates"""
+
+    first_name, category_display = email_greeting(user_profile, job_category)
 
     # Create email subject with job category (no count)
-    category_display = job_category.replace('-', ' ').title() if job_category != 'general' else 'Job'
     subject = f"🎯 New {category_display} Recommendations for You!"
 
     # Generate email content using templates with opt-out links
     # Pass category_display as category_for_unsubscribe so the URL uses "Software Engineer" not "software-engineer"
-    html_content = generate_html_email(first_name, category_display, job_recommendations, email, job_category, category_display)
-    text_content = generate_text_email(first_name, category_display, job_recommendations, email, job_category, category_display)
+    with run_metrics.stage('Render', sample='RenderLatency'):
+        html_content = generate_html_email(first_name, category_display, job_recommendations, email, job_category, category_display)
+        text_content = generate_text_email(first_name, category_display, job_recommendations, email, job_category, category_display)
 
     # Send email via SES
     ses.send_email(
@@ -254,3 +798,25 @@ def send_job_email(email, job_recommendations, user_profile, sender_email, job_c
             }
         }
     )
+
+def send_digest_email(email, group, user_profile, sender_email):
+    """Send one email covering several job categories, with a section per category"""
+
+    first_name, sections = email_sections(user_profile, group)
+    subject = f"🎯 New {join_category_names(display for _, display, _ in sections)} Recommendations for You!"
+
+    with run_metrics.stage('Render', sample='RenderLatency'):
+        html_content = generate_html_digest(first_name, sections, email)
+        text_content = generate_text_digest(first_name, sections, email)
+
+    ses.send_email(
+        Source=sender_email,
+        Destination={'ToAddresses': [email]},
+        Message={
+            'Subject': {'Data': subject},
+            'Body': {
+                'Text': {'Data': text_content},
+                'Html': {'Data': html_content}
+            }
+        }
+    )
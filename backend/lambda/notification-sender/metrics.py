@@ -0,0 +1,140 @@
+"""
+Delivery Pipeline Metrics
+=========================
+Per-run metrics for the notification sender, emitted as one CloudWatch EMF line at the
+end of each run (or shard) so the stage that bounds the daily run is visible:
+
+- stage time: pending-index queries, profile lookups, rendering, marking as sent
+- counts: users considered, users notified, recommendations read, query pages, retries
+- distributions (p50/p90/p99/max): recommendations per user, render and mark-as-sent
+  latency; SES/SMS send latency and throttles are reported per channel by dispatcher.py
+
+Samples are kept in a bounded reservoir, so percentiles stay cheap for large runs.
+"""
+
+import math
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+MAX_SAMPLES = 10000
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+def summarize(samples, prefix, unit_scale=1.0):
+    """{prefix}P50/P90/P99/Max for a list of samples"""
+    values = sorted(samples)
+    summary = {f"{prefix}P{pct}": round(percentile(values, pct) * unit_scale, 2) for pct in PERCENTILES}
+    summary[f"{prefix}Max"] = round(values[-1] * unit_scale, 2) if values else 0.0
+    return summary
+
+
+class Reservoir:
+    """Uniform sample of at most max_samples observations"""
+
+    def __init__(self, max_samples=MAX_SAMPLES):
+        self.max_samples = max_samples
+        self.samples = []
+        self.seen = 0
+
+    def add(self, value):
+        self.seen += 1
+        if len(self.samples) < self.max_samples:
+            self.samples.append(value)
+        else:
+            index = random.randrange(self.seen)
+            if index < self.max_samples:
+                self.samples[index] = value
+
+
+class RunMetrics:
+    """Thread-safe stage timers, counters and latency samples for one run"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.monotonic()
+            self.seconds = {}
+            self.counts = {}
+            self.samples = {}
+
+    @contextmanager
+    def stage(self, name, sample=None):
+        """Add the block's duration to {name}Seconds (and to sample `sample`, in seconds)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.seconds[name] = self.seconds.get(name, 0.0) + elapsed
+                if sample:
+                    self.samples.setdefault(sample, Reservoir()).add(elapsed)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + value
+
+    def observe(self, name, value):
+        with self._lock:
+            self.samples.setdefault(name, Reservoir()).add(value)
+
+    def values(self):
+        """Flat metric values: stage seconds, counts and percentile summaries"""
+        with self._lock:
+            values = {'RunSeconds': round(time.monotonic() - self.started, 3)}
+            values.update({f"{name}Seconds": round(seconds, 3) for name, seconds in self.seconds.items()})
+            values.update(self.counts)
+            for name, reservoir in self.samples.items():
+                # Latencies are sampled in seconds and reported in milliseconds
+                if name.endswith('Latency'):
+                    values.update(summarize(reservoir.samples, f"{name}Ms", 1000.0))
+                else:
+                    values.update(summarize(reservoir.samples, name))
+            return values
+
+    def report(self, mode):
+        """Print the slowest stages and return the EMF record for this run"""
+        values = self.values()
+        stages = sorted(((name, seconds) for name, seconds in values.items()
+                         if name.endswith('Seconds') and name != 'RunSeconds'), key=lambda item: -item[1])
+        summary = ', '.join(f"{name[:-len('Seconds')]} {seconds:.2f}s" for name, seconds in stages)
+        print(f"⏱️  Run {values['RunSeconds']:.2f}s; stage time: {summary or 'n/a'}")
+        return emf_record(mode, values)
+
+
+def _unit(name):
+    if name.endswith('Seconds'):
+        return 'Seconds'
+    if 'Ms' in name:
+        return 'Milliseconds'
+    return 'Count'
+
+
+def emf_record(mode, values, namespace='JobSearch/NotificationSender'):
+    record = {
+        '_aws': {
+            'Timestamp': int(datetime.now(timezone.utc).timestamp() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': namespace,
+                'Dimensions': [['Mode']],
+                'Metrics': [{'Name': name, 'Unit': _unit(name)} for name in values],
+            }],
+        },
+        'Mode': mode,
+    }
+    record.update(values)
+    return record
@@ -0,0 +1,184 @@
+"""
+Notification Run Checkpoints and Send Ledger
+============================================
+Makes a notification run resumable. Runs are identified by date (run#YYYY-MM-DD), so a
+retried or restarted run on the same day finds what the previous attempt left in the
+run table:
+
+- CHECKPOINT: the last user before which every notification was delivered; the next
+  attempt resumes the pending-index scan after that user instead of starting over. The
+  checkpoint stops at the first user with an undelivered send, so a resumed attempt
+  retries that user and everyone after. Once a run
+  completes, a later attempt starts from the beginning again (the ledger skips what was
+  already delivered, so only failed or new sends go out)
+- LEDGER#<email>#<category>#<channel>: one item per send, claimed with a conditional
+  write before sending and set to sent or failed afterwards. A send whose item is sent
+  is skipped rather than repeated. A claim is a lease: one still 'sending' after
+  CLAIM_LEASE_SECONDS belongs to an attempt that died mid-send and can be claimed again;
+  a younger one is reported as IN_FLIGHT (not delivered by this attempt, retry later)
+
+Ledger writes use the table resource's low-level client, which can be shared by the
+dispatcher's worker threads.
+"""
+
+import os
+import time
+from datetime import datetime, timezone
+
+from botocore.exceptions import ClientError
+
+CHECKPOINT_KEY = 'CHECKPOINT'
+LEDGER_PREFIX = 'LEDGER#'
+
+# Checkpoints are written at most this often while a run progresses, and once at the end
+CHECKPOINT_INTERVAL_SECONDS = float(os.environ.get('CHECKPOINT_INTERVAL_SECONDS', '5'))
+# A 'sending' claim older than this is abandoned (longer than the Lambda timeout, so a
+# live attempt never loses its claim)
+CLAIM_LEASE_SECONDS = int(os.environ.get('CLAIM_LEASE_SECONDS', '900'))
+# Run items expire through the table's expiresAt TTL attribute
+RUN_LEDGER_TTL_DAYS = int(os.environ.get('RUN_LEDGER_TTL_DAYS', '14'))
+
+SENDING = 'sending'
+SENT = 'sent'
+FAILED = 'failed'
+
+# Returned in place of the send result when the ledger shows the send already happened
+SKIPPED = 'Skipped'
+# Returned when another attempt holds a live claim on the send: nothing was delivered here
+IN_FLIGHT = 'InFlight'
+
+# Outcomes of RunLedger.claim
+CLAIMED = 'claimed'
+
+
+def run_id_for(event=None):
+    """Run id for the day of the scheduled event (or today), shared by every attempt of that run"""
+    event_time = (event or {}).get('time')
+    day = event_time[:10] if event_time else datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    return f"run#{day}"
+
+
+def ledger_key(email, category, channel):
+    return f"{LEDGER_PREFIX}{email}#{category}#{channel}"
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class RunLedger:
+    """Checkpoint and send ledger of one run in the notification run table"""
+
+    def __init__(self, run_table, run_id, track_checkpoint=True):
+        self.run_id = run_id
+        self.track_checkpoint = track_checkpoint
+        self._client = run_table.meta.client
+        self._table_name = run_table.name
+        self._expires_at = int(time.time()) + RUN_LEDGER_TTL_DAYS * 86400
+        self._checkpoint = None
+        self._saved_checkpoint = None
+        self._last_save = time.monotonic()
+        self._held = False
+
+    def resume_point(self):
+        """Email of the last settled user of an unfinished attempt, or None to start from the beginning"""
+        item = self._client.get_item(
+            TableName=self._table_name,
+            Key={'runId': self.run_id, 'itemKey': CHECKPOINT_KEY},
+            ConsistentRead=True
+        ).get('Item')
+        if not item or item.get('completedAt'):
+            return None
+        self._checkpoint = self._saved_checkpoint = item.get('lastEmail')
+        return self._checkpoint
+
+    def advance(self, email):
+        """Record that every user up to and including email is delivered"""
+        if not self.track_checkpoint or self._held:
+            return
+        self._checkpoint = email
+        if time.monotonic() - self._last_save >= CHECKPOINT_INTERVAL_SECONDS:
+            self.save_checkpoint()
+
+    def hold(self):
+        """Stop advancing the checkpoint: a send was not delivered, so the next attempt resumes before it"""
+        self._held = True
+
+    def save_checkpoint(self, completed=False):
+        if not self.track_checkpoint or (self._checkpoint == self._saved_checkpoint and not completed):
+            return
+        update_expression = 'SET updatedAt = :now, expiresAt = :expires'
+        values = {':now': _now(), ':expires': self._expires_at}
+        if self._checkpoint:
+            update_expression += ', lastEmail = :email'
+            values[':email'] = self._checkpoint
+        update_expression += ', completedAt = :now' if completed else ' REMOVE completedAt'
+        self._client.update_item(
+            TableName=self._table_name,
+            Key={'runId': self.run_id, 'itemKey': CHECKPOINT_KEY},
+            UpdateExpression=update_expression,
+            ExpressionAttributeValues=values
+        )
+        self._saved_checkpoint = self._checkpoint
+        self._last_save = time.monotonic()
+
+    def claim(self, key):
+        """CLAIMED if this attempt may send, SENT if the send already happened, or IN_FLIGHT
+        if another attempt holds a live claim on it"""
+        now = time.time()
+        try:
+            self._client.put_item(
+                TableName=self._table_name,
+                Item={
+                    'runId': self.run_id,
+                    'itemKey': key,
+                    'status': SENDING,
+                    'claimedAt': int(now),
+                    'updatedAt': _now(),
+                    'expiresAt': self._expires_at,
+                },
+                # Claims without claimedAt predate leases and are treated as abandoned
+                ConditionExpression=('attribute_not_exists(itemKey) OR #status = :failed OR '
+                                     '(#status = :sending AND (attribute_not_exists(claimedAt) OR claimedAt < :stale))'),
+                ExpressionAttributeNames={'#status': 'status'},
+                ExpressionAttributeValues={':failed': FAILED, ':sending': SENDING,
+                                           ':stale': int(now) - CLAIM_LEASE_SECONDS}
+            )
+            return CLAIMED
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                raise
+        item = self._client.get_item(
+            TableName=self._table_name,
+            Key={'runId': self.run_id, 'itemKey': key},
+            ProjectionExpression='#status',
+            ExpressionAttributeNames={'#status': 'status'},
+            ConsistentRead=True
+        ).get('Item') or {}
+        return SENT if item.get('status') == SENT else IN_FLIGHT
+
+    def record(self, key, status):
+        self._client.update_item(
+            TableName=self._table_name,
+            Key={'runId': self.run_id, 'itemKey': key},
+            UpdateExpression='SET #status = :status, updatedAt = :now',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={':status': status, ':now': _now()}
+        )
+
+    def send_once(self, key, func, *args, **kwargs):
+        """func(*args, **kwargs) unless the ledger shows this send already happened (returns SKIPPED)
+        or another attempt is sending it (returns IN_FLIGHT)"""
+        claim = self.claim(key)
+        if claim == SENT:
+            return SKIPPED
+        if claim == IN_FLIGHT:
+            return IN_FLIGHT
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            # Released so a throttling retry or the next attempt can claim it again
+            self.record(key, FAILED)
+            raise
+        self.record(key, SENT)
+        return result
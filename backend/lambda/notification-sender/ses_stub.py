@@ -0,0 +1,159 @@
+"""
+Local SES Stand-in
+==================
+In-memory replacement for the SES client used by the notification sender, selected with
+SES_STUB=true. Templates are kept in memory and templated sends are rendered with the
+small Handlebars subset the digest template uses ({{var}}, {{{raw}}}, {{#each}},
+{{#if}}, {{#unless}}), so the bulk path can be exercised without AWS.
+
+Rendered messages are printed and, if SES_STUB_OUTBOX is set, written there as JSON.
+"""
+
+import html
+import json
+import os
+import re
+import uuid
+
+from botocore.exceptions import ClientError
+
+_TOKEN = re.compile(r'{{{\s*(\w+)\s*}}}|{{\s*([#/]?)(\w+)?\s*([\w.@]*)\s*}}')
+
+
+def _error(code, operation):
+    return ClientError({'Error': {'Code': code, 'Message': code}}, operation)
+
+
+def render(template, data):
+    """Render the Handlebars subset; {{var}} is HTML-escaped, {{{var}}} is not"""
+    tree, _ = _parse(template, 0, None)
+    return _render_nodes(tree, [data])
+
+
+def _parse(template, pos, closing):
+    nodes = []
+    while True:
+        match = _TOKEN.search(template, pos)
+        if not match:
+            nodes.append(template[pos:])
+            return nodes, len(template)
+        nodes.append(template[pos:match.start()])
+        raw, sigil, name, arg = match.groups()
+        pos = match.end()
+        if raw:
+            nodes.append(('raw', raw, None))
+            continue
+        if sigil == '/':
+            if name != closing:
+                raise ValueError(f"Unexpected {{{{/{name}}}}}")
+            return nodes, pos
+        if sigil == '#':
+            body, pos = _parse(template, pos, name)
+            nodes.append((name, arg, body))
+        else:
+            nodes.append(('var', name or arg, None))
+
+
+def _lookup(stack, name):
+    if name == 'this':
+        return stack[-1]
+    for scope in reversed(stack):
+        if isinstance(scope, dict) and name in scope:
+            return scope[name]
+    return ''
+
+
+def _render_nodes(nodes, stack):
+    out = []
+    for node in nodes:
+        if isinstance(node, str):
+            out.append(node)
+            continue
+        kind, name, body = node
+        if kind in ('var', 'raw'):
+            value = _lookup(stack, name)
+            value = '' if value is None else str(value)
+            out.append(html.escape(value) if kind == 'var' else value)
+        elif kind == 'each':
+            for item in _lookup(stack, name) or []:
+                out.append(_render_nodes(body, stack + [item]))
+        elif kind == 'if':
+            if _lookup(stack, name):
+                out.append(_render_nodes(body, stack))
+        elif kind == 'unless':
+            if not _lookup(stack, name):
+                out.append(_render_nodes(body, stack))
+    return ''.join(out)
+
+
+class StubSESClient:
+    """The subset of the SES client API used by the notification sender"""
+
+    def __init__(self, outbox=None):
+        self.outbox = outbox
+        self.templates = {}
+        self.sent = []
+
+    def get_template(self, TemplateName):
+        if TemplateName not in self.templates:
+            raise _error('TemplateDoesNotExist', 'GetTemplate')
+        return {'Template': dict(self.templates[TemplateName])}
+
+    def create_template(self, Template):
+        if Template['TemplateName'] in self.templates:
+            raise _error('AlreadyExists', 'CreateTemplate')
+        self.templates[Template['TemplateName']] = dict(Template)
+        return {}
+
+    def update_template(self, Template):
+        if Template['TemplateName'] not in self.templates:
+            raise _error('TemplateDoesNotExist', 'UpdateTemplate')
+        self.templates[Template['TemplateName']] = dict(Template)
+        return {}
+
+    def send_email(self, Source, Destination, Message):
+        body = Message.get('Body', {})
+        return self._deliver(
+            Source, Destination, Message['Subject']['Data'],
+            body.get('Html', {}).get('Data', ''), body.get('Text', {}).get('Data', '')
+        )
+
+    def send_bulk_templated_email(self, Source, Template, Destinations, DefaultTemplateData='{}'):
+        if Template not in self.templates:
+            raise _error('TemplateDoesNotExist', 'SendBulkTemplatedEmail')
+        if len(Destinations) > 50:
+            raise _error('InvalidParameterValue', 'SendBulkTemplatedEmail')
+
+        template = self.templates[Template]
+        defaults = json.loads(DefaultTemplateData or '{}')
+        statuses = []
+        for destination in Destinations:
+            try:
+                data = dict(defaults, **json.loads(destination.get('ReplacementTemplateData') or '{}'))
+                response = self._deliver(
+                    Source, destination['Destination'],
+                    render(template.get('SubjectPart', ''), data),
+                    render(template.get('HtmlPart', ''), data),
+                    render(template.get('TextPart', ''), data)
+                )
+                statuses.append({'Status': 'Success', 'MessageId': response['MessageId']})
+            except (ValueError, KeyError) as e:
+                statuses.append({'Status': 'InvalidRenderingParameter', 'Error': str(e)})
+        return {'Status': statuses}
+
+    def _deliver(self, source, destination, subject, html_body, text_body):
+        message = {
+            'MessageId': str(uuid.uuid4()),
+            'Source': source,
+            'ToAddresses': destination.get('ToAddresses', []),
+            'Subject': subject,
+            'Html': html_body,
+            'Text': text_body,
+        }
+        self.sent.append(message)
+        print(f"📭 [SES stub] {message['ToAddresses']} - {subject}")
+        if self.outbox:
+            os.makedirs(self.outbox, exist_ok=True)
+            with open(os.path.join(self.outbox, f"{message['MessageId']}.json"), 'w', encoding='utf-8') as f:
+                json.dump(message, f, ensure_ascii=False, indent=2)
+        return {'MessageId': message['MessageId']}
@@ -0,0 +1,261 @@
+"""
+SES Templated Job Digests
+=========================
+Bulk alternative to rendering every email in the Lambda (EMAIL_SEND_MODE=bulk):
+
+1. The digest layout is registered once as an SES template (Handlebars) and updated
+   only when its content changes
+2. Each user/category (or each user, in digest mode) becomes one destination carrying
+   its own replacement data (name, a section of job cards per category, unsubscribe links)
+3. Destinations are sent with SendBulkTemplatedEmail, up to 50 per call, so SES does
+   the rendering and the sender makes one API call per 50 emails
+
+The layout mirrors generate_html_email/generate_html_digest in email_template.py. Values
+are HTML-escaped in the HTML part ({{var}}) and inserted raw in the subject and text
+parts ({{{var}}}).
+"""
+
+import json
+import os
+from urllib.parse import quote
+
+from botocore.exceptions import ClientError
+
+from email_template import EMAIL_STYLES, join_category_names
+
+DIGEST_TEMPLATE_NAME = os.environ.get('SES_DIGEST_TEMPLATE_NAME', 'JobRecommendationDigest')
+MAX_BULK_DESTINATIONS = 50
+
+DIGEST_SUBJECT = "🎯 New {{{categoryDisplay}}} Recommendations for You!"
+
+DIGEST_HTML = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <style>
+""" + EMAIL_STYLES + """        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                <h1>Your Daily Job Recommendations</h1>
+            </div>
+
+            <div class="content">
+                <div class="greeting">Good morning, {{firstName}}! 👋</div>
+
+                <p style="color: #8B1538; font-weight: 500;">Here are your personalized {{categoryLower}} recommendations for today:</p>
+
+                {{#each sections}}
+                {{#if showHeading}}<h2 style="color: #8B1538; font-size: 20px; border-bottom: 2px solid #FFC627; padding-bottom: 6px; margin: 25px 0 15px;">{{categoryDisplay}}</h2>{{/if}}
+                <div class="job-list">
+                {{#each jobs}}
+                        <div class="job-item">
+                            <div class="job-header">
+                                <div class="job-title">{{title}}</div>
+                            </div>
+                            <div class="job-company">{{company}}</div>
+
+                            <div class="job-meta">
+                                <span class="job-location">📍 {{location}}</span>
+                                {{#if salary}}<span class="job-salary">💰 {{salary}}</span>{{/if}}
+                                {{#if category}}<span class="job-category">🏢 {{category}}</span>{{/if}}
+                                <span class="job-type">{{type}}</span>
+                            </div>
+
+                            {{#if description}}<div class="job-description">{{description}}</div>{{/if}}
+
+                            {{#if requirements}}<div class="job-requirements"><strong>Requirements:</strong><br>• {{requirements}}</div>{{/if}}
+
+                            <div class="match-section">
+                                <div class="match-title">Why this matches you</div>
+                                <div class="match-text">{{fit}}</div>
+                            </div>
+
+                            <a href="{{applyUrl}}" class="apply-btn">Apply Now</a>
+                        </div>
+                {{/each}}
+                </div>
+                {{/each}}
+
+                <p style="margin-top: 20px;">Ready to take the next step? These opportunities are waiting for you!</p>
+            </div>
+
+            <div class="footer">
+                {{#each sections}}{{#if optoutCategoryUrl}}
+                <p style="font-size: 12px; margin: 5px 0;">
+                    <a href="{{optoutCategoryUrl}}" style="color: #666; text-decoration: underline;">Unsubscribe from {{categoryDisplay}} notifications</a>
+                </p>
+                {{/if}}{{/each}}
+                {{#if optoutAllUrl}}
+                <p style="font-size: 12px; margin: 5px 0;">
+                    <a href="{{optoutAllUrl}}" style="color: #666; text-decoration: underline;">Unsubscribe from all job notifications</a>
+                </p>
+                <p style="font-size: 11px; color: #999; margin-top: 10px;">
+                    You can also manage your communication preferences (email/SMS) from the unsubscribe page.
+                </p>
+                {{/if}}
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+
+DIGEST_TEXT = """
+Good morning, {{{firstName}}}!
+
+Here are your personalized {{{categoryLower}}} recommendations for today:
+
+{{#each sections}}{{#if showHeading}}
+== {{{categoryDisplay}}} ==
+{{/if}}{{#each jobs}}{{#unless placeholder}}
+{{{number}}}. {{{title}}}
+   Company: {{{company}}}
+   Location: {{{location}}}
+   {{#if salary}}Salary: {{{salary}}}{{/if}}
+   Type: {{{type}}}
+
+   Why this matches you: {{{fit}}}
+
+   Apply: {{{applyUrlText}}}
+
+{{/unless}}{{/each}}{{/each}}
+Ready to take the next step? These opportunities are waiting for you!
+
+{{#if optoutAllUrl}}---
+{{#each sections}}{{#if optoutCategoryUrl}}Unsubscribe from {{{categoryDisplay}}} notifications: {{{optoutCategoryUrl}}}
+
+{{/if}}{{/each}}Unsubscribe from all job notifications: {{{optoutAllUrl}}}
+
+You can also manage your communication preferences (email/SMS) from the unsubscribe page.
+{{/if}}"""
+
+# Used by SES for any replacement value a destination leaves out
+DEFAULT_TEMPLATE_DATA = {
+    'firstName': 'there',
+    'categoryDisplay': 'Job',
+    'categoryLower': 'job',
+    'sections': [],
+}
+
+PLACEHOLDER_JOB = {
+    'title': 'New Job Opportunity',
+    'company': 'Exciting Company',
+    'location': 'Based on your preferences',
+    'type': 'Full-Time',
+    'fit': 'A great opportunity that matches your profile!',
+    'applyUrl': '#',
+    'placeholder': True,
+}
+
+
+def digest_template():
+    return {
+        'TemplateName': DIGEST_TEMPLATE_NAME,
+        'SubjectPart': DIGEST_SUBJECT,
+        'HtmlPart': DIGEST_HTML,
+        'TextPart': DIGEST_TEXT,
+    }
+
+
+def ensure_digest_template(ses_client):
+    """Create the digest template, or update it if the stored copy differs"""
+    template = digest_template()
+    try:
+        current = ses_client.get_template(TemplateName=DIGEST_TEMPLATE_NAME)['Template']
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') != 'TemplateDoesNotExist':
+            raise
+        ses_client.create_template(Template=template)
+        print(f"📝 Created SES template {DIGEST_TEMPLATE_NAME}")
+        return
+
+    if any(current.get(part) != template[part] for part in ('SubjectPart', 'HtmlPart', 'TextPart')):
+        ses_client.update_template(Template=template)
+        print(f"📝 Updated SES template {DIGEST_TEMPLATE_NAME}")
+
+
+def digest_template_data(first_name, sections, user_email=None):
+    """Replacement data for one destination.
+
+    sections is a list of (job_category, category_display, job_recommendations); a single
+    section renders like generate_html_email, several like generate_html_digest.
+    """
+    base_url = os.environ.get('AMPLIFY_APP_URL', 'https://your-amplify-app-url.com')
+    encoded_email = quote(user_email) if user_email else None
+
+    template_sections = []
+    number = 1
+    for job_category, category_display, job_recommendations in sections:
+        jobs = []
+        for rec in job_recommendations:
+            job_information = rec.get('jobInformation', [])
+            if not job_information:
+                jobs.append(dict(PLACEHOLDER_JOB))
+                continue
+            for job in job_information:
+                jobs.append(_job_card_data(job, number))
+                number += 1
+        section = {
+            'categoryDisplay': category_display,
+            'showHeading': len(sections) > 1,
+            'jobs': jobs,
+        }
+        if encoded_email and job_category and job_category != 'general':
+            section['optoutCategoryUrl'] = f"{base_url}/unsubscribe?email={encoded_email}&action=category&category={quote(category_display)}"
+        template_sections.append(section)
+
+    categories_display = join_category_names(category_display for _, category_display, _ in sections)
+    data = {
+        'firstName': first_name,
+        'categoryDisplay': categories_display,
+        'categoryLower': categories_display.lower(),
+        'sections': template_sections,
+    }
+    if encoded_email:
+        data['optoutAllUrl'] = f"{base_url}/unsubscribe?email={encoded_email}&action=all"
+    return data
+
+
+def _job_card_data(job, number):
+    description = job.get('description', job.get('summary', ''))
+    requirements = job.get('requirements', job.get('qualifications', ''))
+    apply_url = job.get('external_apply_url', job.get('apply_url', job.get('url')))
+    return {
+        'number': number,
+        'title': job.get('title', 'Job Opportunity'),
+        'company': job.get('company', 'Company Name'),
+        'location': job.get('location', 'Not specified'),
+        'salary': job.get('salary', job.get('compensation', '')),
+        'type': job.get('type', job.get('employment_type', 'Full-Time')),
+        'category': job.get('category', job.get('department', 'Technology')),
+        'description': description[:200] + '...' if len(description) > 200 else description,
+        'requirements': requirements[:150] + ('...' if len(requirements) > 150 else ''),
+        'fit': job.get('fit', job.get('match_reason', 'Great match for your profile!')),
+        'applyUrl': apply_url or '#',
+        'applyUrlText': apply_url or 'Contact employer directly',
+    }
+
+
+def send_bulk_chunk(ses_client, sender_email, chunk):
+    """One SendBulkTemplatedEmail call for up to 50 (email, template_data) destinations.
+
+    Returns one status per destination, in order: 'Success' or the SES error status.
+    Errors for the call as a whole (e.g. throttling) are raised.
+    """
+    response = ses_client.send_bulk_templated_email(
+        Source=sender_email,
+        Template=DIGEST_TEMPLATE_NAME,
+        DefaultTemplateData=json.dumps(DEFAULT_TEMPLATE_DATA),
+        Destinations=[
+            {
+                'Destination': {'ToAddresses': [email]},
+                'ReplacementTemplateData': json.dumps(template_data, ensure_ascii=False, default=str),
+            }
+            for email, template_data in chunk
+        ]
+    )
+    statuses = [status.get('Status', 'Failed') for status in response.get('Status', [])]
+    # SES returns one status per destination; treat anything missing as failed
+    return statuses + ['Failed'] * (len(chunk) - len(statuses))
+
@@ -0,0 +1,106 @@
+"""
+RECOMMENDATION ARCHIVER
+=======================
+Copies job recommendations that DynamoDB deleted on expiry (the expiresAt TTL attribute,
+see jobsearch_common/retention.py) from JobRecommendationsTable's stream to compressed
+archive files, so the table only holds the retention window.
+
+Each stream batch becomes one gzip-compressed NDJSON object (one item per line, with
+jobInformation decoded) under ARCHIVE_PREFIX/dt=<deletion date>/ in ARCHIVE_BUCKET_NAME.
+With ARCHIVE_DIR set instead, files are written to that local directory (local runs and
+tests). Object names are built from the batch's stream sequence numbers, so a retried
+batch overwrites its own archive rather than adding a duplicate.
+
+Only TTL deletions are archived; deletes made by users or code are ignored.
+"""
+
+import base64
+import gzip
+import json
+import os
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from boto3.dynamodb.types import Binary, TypeDeserializer
+from jobsearch_common import env_str, lazy_client
+from jobsearch_common.job_codec import decode_job_information
+
+ARCHIVE_BUCKET_NAME = env_str('ARCHIVE_BUCKET_NAME')
+ARCHIVE_DIR = env_str('ARCHIVE_DIR')
+ARCHIVE_PREFIX = env_str('ARCHIVE_PREFIX', 'job-recommendations')
+
+s3 = lazy_client('s3')
+deserializer = TypeDeserializer()
+
+
+def is_ttl_removal(record):
+    """True for stream records of items deleted by DynamoDB's TTL process"""
+    identity = record.get('userIdentity') or {}
+    return (record.get('eventName') == 'REMOVE'
+            and identity.get('type') == 'Service'
+            and identity.get('principalId') == 'dynamodb.amazonaws.com')
+
+
+def archived_item(record):
+    """The deleted item from the record's old image, with jobInformation decoded"""
+    image = record['dynamodb'].get('OldImage') or {}
+    item = {key: deserializer.deserialize(value) for key, value in image.items()}
+    return decode_job_information(item)
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, Binary):
+        return base64.b64encode(value.value).decode('ascii')
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def archive_key(records):
+    """Deterministic object key for a batch: deletion date and sequence number range"""
+    first, last = records[0]['dynamodb'], records[-1]['dynamodb']
+    deleted_at = datetime.fromtimestamp(float(first.get('ApproximateCreationDateTime', 0)), timezone.utc)
+    return f"{ARCHIVE_PREFIX}/dt={deleted_at:%Y-%m-%d}/{first['SequenceNumber']}-{last['SequenceNumber']}.ndjson.gz"
+
+
+def write_archive(key, body):
+    """Store body under key in the archive bucket, or in ARCHIVE_DIR when set"""
+    if ARCHIVE_DIR:
+        path = os.path.join(ARCHIVE_DIR, *key.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, 'wb') as f:
+            f.write(body)
+        os.replace(temporary_path, path)
+        return path
+    s3.put_object(
+        Bucket=ARCHIVE_BUCKET_NAME,
+        Key=key,
+        Body=body,
+        ContentType='application/x-ndjson',
+        ContentEncoding='gzip'
+    )
+    return f"s3://{ARCHIVE_BUCKET_NAME}/{key}"
+
+
+def lambda_handler(event, context):
+    """Archive the TTL deletions of a JobRecommendationsTable stream batch"""
+    if not ARCHIVE_BUCKET_NAME and not ARCHIVE_DIR:
+        raise ValueError("Missing required environment variable: ARCHIVE_BUCKET_NAME (or ARCHIVE_DIR)")
+
+    records = [record for record in event.get('Records', []) if is_ttl_removal(record)]
+    if not records:
+        return {'archived': 0}
+
+    lines = [json.dumps(archived_item(record), default=_json_default, ensure_ascii=False, separators=(',', ':'))
+             for record in records]
+    payload = ('\n'.join(lines) + '\n').encode('utf-8')
+    body = gzip.compress(payload, mtime=0)
+
+    # Errors propagate so the stream retries the batch (bisected on repeated failure)
+    location = write_archive(archive_key(records), body)
+    print(f"📦 Archived {len(records)} expired recommendations to {location} "
+          f"({len(payload)} bytes, {len(body)} compressed)")
+    return {'archived': len(records), 'location': location}
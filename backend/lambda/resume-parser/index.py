@@ -1,9 +1,10 @@
 import json
-import boto3
 from typing import Dict, Any
+from jobsearch_common import lazy_client
 
-bedrock_runtime = boto3.client('bedrock-runtime')
-s3_client = boto3.client('s3')
+# Created on first use by the layer's client registry (long Bedrock read timeout)
+bedrock_runtime = lazy_client('bedrock-runtime')
+s3_client = lazy_client('s3')
 
 def extract_and_parse_resume(s3_uri: str) -> Dict[str, Any]:
     """Extract and parse resume using Nova Pro document understanding"""
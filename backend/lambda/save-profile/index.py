@@ -1,22 +1,66 @@
+import base64
+import hashlib
 import json
-import boto3
-import os
-from typing import Dict, Any
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List
 from datetime import datetime
+from jobsearch_common import env_int, env_str, require_env, resource, sanitize_email_for_actor_id
+
+# Profile fields saved from parsed_data, with the value a new profile gets when absent
+PROFILE_FIELDS = {
+    'fullName': '',
+    'location': '',
+    'headline': '',
+    'aboutMe': '',
+    'education': '',
+    'experience': '',
+    'phone': '',
+    'preferredJobRole': '',
+    'linkedin': '',
+    'optInStatus': False,
+    'communicationMethod': '',
+}
+
+# Fields returned by GET, in response order, with the value returned when not stored
+PROFILE_GET_FIELDS = {
+    'fullName': '',
+    'location': '',
+    'headline': '',
+    'aboutMe': '',
+    'education': '',
+    'experience': '',
+    'email': '',
+    'phone': '',
+    'preferredJobRole': '',
+    'linkedin': '',
+    'optInStatus': False,
+    'communicationMethod': '',
+}
+
+# Bulk import (POST ?mode=bulk): largest accepted import and update_item calls in flight
+# (at most the layer's DynamoDB connection pool, DYNAMODB_MAX_POOL_CONNECTIONS)
+BULK_IMPORT_MAX_ROWS = env_int('BULK_IMPORT_MAX_ROWS', 10000)
+BULK_IMPORT_CONCURRENCY = env_int('BULK_IMPORT_CONCURRENCY', 32)
 
 def lambda_handler(event: Dict[str, Any], context) -> Dict[str, Any]:
     """
     Lambda function to save and retrieve student profile data from DynamoDB
     Supports both POST (save) and GET (retrieve) operations
+
+    GET accepts an optional fields query parameter (comma-separated profile fields) and
+    returns an ETag; a request whose If-None-Match matches it gets 304 without a body
+
+    POST ?mode=bulk imports many profiles at once from an NDJSON or JSON array body
+    (see bulk_import)
     """
 
     try:
-        table_name = os.environ.get('STUDENT_PROFILE_TABLE_NAME')
-        if not table_name:
-            raise ValueError("STUDENT_PROFILE_TABLE_NAME environment variable not set")
+        table_name = require_env('STUDENT_PROFILE_TABLE_NAME')
 
-        dynamodb = boto3.resource('dynamodb')
-        table = dynamodb.Table(table_name)
+        # Shared resource from the layer's registry, reused by warm invocations
+        table = resource('dynamodb').Table(table_name)
 
         http_method = event.get('requestContext', {}).get('http', {}).get('method') or event.get('httpMethod', 'POST')
         print(f"🔍 Detected HTTP method: {http_method}")
@@ -36,34 +80,41 @@ def lambda_handler(event: Dict[str, Any], context) -> Dict[str, Any]:
             print(f"🔍 Retrieving profile for email: {email}")
 
             # Sanitize email for actionID lookup (same logic as save)
-            sanitized = ''.join('_' if c not in 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_/*' else c for c in email)
-            action_id = sanitized.replace('::', ':_')
+            action_id = sanitize_email_for_actor_id(email)
 
-            # Get item from DynamoDB
-            response = table.get_item(Key={'actionID': action_id})
+            # Only the requested fields are read (?fields=fullName,preferredJobRole), plus the
+            # timestamp the ETag is derived from
+            fields = requested_profile_fields(event.get('queryStringParameters') or {})
+            if not fields:
+                return {
+                    'statusCode': 400,
+                    'body': json.dumps({
+                        'error': f"fields must name profile fields: {', '.join(PROFILE_GET_FIELDS)}"
+                    })
+                }
+            names = {f"#{field}": field for field in fields + ['timestamp']}
+            response = table.get_item(
+                Key={'actionID': action_id},
+                ProjectionExpression=', '.join(names),
+                ExpressionAttributeNames=names
+            )
 
             if 'Item' in response:
                 item = response['Item']
                 print(f"✅ Profile found for email: {email}")
 
+                etag = profile_etag(item.get('timestamp'), fields)
+                headers = {'ETag': etag, 'Cache-Control': 'no-cache'} if etag else {}
+                if etag and etag_matches(event.get('headers') or {}, etag):
+                    print(f"✅ Profile unchanged for email: {email} (ETag {etag})")
+                    return {'statusCode': 304, 'headers': headers, 'body': ''}
+
                 # Return profile data (exclude internal fields)
-                profile_data = {
-                    'fullName': item.get('fullName', ''),
-                    'location': item.get('location', ''),
-                    'headline': item.get('headline', ''),
-                    'aboutMe': item.get('aboutMe', ''),
-                    'education': item.get('education', ''),
-                    'experience': item.get('experience', ''),
-                    'email': item.get('email', ''),
-                    'phone': item.get('phone', ''),
-                    'preferredJobRole': item.get('preferredJobRole', ''),
-                    'linkedin': item.get('linkedin', ''),
-                    'optInStatus': item.get('optInStatus', False),
-                    'communicationMethod': item.get('communicationMethod', '')
-                }
+                profile_data = {field: item.get(field, PROFILE_GET_FIELDS[field]) for field in fields}
 
                 return {
                     'statusCode': 200,
+                    'headers': headers,
                     'body': json.dumps({
                         'message': 'Profile retrieved successfully',
                         'profile': profile_data
@@ -94,6 +145,9 @@ def lambda_handler(event: Dict[str, Any], context) -> Dict[str, Any]:
                     })
                 }
 
+            if (event.get('queryStringParameters') or {}).get('mode') == 'bulk':
+                return bulk_import(event, table)
+
             print(f"📨 Raw body: {event['body'][:500]}...")  # First 500 chars to avoid huge logs
             parsed_data = json.loads(event['body'])['parsed_data']
             print(f"📨 Parsed data keys: {list(parsed_data.keys()) if parsed_data else 'None'}")
@@ -106,47 +160,26 @@ def lambda_handler(event: Dict[str, Any], context) -> Dict[str, Any]:
             print(f"🔍 Parsed data: {json.dumps(parsed_data)}")
             # Use email as actionID with underscore replacement
             email = parsed_data.get('email')
-            sanitized = ''.join('_' if c not in 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_/*' else c for c in email)
-            # Fix consecutive colons
-            action_id = sanitized.replace('::', ':_')
+            action_id = sanitize_email_for_actor_id(email)
 
             try:
-                print(f"🔍 Checking for existing profile with actionID: {action_id}")
-
-                # Check if profile already exists
-                existing_response = table.get_item(Key={'actionID': action_id})
-                existing_item = existing_response.get('Item', {}) if 'Item' in existing_response else {}
-
-                print(f"🔍 Existing item found: {'Yes' if existing_item else 'No'}")
-                print(f"🔍 Existing item keys: {list(existing_item.keys()) if existing_item else 'None'}")
-
-                # Merge existing data with new data (preserve fields not in parsed_data)
-                merged_item = {
-                    **existing_item,  # Keep all existing fields
-                    'actionID': action_id,
-                    'email': email,
-                    'fullName': parsed_data.get('fullName', existing_item.get('fullName', '')),
-                    'location': parsed_data.get('location', existing_item.get('location', '')),
-                    'headline': parsed_data.get('headline', existing_item.get('headline', '')),
-                    'aboutMe': parsed_data.get('aboutMe', existing_item.get('aboutMe', '')),
-                    'education': parsed_data.get('education', existing_item.get('education', '')),
-                    'experience': parsed_data.get('experience', existing_item.get('experience', '')),
-                    'phone': parsed_data.get('phone', existing_item.get('phone', '')),
-                'preferredJobRole': parsed_data.get('preferredJobRole', existing_item.get('preferredJobRole', '')),
-                'linkedin': parsed_data.get('linkedin', existing_item.get('linkedin', '')),
-                'optInStatus': parsed_data.get('optInStatus', existing_item.get('optInStatus', False)),
-                'communicationMethod': parsed_data.get('communicationMethod', existing_item.get('communicationMethod', '')),
-                    'timestamp': datetime.utcnow().isoformat()
-                }
-
-                print(f"💾 About to save merged item with preferredJobRole: {merged_item.get('preferredJobRole', 'NOT_SET')}")
-                print(f"💾 Full merged item keys: {list(merged_item.keys())}")
+                # One update_item merges the save into the stored profile: fields present in
+                # parsed_data are overwritten, absent ones keep their stored value (or get the
+                # default on a new profile). Concurrent saves from the profile page and resume
+                # upload no longer overwrite each other's fields.
+                update_expression, names, values = build_profile_update(parsed_data, email)
+                print(f"💾 Updating profile {action_id} with fields: {sorted(k for k in PROFILE_FIELDS if k in parsed_data)}")
 
-                # Save to DynamoDB
-                response = table.put_item(Item=merged_item)
-                print(f"💾 DynamoDB put_item response: {response}")
+                response = table.update_item(
+                    Key={'actionID': action_id},
+                    UpdateExpression=update_expression,
+                    ExpressionAttributeNames=names,
+                    ExpressionAttributeValues=values
+                )
+                print(f"💾 DynamoDB update_item response: {response.get('ResponseMetadata', {}).get('HTTPStatusCode')}")
                 print("✅ Item successfully saved to DynamoDB")
 
+
             except Exception as save_error:
                 print(f"❌ Error during save operation: {str(save_error)}")
                 print(f"❌ Error type: {type(save_error).__name__}")
@@ -186,4 +219,178 @@ def lambda_handler(event: Dict[str, Any], context) -> Dict[str, Any]:
                 'error': str(e),
                 'message': 'Failed to process profile request'
             })
-        }
\ No newline at end of file
+        }
+
+def build_profile_update(parsed_data: Dict[str, Any], email: str, timestamp: str = None):
+    """UpdateExpression, names and values that merge parsed_data into the stored profile"""
+    assignments = ['#email = :email', '#timestamp = :timestamp']
+    names = {'#email': 'email', '#timestamp': 'timestamp'}
+    values = {':email': email, ':timestamp': timestamp or datetime.utcnow().isoformat()}
+    for field, default in PROFILE_FIELDS.items():
+        names[f"#{field}"] = field
+        if field in parsed_data:
+            assignments.append(f"#{field} = :{field}")
+            values[f":{field}"] = parsed_data[field]
+        else:
+            assignments.append(f"#{field} = if_not_exists(#{field}, :{field})")
+            values[f":{field}"] = default
+    return 'SET ' + ', '.join(assignments), names, values
+
+class InvalidRow:
+    """Stand-in for an NDJSON line that is not valid JSON"""
+
+    def __init__(self, error: str):
+        self.error = error
+
+def parse_bulk_rows(body: str) -> List[Any]:
+    """Rows of a JSON array or NDJSON body; an NDJSON line that does not parse becomes an InvalidRow"""
+    if body.lstrip().startswith('['):
+        rows = json.loads(body)
+        if not isinstance(rows, list):
+            raise ValueError("body must be a JSON array or NDJSON")
+        return rows
+    rows = []
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        try:
+            rows.append(json.loads(line))
+        except ValueError as e:
+            rows.append(InvalidRow(f"not valid JSON: {e}"))
+    return rows
+
+def validate_bulk_row(row: Any) -> tuple:
+    """(email, profile fields) of a bulk import row; raises ValueError if the row cannot be imported"""
+    if isinstance(row, InvalidRow):
+        raise ValueError(row.error)
+    if not isinstance(row, dict):
+        raise ValueError("row must be a JSON object")
+    email = row.get('email')
+    if not isinstance(email, str) or '@' not in email:
+        raise ValueError("email is required")
+    # Each field must have its default's type (text fields strings, optInStatus a boolean)
+    wrong = [f"{field} must be {'a boolean' if isinstance(default, bool) else 'a string'}"
+             for field, default in PROFILE_FIELDS.items()
+             if field in row and type(row[field]) is not type(default)]
+    if wrong:
+        raise ValueError('; '.join(wrong))
+    return email, {field: row[field] for field in PROFILE_FIELDS if field in row}
+
+def bulk_import(event: Dict[str, Any], table) -> Dict[str, Any]:
+    """
+    Import a cohort of profiles with concurrent update_item calls and report a status per row.
+
+    The body is NDJSON (one profile object per line) or a JSON array of profile objects,
+    each with the parsed_data fields of a single save, and each row is saved like one:
+    fields in the row are overwritten, the others keep their stored value. Rows are
+    numbered from 0 in input order (NDJSON blank lines are skipped), and each gets a
+    status: saved, invalid (not imported), duplicate (a later row has the same email)
+    or failed (the write did not succeed).
+    """
+    body = event.get('body') or ''
+    try:
+        # Function URLs base64-encode bodies of non-text content types such as application/x-ndjson
+        if event.get('isBase64Encoded'):
+            body = base64.b64decode(body).decode('utf-8')
+        rows = parse_bulk_rows(body)
+    except ValueError as e:
+        return {'statusCode': 400, 'body': json.dumps({'error': f"Invalid bulk import body: {e}"})}
+    if not rows:
+        return {'statusCode': 400, 'body': json.dumps({'error': 'No profiles to import'})}
+    if len(rows) > BULK_IMPORT_MAX_ROWS:
+        return {
+            'statusCode': 413,
+            'body': json.dumps({'error': f"At most {BULK_IMPORT_MAX_ROWS} profiles per import, got {len(rows)}"})
+        }
+
+    started = time.perf_counter()
+    print(f"📥 Bulk import of {len(rows)} profiles")
+    results = import_profiles(rows, table)
+    counts = Counter(result['status'] for result in results)
+    print(f"📥 Bulk import done in {time.perf_counter() - started:.2f}s: {dict(counts)}")
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'message': f"Imported {counts['saved']} of {len(rows)} profiles",
+            'saved': counts['saved'],
+            'invalid': counts['invalid'],
+            'duplicate': counts['duplicate'],
+            'failed': counts['failed'],
+            'results': results
+        })
+    }
+
+def import_profiles(rows: List[Any], table) -> List[Dict[str, Any]]:
+    """Validate rows, save the valid ones concurrently and return one result per row"""
+    results = [None] * len(rows)
+    timestamp = datetime.utcnow().isoformat()
+
+    # Validate and sanitize in one pass; concurrent writes to one key could land in any
+    # order, so only the last row of each student is written
+    latest: Dict[str, tuple] = {}
+    for index, row in enumerate(rows):
+        try:
+            email, fields = validate_bulk_row(row)
+        except ValueError as e:
+            results[index] = {'row': index, 'status': 'invalid', 'error': str(e)}
+            continue
+        action_id = sanitize_email_for_actor_id(email)
+        if action_id in latest:
+            earlier = latest.pop(action_id)[0]
+            results[earlier] = {'row': earlier, 'actionID': action_id, 'status': 'duplicate',
+                                'error': f"replaced by row {index}"}
+        latest[action_id] = (index, email, fields)
+
+    pending = list(latest.items())
+    if not pending:
+        return results
+
+    # Resources are not thread-safe; the table's client is (and takes the same plain values)
+    dynamodb_client = table.meta.client
+
+    def save(entry):
+        action_id, (_, email, fields) = entry
+        update_expression, names, values = build_profile_update(fields, email, timestamp)
+        try:
+            dynamodb_client.update_item(
+                TableName=table.name,
+                Key={'actionID': action_id},
+                UpdateExpression=update_expression,
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values
+            )
+        except Exception as e:
+            return str(e)
+        return None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(BULK_IMPORT_CONCURRENCY, len(pending)))) as executor:
+        for (action_id, (index, _, _)), error in zip(pending, executor.map(save, pending)):
+            if error:
+                results[index] = {'row': index, 'actionID': action_id, 'status': 'failed', 'error': error}
+            else:
+                results[index] = {'row': index, 'actionID': action_id, 'status': 'saved'}
+    return results
+
+def requested_profile_fields(query_params: Dict[str, Any]):
+    """Profile fields named by the fields query parameter (all fields when absent)"""
+    requested = query_params.get('fields')
+    if not requested:
+        return list(PROFILE_GET_FIELDS)
+    names = {name.strip() for name in requested.split(',')}
+    return [field for field in PROFILE_GET_FIELDS if field in names]
+
+def profile_etag(timestamp, fields):
+    """Strong ETag of a profile representation: its save timestamp and the fields returned"""
+    if not timestamp:
+        return None
+    digest = hashlib.sha256(f"{timestamp}|{','.join(fields)}".encode('utf-8')).hexdigest()[:32]
+    return f'"{digest}"'
+
+def etag_matches(headers: Dict[str, Any], etag: str) -> bool:
+    """True if the request's If-None-Match names etag (Function URL headers are lower-case)"""
+    if_none_match = headers.get('if-none-match') or headers.get('If-None-Match')
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    return '*' in candidates or etag in candidates
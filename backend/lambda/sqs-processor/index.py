@@ -1,54 +1,187 @@
 import json
-import boto3
-from botocore.config import Config
-import os
+import random
 import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from botocore.exceptions import ClientError
+from jobsearch_common import client as aws_client, env_float, env_int, env_str, lazy_client
+from rate_limiter import AdaptiveRateLimiter, LimiterLease, is_throttle_error
+from sse import iter_events
+
+# Number of SQS records processed in parallel within one invocation.
+# Each record holds an AgentCore stream open for several minutes, so records are
+# run concurrently and the batch finishes in roughly the time of its slowest record.
+MAX_CONCURRENCY = env_int('MAX_CONCURRENCY', 10)
+
+# Seconds kept in reserve before the Lambda timeout. Records still running at that
+# point are reported as failed so the successful ones are deleted from the queue
+# instead of the whole batch being re-delivered after a timeout.
+DEADLINE_MARGIN_SECONDS = env_int('DEADLINE_MARGIN_SECONDS', 30)
+
+# Low-level clients: unlike boto3 resources, clients are safe to share across worker threads.
+# Created on first use by the layer's client registry.
+dynamodb = lazy_client('dynamodb')
+sqs = lazy_client('sqs')
+
+# Messages planned by the batch scheduler carry a not_before time; ones that arrive early
+# are re-queued with an SQS delay (max 15 minutes per hop) instead of running now
+MAX_SQS_DELAY_SECONDS = 900
+SCHEDULE_EARLY_TOLERANCE_SECONDS = env_int('SCHEDULE_EARLY_TOLERANCE_SECONDS', 60)
+
+# Weight of the latest run in the per-user run time estimate used by the scheduler
+COST_EWMA_ALPHA = 0.3
+
+# AgentCore quota shaping: sessions start at AGENTCORE_MAX_TPS at most, and the number of
+# concurrent sessions ramps up from LIMITER_INITIAL_CONCURRENCY while calls succeed and
+# is cut back on throttling or 5xx responses (AIMD)
+INVOKE_MAX_ATTEMPTS = env_int('INVOKE_MAX_ATTEMPTS', 4)
+limiter = AdaptiveRateLimiter(
+    initial_concurrency=env_int('LIMITER_INITIAL_CONCURRENCY', 2),
+    max_concurrency=MAX_CONCURRENCY,
+    rate_per_second=env_float('AGENTCORE_MAX_TPS', 5.0)
+)
+
+def get_agentcore_client():
+    """Return the shared Bedrock AgentCore client, creating it on first use.
+
+    boto3 clients are thread-safe, so one client (and its connection pool) is shared
+    by all worker threads and reused across warm invocations. The layer's registry
+    configures it for batch processing, which can take 5-10 minutes for complex
+    profiles: a 15 minute read timeout and no botocore retries, since throttling is
+    handled by the adaptive limiter.
+    """
+    return aws_client('bedrock-agentcore', max_pool_connections=max(MAX_CONCURRENCY, 10))
 
 def lambda_handler(event, context):
     """SQS triggered processor - processes individual job notification requests using Bedrock AgentCore"""
-    
+
     # Get environment variables
-    runtime_arn = os.environ.get('BEDROCK_AGENTCORE_RUNTIME_ARN')
-    qualifier = os.environ.get('BEDROCK_AGENTCORE_QUALIFIER', 'DEFAULT')
-    
+    runtime_arn = env_str('BEDROCK_AGENTCORE_RUNTIME_ARN')
+    qualifier = env_str('BEDROCK_AGENTCORE_QUALIFIER', 'DEFAULT')
+
     if not runtime_arn:
         print("ERROR: BEDROCK_AGENTCORE_RUNTIME_ARN environment variable not set")
         raise ValueError("Missing BEDROCK_AGENTCORE_RUNTIME_ARN configuration")
-    
-    # Initialize Bedrock AgentCore client with extended timeout
-    # Batch processing can take 5-10 minutes for complex profiles with multiple job roles
-    config = Config(
-        read_timeout=900,  # 15 minutes to match Lambda timeout
-        connect_timeout=10
-    )
-    client = boto3.client('bedrock-agentcore', config=config)
-    
+
+    client = get_agentcore_client()
+    profile_table_name = env_str('STUDENT_PROFILE_TABLE_NAME')
+    records = event['Records']
+
     processed_count = 0
     failed_count = 0
-    
-    for record in event['Records']:
+    deferred_count = 0
+    batch_item_failures = []
+    batch_start = time.perf_counter()
+
+    # Stop waiting shortly before the Lambda timeout so we can still report which records failed
+    timeout = None
+    deadline = None
+    if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+        timeout = max(context.get_remaining_time_in_millis() / 1000 - DEADLINE_MARGIN_SECONDS, 0)
+        deadline = time.monotonic() + timeout
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(MAX_CONCURRENCY, len(records))))
+    futures = {}
+    leases = {}
+    for record in records:
+        lease = LimiterLease(limiter)
+        future = executor.submit(process_record, client, record, runtime_arn, qualifier, profile_table_name, deadline, lease)
+        futures[future] = record
+        leases[future] = lease
+    done, not_done = wait(futures, timeout=timeout)
+
+    for future in done:
+        record = futures[future]
         try:
-            message = json.loads(record['body'])
-            email = message.get('email')
-            session_id = message.get('session_id')
-            user_profile = message.get('user_profile', {})
-            source = message.get('source', 'batch')
-            
-            print(f"Processing job search request for {email} with session {session_id}")
-            print(f"User profile data: {user_profile}")
-            
-            if not email or '@' not in email:
-                print(f"Invalid email: {email}")
-                continue
-                
-            if not session_id or len(session_id) < 33:
-                print(f"Invalid session ID (must be 33+ chars): {session_id}")
-                continue
-            
-            # ENHANCEMENT: Create enhanced batch job search prompt with comprehensive user profile data
-            # This personalized prompt helps AgentCore find more relevant job matches
-            batch_prompt = f"""Find personalized job opportunities for daily batch processing.
-            
+            status, elapsed = future.result()
+        except Exception as e:
+            # process_record handles its own errors; this only guards against bugs in it
+            status, elapsed = 'failed', None
+            print(f"Unexpected error processing message {record.get('messageId')}: {str(e)}")
+
+        if status == 'processed':
+            processed_count += 1
+        elif status == 'deferred':
+            deferred_count += 1
+        elif status == 'failed':
+            failed_count += 1
+            batch_item_failures.append({'itemIdentifier': record['messageId']})
+
+        timing = f"{elapsed:.1f}s" if elapsed is not None else "n/a"
+        print(f"Record {record.get('messageId')} finished with status={status} in {timing}")
+
+    for future in not_done:
+        record = futures[future]
+        failed_count += 1
+        batch_item_failures.append({'itemIdentifier': record['messageId']})
+        print(f"Record {record.get('messageId')} did not finish before the Lambda deadline, returning it to the queue")
+        # Free its limiter slot and stop its stream now: the worker thread is not waited for
+        # and would otherwise hold the slot into the next warm invocation
+        leases[future].abandon()
+
+    # Don't block on records that overran the deadline; they are retried via batchItemFailures
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    print(json.dumps(limiter.emf_record()))
+
+    batch_elapsed = time.perf_counter() - batch_start
+    result_msg = (f"Processed {processed_count} job searches, {failed_count} failed, "
+                  f"{deferred_count} deferred to their scheduled time in {batch_elapsed:.1f}s")
+    print(result_msg)
+
+    # Partial batch response: only the failed messages become visible again for retry
+    return {
+        'batchItemFailures': batch_item_failures
+    }
+
+def process_record(client, record, runtime_arn, qualifier, profile_table_name=None, deadline=None, lease=None):
+    """Run one SQS record through AgentCore.
+
+    deadline is a time.monotonic() value after which no new AgentCore session is started.
+    lease is the record's LimiterLease, which the handler abandons if the record overruns
+    the deadline (a new one is used when not given).
+
+    Returns a (status, elapsed_seconds) tuple where status is 'processed', 'failed',
+    'deferred' (re-queued until its scheduled start) or 'skipped' (invalid or already
+    completed message that must not be retried).
+    """
+    start = time.perf_counter()
+    message = {}
+    lease = lease or LimiterLease(limiter)
+
+    try:
+        message = json.loads(record['body'])
+        email = message.get('email')
+        session_id = message.get('session_id')
+        action_id = message.get('action_id')
+        user_profile = message.get('user_profile', {})
+        source = message.get('source', 'batch')
+        schedule = message.get('schedule') or {}
+
+        print(f"Processing job search request for {email} with session {session_id}")
+        print(f"User profile data: {user_profile}")
+
+        if not email or '@' not in email:
+            print(f"Invalid email: {email}")
+            return 'skipped', time.perf_counter() - start
+
+        if not session_id or len(session_id) < 33:
+            print(f"Invalid session ID (must be 33+ chars): {session_id}")
+            return 'skipped', time.perf_counter() - start
+
+        # A re-delivered message whose AgentCore run already succeeded must not be run again
+        if is_session_completed(profile_table_name, action_id, session_id):
+            print(f"Session {session_id} for {email} already completed, skipping re-delivered message")
+            return 'skipped', time.perf_counter() - start
+
+        # Spread load across the batch window: don't start before the scheduled time
+        if defer_until_scheduled(record, schedule, email):
+            return 'deferred', time.perf_counter() - start
+
+        # ENHANCEMENT: Create enhanced batch job search prompt with comprehensive user profile data
+        # This personalized prompt helps AgentCore find more relevant job matches
+        batch_prompt = f"""Find personalized job opportunities for daily batch processing.
+
 User Details:
 - Email: {email}
 - Full Name: {user_profile.get('fullName', 'Not provided')}
@@ -70,98 +203,218 @@ Please find jobs that match:
 
 Focus on quality matches that would be valuable for daily notifications. Use the user's specific profile information to find the most relevant opportunities."""
 
-            # Prepare payload for AgentCore
-            payload = json.dumps({
-                "prompt": batch_prompt,
-                "email": email,
-                "session_id": session_id,
-                "source": source
-            })
-            
-            print(f"Invoking AgentCore for {email}...")
-            print(f"Runtime ARN: {runtime_arn}")
-            print(f"Session ID: {session_id}")
-            print(f"Payload length: {len(payload)} characters")
-            
-            # ENHANCEMENT: Invoke Bedrock AgentCore with proper runtime ARN
-            # Changed from regular Bedrock Agent to AgentCore for better integration
-            response = client.invoke_agent_runtime(
-                agentRuntimeArn=runtime_arn,
-                runtimeSessionId=session_id,
-                payload=payload,
-                qualifier=qualifier
-            )
-            
-            # CORRECT: Process AgentCore SSE (Server-Sent Events) format: "data: {json}\n\n"
-            response_stream = response['response']
-            job_agent_result = None
-            buffer = ''
-
-            try:
-                # Read streaming response and process SSE format
-                for chunk in response_stream:
-                    if chunk:
-                        chunk_data = chunk.decode('utf-8') if isinstance(chunk, bytes) else str(chunk)
-                        buffer += chunk_data
-
-                        # Process complete lines from the buffer
-                        lines = buffer.split('\n')
-                        buffer = lines.pop() or ''  # Keep incomplete line in buffer
-
-                        for line in lines:
-                            line = line.strip()
-                            if line.startswith('data: '):
-                                try:
-                                    # Parse JSON from after "data: "
-                                    event = json.loads(line[6:])  # Remove "data: " prefix
-                                    print(f"AgentCore event for {email}: {event}")
-
-                                    # Look for job_agent_result event
-                                    if "job_agent_result" in event:
-                                        job_agent_result = event["job_agent_result"]
-                                        print(f"Found job_agent_result for {email}: {job_agent_result}")
-                                        break  # We got what we need
-
-                                except json.JSONDecodeError as json_err:
-                                    print(f"JSON decode error for line: {line} - {json_err}")
-                                    continue
-
-                        if job_agent_result:
-                            break  # Exit outer loop if we found the result
-
-            except Exception as stream_err:
-                print(f"Error reading AgentCore stream for {email}: {stream_err}")
-                # No fallback - if streaming fails, mark as failure
-
-            # Check the job_agent_result for success/failure
-            if job_agent_result:
-                result_lower = job_agent_result.lower()
-                if "error" in result_lower or "failed" in result_lower:
-                    print(f"AgentCore returned error for {email}: {job_agent_result}")
-                    failed_count += 1
-                else:
-                    print(f"Successfully processed job search for {email}: {job_agent_result}")
-                    processed_count += 1
-            else:
-                failed_count += 1
-                print(f"No job_agent_result found for {email}")
-            
-            # Add small delay to avoid overwhelming the service
-            time.sleep(0.1)
-                
-        except Exception as e:
-            failed_count += 1
-            error_msg = f"Error processing SQS message for {message.get('email', 'unknown')}: {str(e)}"
-            print(error_msg)
-            
-            # For batch processing, we don't want to fail the entire batch
-            # Log the error but continue processing other messages
-            continue
-    
-    result_msg = f"Processed {processed_count} job searches, {failed_count} failed"
-    print(result_msg)
-    
-    return {
-        'statusCode': 200,
-        'body': json.dumps(result_msg)
-    }
\ No newline at end of file
+        # Prepare payload for AgentCore
+        payload = json.dumps({
+            "prompt": batch_prompt,
+            "email": email,
+            "session_id": session_id,
+            "source": source
+        })
+
+        print(f"Invoking AgentCore for {email}...")
+        print(f"Runtime ARN: {runtime_arn}")
+        print(f"Session ID: {session_id}")
+        print(f"Payload length: {len(payload)} characters")
+
+        # ENHANCEMENT: Invoke Bedrock AgentCore with proper runtime ARN
+        # Changed from regular Bedrock Agent to AgentCore for better integration
+        # The limiter slot is held until the stream is consumed, since that is how long the session runs
+        response = invoke_agent_with_limiter(client, deadline, email, lease,
+            agentRuntimeArn=runtime_arn,
+            runtimeSessionId=session_id,
+            payload=payload,
+            qualifier=qualifier
+        )
+        if response is None:
+            return 'failed', time.perf_counter() - start
+        run_start = time.perf_counter()
+        # An abandoned record stops reading: closing the stream ends a blocked read
+        stream = response['response']
+        if hasattr(stream, 'close'):
+            lease.on_abandon(stream.close)
+
+        # Process AgentCore SSE (Server-Sent Events) format: "data: {json}\n\n"
+        # The incremental decoder works on bytes and stops reading once the result arrives
+        job_agent_result = None
+        event_count = 0
+        outcome = 'success'
+
+        try:
+            for sse_event in iter_events(stream):
+                if lease.abandoned:
+                    print(f"Stopped reading AgentCore stream for {email}: record abandoned at the deadline")
+                    break
+                event_count += 1
+                try:
+                    event = sse_event.json()
+                except ValueError as json_err:
+                    print(f"JSON decode error for event data: {sse_event.data[:200]} - {json_err}")
+                    continue
+
+                # Look for job_agent_result event
+                if isinstance(event, dict) and "job_agent_result" in event:
+                    job_agent_result = event["job_agent_result"]
+                    print(f"Found job_agent_result for {email} after {event_count} events: {job_agent_result}")
+                    break  # We got what we need
+
+        except Exception as stream_err:
+            outcome = 'throttled' if is_throttle_error(stream_err) else 'error'
+            print(f"Error reading AgentCore stream for {email} after {event_count} events: {stream_err}")
+            # No fallback - if streaming fails, mark as failure
+        finally:
+            lease.release(outcome)
+
+        # Check the job_agent_result for success/failure
+        if job_agent_result:
+            result_lower = job_agent_result.lower()
+            if "error" in result_lower or "failed" in result_lower:
+                print(f"AgentCore returned error for {email}: {job_agent_result}")
+                return 'failed', time.perf_counter() - start
+            print(f"Successfully processed job search for {email}: {job_agent_result}")
+            run_seconds = time.perf_counter() - run_start
+            mark_session_completed(profile_table_name, action_id, session_id,
+                                   run_seconds, schedule.get('cost_history_seconds'))
+            report_schedule_outcome(schedule, email, run_seconds)
+            return 'processed', time.perf_counter() - start
+
+        print(f"No job_agent_result found for {email}")
+        return 'failed', time.perf_counter() - start
+
+    except Exception as e:
+        error_msg = f"Error processing SQS message for {message.get('email', 'unknown')}: {str(e)}"
+        print(error_msg)
+
+        # For batch processing, we don't want to fail the entire batch
+        # Log the error and report only this record for retry
+        return 'failed', time.perf_counter() - start
+
+def invoke_agent_with_limiter(client, deadline, email, lease, **invoke_args):
+    """Start an AgentCore session once the adaptive limiter allows it, retrying throttled starts.
+
+    On success lease holds the limiter slot and the caller must release() it after reading
+    the stream. Returns None if no slot could be obtained before the deadline (or the lease
+    was abandoned) or all attempts were throttled.
+    """
+    for attempt in range(1, INVOKE_MAX_ATTEMPTS + 1):
+        timeout = None if deadline is None else deadline - time.monotonic()
+        if (timeout is not None and timeout <= 0) or not lease.acquire(timeout=timeout):
+            print(f"No AgentCore capacity for {email} before the deadline, leaving it for retry")
+            return None
+
+        try:
+            return client.invoke_agent_runtime(**invoke_args)
+        except ClientError as e:
+            if not is_throttle_error(e):
+                lease.release('error')
+                raise
+            lease.release('throttled')
+            # Exponential backoff with full jitter on top of the limiter's own cut-back
+            backoff = random.uniform(0, min(30, 2 ** attempt))
+            print(f"AgentCore throttled for {email} (attempt {attempt}/{INVOKE_MAX_ATTEMPTS}), "
+                  f"limit now {limiter.limit}, retrying in {backoff:.1f}s")
+            time.sleep(backoff)
+        except Exception:
+            lease.release('error')
+            raise
+
+    print(f"AgentCore still throttled for {email} after {INVOKE_MAX_ATTEMPTS} attempts")
+    return None
+
+def is_session_completed(profile_table_name, action_id, session_id):
+    """Check whether the batch session in this message already finished successfully"""
+    if not profile_table_name or not action_id:
+        return False
+    try:
+        response = dynamodb.get_item(
+            TableName=profile_table_name,
+            Key={'actionID': {'S': action_id}},
+            ProjectionExpression='lastBatchSessionId'
+        )
+        return response.get('Item', {}).get('lastBatchSessionId', {}).get('S') == session_id
+    except Exception as e:
+        print(f"Could not check completion state for {action_id}: {str(e)}")
+        return False
+
+def mark_session_completed(profile_table_name, action_id, session_id, run_seconds=None, cost_history_seconds=None):
+    """Record the successful batch session on the user's profile so re-deliveries skip it.
+
+    Also updates the run time estimate (EWMA) the batch scheduler uses for this user.
+    """
+    if not profile_table_name or not action_id:
+        return
+
+    update_expression = 'SET lastBatchSessionId = :session_id, lastBatchCompletedAt = :completed_at'
+    values = {
+        ':session_id': {'S': session_id},
+        ':completed_at': {'S': datetime.utcnow().isoformat()}
+    }
+    if run_seconds is not None:
+        if cost_history_seconds is None:
+            estimate = run_seconds
+        else:
+            estimate = COST_EWMA_ALPHA * run_seconds + (1 - COST_EWMA_ALPHA) * float(cost_history_seconds)
+        update_expression += ', lastBatchDurationSeconds = :duration, batchCostEstimateSeconds = :estimate'
+        values[':duration'] = {'N': str(round(run_seconds, 1))}
+        values[':estimate'] = {'N': str(round(estimate, 1))}
+
+    try:
+        dynamodb.update_item(
+            TableName=profile_table_name,
+            Key={'actionID': {'S': action_id}},
+            UpdateExpression=update_expression,
+            ConditionExpression='attribute_exists(actionID)',
+            ExpressionAttributeValues=values
+        )
+    except Exception as e:
+        # The AgentCore run itself succeeded; a missing marker only means a re-delivery would re-run it
+        print(f"Could not record completed session for {action_id}: {str(e)}")
+
+def defer_until_scheduled(record, schedule, email):
+    """Re-queue a message that arrived before its scheduled start. Returns True if deferred."""
+    not_before = schedule.get('not_before')
+    queue_url = env_str('SQS_QUEUE_URL')
+    if not not_before or not queue_url:
+        return False
+
+    wait_seconds = int(not_before - time.time())
+    if wait_seconds <= SCHEDULE_EARLY_TOLERANCE_SECONDS:
+        return False
+
+    # Send a delayed copy rather than extending visibility, so the receive count
+    # (and the dead-letter threshold) only reflects real failures
+    sqs.send_message(
+        QueueUrl=queue_url,
+        MessageBody=record['body'],
+        DelaySeconds=min(wait_seconds, MAX_SQS_DELAY_SECONDS)
+    )
+    print(f"Deferred {email}: scheduled start in {wait_seconds}s")
+    return True
+
+def report_schedule_outcome(schedule, email, run_seconds):
+    """Compare the actual completion with the batch scheduler's projection (EMF record)"""
+    projected_finish = schedule.get('projected_finish')
+    if not projected_finish:
+        return
+    now = time.time()
+    cutoff = schedule.get('cutoff')
+    on_time = 1 if not cutoff or now <= cutoff else 0
+    print(f"Schedule outcome for {email}: finished {now - projected_finish:+.0f}s vs projection, "
+          f"run took {run_seconds:.0f}s (estimated {schedule.get('estimated_seconds')}s)")
+    print(json.dumps({
+        '_aws': {
+            'Timestamp': int(now * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': 'JobSearch/BatchSchedule',
+                'Dimensions': [[]],
+                'Metrics': [
+                    {'Name': 'CompletionLagSeconds', 'Unit': 'Seconds'},
+                    {'Name': 'RunSeconds', 'Unit': 'Seconds'},
+                    {'Name': 'FinishedBeforeCutoff', 'Unit': 'Count'}
+                ]
+            }]
+        },
+        'CompletionLagSeconds': round(now - projected_finish),
+        'RunSeconds': round(run_seconds),
+        'EstimatedSeconds': schedule.get('estimated_seconds'),
+        'FinishedBeforeCutoff': on_time
+    }))
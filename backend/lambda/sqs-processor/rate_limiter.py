@@ -0,0 +1,228 @@
+"""
+Adaptive rate limiter for AgentCore invocations
+===============================================
+Combines a token bucket (start rate, matches the InvokeAgentRuntime TPS quota) with an
+AIMD concurrency limit (number of agent sessions streaming at once):
+
+- Every successful call raises the limit by increase_step / limit, i.e. roughly +1 per
+  window of `limit` successes (additive increase)
+- A throttle or 5xx multiplies the limit by decrease_factor (multiplicative decrease);
+  throttles within cooldown_seconds of the last cut count as the same congestion event
+
+The limiter lives at module scope so what it learned survives warm invocations.
+
+Limits are per container. Each concurrently running sqs-processor environment has its
+own limiter, so account-wide AgentCore starts reach rate_per_second x the SQS event
+source's maxConcurrency, and open sessions reach max_concurrency x maxConcurrency.
+The CDK stack sets maxConcurrency and divides the TPS quota between the containers.
+
+A LimiterLease holds one slot for one piece of work. When the handler abandons work
+at its deadline, the lease frees the slot and closes the session's stream. The worker
+thread is left running by shutdown(wait=False) and would otherwise keep the slot into
+the next warm invocation.
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+
+from botocore.exceptions import ClientError
+
+THROTTLE_ERROR_CODES = {
+    'ThrottlingException',
+    'TooManyRequestsException',
+    'ServiceQuotaExceededException',
+    'ServiceUnavailableException',
+    'RequestLimitExceeded',
+}
+
+
+def is_throttle_error(error):
+    """True for errors that mean "slow down": throttling codes and 5xx responses"""
+    if not isinstance(error, ClientError):
+        return False
+    code = error.response.get('Error', {}).get('Code', '')
+    status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+    return code in THROTTLE_ERROR_CODES or status >= 500
+
+
+class AdaptiveRateLimiter:
+    """Thread-safe AIMD concurrency limit plus token-bucket start rate"""
+
+    def __init__(self, initial_concurrency=2, min_concurrency=1, max_concurrency=10,
+                 rate_per_second=5.0, burst=None, increase_step=1.0, decrease_factor=0.5,
+                 cooldown_seconds=5.0):
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.rate_per_second = rate_per_second
+        self.burst = burst if burst is not None else max(1.0, rate_per_second)
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.cooldown_seconds = cooldown_seconds
+
+        self._limit = float(min(max(initial_concurrency, min_concurrency), max_concurrency))
+        self._in_flight = 0
+        self._tokens = self.burst
+        self._last_refill = time.monotonic()
+        self._last_decrease = float('-inf')
+        self._condition = threading.Condition()
+
+        self._successes = 0
+        self._throttles = 0
+        self._errors = 0
+        self._peak_in_flight = 0
+        self._wait_seconds = 0.0
+
+    @property
+    def limit(self):
+        return int(self._limit)
+
+    def acquire(self, timeout=None):
+        """Block until a concurrency slot and a token are available; False on timeout"""
+        start = time.monotonic()
+        deadline = start + timeout if timeout is not None else None
+        with self._condition:
+            while True:
+                self._refill()
+                if self._in_flight < int(self._limit) and self._tokens >= 1:
+                    self._tokens -= 1
+                    self._in_flight += 1
+                    self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+                    self._wait_seconds += time.monotonic() - start
+                    return True
+
+                # Sleep until the next token is due, or until a slot is released
+                wait_for = None
+                if self._tokens < 1 and self.rate_per_second > 0:
+                    wait_for = (1 - self._tokens) / self.rate_per_second
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._wait_seconds += time.monotonic() - start
+                        return False
+                    wait_for = remaining if wait_for is None else min(wait_for, remaining)
+                self._condition.wait(wait_for)
+
+    def release(self, outcome='success'):
+        """Free the slot and adapt the limit: outcome is 'success', 'throttled' or 'error'
+        ('cancelled' frees the slot without counting or adapting)"""
+        with self._condition:
+            self._in_flight = max(self._in_flight - 1, 0)
+            now = time.monotonic()
+            if outcome == 'success':
+                self._successes += 1
+                self._limit = min(self._limit + self.increase_step / max(self._limit, 1.0),
+                                  float(self.max_concurrency))
+            elif outcome == 'throttled':
+                self._throttles += 1
+                if now - self._last_decrease >= self.cooldown_seconds:
+                    self._limit = max(self._limit * self.decrease_factor, float(self.min_concurrency))
+                    self._last_decrease = now
+            elif outcome != 'cancelled':
+                self._errors += 1
+            self._condition.notify_all()
+
+    def metrics(self, reset=False):
+        """Snapshot of limiter state and counters; reset=True starts a new counting period"""
+        with self._condition:
+            self._refill()
+            snapshot = {
+                'ConcurrencyLimit': int(self._limit),
+                'InFlight': self._in_flight,
+                'PeakInFlight': self._peak_in_flight,
+                'AvailableTokens': round(self._tokens, 2),
+                'Successes': self._successes,
+                'Throttles': self._throttles,
+                'Errors': self._errors,
+                'LimiterWaitSeconds': round(self._wait_seconds, 3),
+            }
+            if reset:
+                self._successes = self._throttles = self._errors = 0
+                self._peak_in_flight = self._in_flight
+                self._wait_seconds = 0.0
+            return snapshot
+
+    def emf_record(self, namespace='JobSearch/SQSProcessor'):
+        """Limiter metrics since the last record, in CloudWatch Embedded Metric Format (print as one log line)"""
+        values = self.metrics(reset=True)
+        units = {'LimiterWaitSeconds': 'Seconds'}
+        record = {
+            '_aws': {
+                'Timestamp': int(datetime.now(timezone.utc).timestamp() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': namespace,
+                    'Dimensions': [['Component']],
+                    'Metrics': [{'Name': name, 'Unit': units.get(name, 'Count')} for name in values],
+                }],
+            },
+            'Component': 'AgentCoreLimiter',
+        }
+        record.update(values)
+        return record
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate_per_second)
+            self._last_refill = now
+
+
+class LimiterLease:
+    """A limiter slot for one piece of work, released at most once.
+
+    abandon() may be called from another thread. It frees a held slot and runs the
+    callback registered with on_abandon (e.g. closing a stream). Any later acquire()
+    fails and any later release() is a no-op.
+    """
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.abandoned = False
+        self._held = False
+        self._on_abandon = None
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """Take a slot as AdaptiveRateLimiter.acquire does; False on timeout or once abandoned"""
+        if self.abandoned or not self.limiter.acquire(timeout=timeout):
+            return False
+        with self._lock:
+            if not self.abandoned:
+                self._held = True
+                return True
+        # Abandoned while waiting for the slot
+        self.limiter.release('cancelled')
+        return False
+
+    def release(self, outcome='success'):
+        """Free the slot with outcome, unless it is not held (never acquired or already freed)"""
+        with self._lock:
+            if not self._held:
+                return
+            self._held = False
+        self.limiter.release(outcome)
+
+    def on_abandon(self, callback):
+        """Run callback when the lease is abandoned (now, if it already is)"""
+        with self._lock:
+            if not self.abandoned:
+                self._on_abandon = callback
+                return
+        callback()
+
+    def abandon(self):
+        """Give up the work: free its slot and run the on_abandon callback"""
+        with self._lock:
+            if self.abandoned:
+                return
+            self.abandoned = True
+            held, self._held = self._held, False
+            callback, self._on_abandon = self._on_abandon, None
+        if held:
+            self.limiter.release('cancelled')
+        if callback is not None:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error while abandoning limiter lease: {e}")
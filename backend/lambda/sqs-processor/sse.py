@@ -0,0 +1,189 @@
+"""
+Incremental Server-Sent Events decoder
+======================================
+Parses the byte stream returned by Bedrock AgentCore ("data: {json}\\n\\n") without
+re-decoding or re-splitting what has already been read.
+
+- Works on raw bytes, so multi-byte UTF-8 characters split across chunks are safe
+- Supports multi-line data, event:, id: and retry: fields and comment lines
+- Accepts \\n, \\r\\n and \\r line endings, including a \\r\\n split across chunks
+- iter_events() can stop as soon as a wanted event has been read
+"""
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, List, Optional, Union
+
+_LINE_END = re.compile(rb'\r\n|\r|\n')
+_UTF8_BOM = b'\xef\xbb\xbf'
+
+
+@dataclass
+class SSEEvent:
+    """A single dispatched event"""
+    data: str
+    event: str = 'message'
+    id: Optional[str] = None
+    retry: Optional[int] = None
+
+    def json(self):
+        """Parse the event data as JSON (raises ValueError if it is not valid JSON)"""
+        return json.loads(self.data)
+
+
+class SSEDecoder:
+    """Incremental SSE parser: feed() bytes as they arrive, get back completed events"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._skip_lf = False  # previous chunk ended in \r, a leading \n belongs to it
+        self._saw_cr = False
+        self._started = False
+        self._data_lines: List[bytes] = []
+        self._event_type = ''
+        self._last_event_id: Optional[str] = None
+        self._retry: Optional[int] = None
+
+    def feed(self, chunk: Union[bytes, bytearray, str]) -> List[SSEEvent]:
+        """Add a chunk of the stream and return the events it completed"""
+        if not chunk:
+            return []
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+
+        buffer = self._buffer
+        # Everything already buffered is a partial line, so only the new bytes need scanning
+        search_from = len(buffer)
+        buffer += chunk
+
+        pos = 0
+        if not self._started:
+            if len(buffer) < len(_UTF8_BOM) and _UTF8_BOM.startswith(bytes(buffer)):
+                return []
+            self._started = True
+            if buffer.startswith(_UTF8_BOM):
+                pos = search_from = len(_UTF8_BOM)
+
+        if self._skip_lf:
+            self._skip_lf = False
+            if buffer[pos] == 0x0A:
+                pos += 1
+                search_from = max(search_from, pos)
+
+        if not self._saw_cr and b'\r' in chunk:
+            self._saw_cr = True
+
+        # Find the end of the last complete line in the new bytes, then split all
+        # complete lines in one C-level call
+        if not self._saw_cr:
+            end = buffer.rfind(b'\n', search_from)
+            if end < 0:
+                if pos:
+                    del buffer[:pos]
+                return []
+            lines = buffer[pos:end].split(b'\n')
+            next_pos = end + 1
+        else:
+            end = max(buffer.rfind(b'\n', search_from), buffer.rfind(b'\r', search_from))
+            if end < 0:
+                if pos:
+                    del buffer[:pos]
+                return []
+            next_pos = end + 1
+            if buffer[end] == 0x0D:
+                if next_pos == len(buffer):
+                    # Can't tell yet whether this \r is the first half of \r\n
+                    self._skip_lf = True
+            elif end > pos and buffer[end - 1] == 0x0D:
+                end -= 1
+            lines = _LINE_END.split(buffer[pos:end])
+
+        # Drop consumed bytes once per chunk; only the incomplete last line is kept
+        del buffer[:next_pos]
+        return self._process_lines(lines)
+
+    def _process_lines(self, lines) -> List[SSEEvent]:
+        events = []
+        data_lines = self._data_lines
+        for line in lines:
+            if not line:
+                # Blank line: dispatch the pending event
+                if data_lines:
+                    events.append(self._dispatch())
+                    data_lines = self._data_lines
+                else:
+                    self._event_type = ''
+            elif line.startswith(b'data: '):
+                data_lines.append(line[6:])
+            else:
+                self._process_field(line)
+        return events
+
+    def flush(self) -> List[SSEEvent]:
+        """Signal end of stream; an unterminated final line is processed, a partial event is dropped"""
+        events = []
+        if self._buffer:
+            events = self._process_lines([bytes(self._buffer)])
+            self._buffer.clear()
+        # Per the SSE spec an event without its terminating blank line is discarded
+        self._data_lines = []
+        self._event_type = ''
+        return events
+
+    def _process_field(self, raw_line):
+        if raw_line[:1] == b':':
+            return  # comment / keep-alive
+
+        field, sep, value = raw_line.partition(b':')
+        if sep and value[:1] == b' ':
+            value = value[1:]
+
+        if field == b'data':
+            self._data_lines.append(value)
+            return
+        # Lines are only decoded once complete, so split UTF-8 sequences can't occur here
+        value = value.decode('utf-8', errors='replace')
+        if field == b'event':
+            self._event_type = value
+        elif field == b'id':
+            if '\0' not in value:
+                self._last_event_id = value
+        elif field == b'retry':
+            if value.isdigit():
+                self._retry = int(value)
+
+    def _dispatch(self) -> SSEEvent:
+        event = SSEEvent(
+            data=b'\n'.join(self._data_lines).decode('utf-8', errors='replace'),
+            event=self._event_type or 'message',
+            id=self._last_event_id,
+            retry=self._retry
+        )
+        self._data_lines = []
+        self._event_type = ''
+        return event
+
+
+def iter_events(chunks: Iterable[Union[bytes, str]],
+                until: Optional[Union[str, Callable[[SSEEvent], bool]]] = None) -> Iterator[SSEEvent]:
+    """Yield events from an iterable of chunks.
+
+    If until is an event type (or a predicate), iteration stops right after the first
+    matching event is yielded and the rest of the stream is not read.
+    """
+    if isinstance(until, str):
+        wanted_type = until
+        until = lambda event: event.event == wanted_type
+
+    decoder = SSEDecoder()
+    for chunk in chunks:
+        for event in decoder.feed(chunk):
+            yield event
+            if until is not None and until(event):
+                return
+    for event in decoder.flush():
+        yield event
+        if until is not None and until(event):
+            return
+
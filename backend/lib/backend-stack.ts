@@ -1,7 +1,7 @@
 import * as cdk from "aws-cdk-lib";
 import { Construct } from "constructs";
 import * as lambda from "aws-cdk-lib/aws-lambda";
-import { SqsEventSource } from "aws-cdk-lib/aws-lambda-event-sources";
+import { DynamoEventSource, SqsEventSource } from "aws-cdk-lib/aws-lambda-event-sources";
 import * as ecrAssets from "aws-cdk-lib/aws-ecr-assets";
 import * as iam from "aws-cdk-lib/aws-iam";
 import * as os from "os";
@@ -149,6 +149,8 @@ export class jobsearch1 extends cdk.Stack {
 
     // Job Recommendations Table
     // Primary key: email#job_type (e.g., "john@gmail.com#software-engineer")
+    // Items expire through the expiresAt TTL attribute (RECOMMENDATION_RETENTION_DAYS of
+    // the agent runtime); the stream feeds the deleted items to the recommendation archiver
     const JobRecommendationsTable = new dynamodb.Table(
       this,
       "JobRecommendationsTable",
@@ -161,13 +163,130 @@ export class jobsearch1 extends cdk.Stack {
           name: "createdAt",
           type: dynamodb.AttributeType.STRING,
         },
+        timeToLiveAttribute: "expiresAt",
+        stream: dynamodb.StreamViewType.OLD_IMAGE,
         removalPolicy: cdk.RemovalPolicy.DESTROY, // for production have retain
       }
     );
 
+    // Job catalog: each posting stored once, keyed by a hash of its content
+    // (jobKey = "job#<sha256 prefix>"); recommendation items reference postings by jobKey
+    const JobCatalogTable = new dynamodb.Table(this, "JobCatalogTable", {
+      partitionKey: { name: "jobKey", type: dynamodb.AttributeType.STRING },
+      removalPolicy: cdk.RemovalPolicy.DESTROY, // for production have retain
+    });
+
+    // Sparse index of unsent recommendations: only items that still carry pendingShard
+    // (removed when marked as sent) are indexed, so the notification sender's reads scale
+    // with today's unsent items instead of the table's whole history
+    JobRecommendationsTable.addGlobalSecondaryIndex({
+      indexName: "PendingRecommendationsIndex",
+      partitionKey: { name: "pendingShard", type: dynamodb.AttributeType.STRING },
+      sortKey: { name: "pendingKey", type: dynamodb.AttributeType.STRING },
+      projectionType: dynamodb.ProjectionType.ALL,
+    });
+
+    // DynamoDB creates at most one GSI per table update, so a stack deployed before both
+    // indexes existed cannot add them in one deploy. Upgrade it in two: first with
+    // -c jobRecommendationsIndexStage=1 (adds PendingRecommendationsIndex only), then a
+    // normal deploy (adds EmailCreatedAtIndex). New tables get both indexes at creation.
+    // See "Upgrading an existing deployment" in docs/DEPLOYMENT.MD.
+    const jobRecommendationsIndexStage = Number(this.node.tryGetContext("jobRecommendationsIndexStage") ?? 2);
+
+    // A user's newest recommendations across all job categories (agent's get_job_recommendations)
+    if (jobRecommendationsIndexStage >= 2) {
+      JobRecommendationsTable.addGlobalSecondaryIndex({
+        indexName: "EmailCreatedAtIndex",
+        partitionKey: { name: "email", type: dynamodb.AttributeType.STRING },
+        sortKey: { name: "createdAt", type: dynamodb.AttributeType.STRING },
+        projectionType: dynamodb.ProjectionType.ALL,
+      });
+    }
+
+    // Shared Python code for the Lambda functions (lambda/layers/common/python, mounted at
+    // /opt/python): email -> actionID sanitizing, the AWS client registry, env config
+    // loading, the jobInformation codec and job catalog readers and recommendation retention
+    const commonPythonLayer = new lambda.LayerVersion(this, "CommonPythonLayer", {
+      code: lambda.Code.fromAsset(path.join(__dirname, "..", "lambda", "layers", "common")),
+      compatibleRuntimes: [lambda.Runtime.PYTHON_3_11, lambda.Runtime.PYTHON_3_12],
+      compatibleArchitectures: [lambdaArchitecture],
+      description: "Shared clients, config and helpers for the job search Python functions",
+    });
+
+    // Expired job recommendations, as gzip-compressed NDJSON per stream batch
+    // (job-recommendations/dt=YYYY-MM-DD/<sequence numbers>.ndjson.gz)
+    const RecommendationArchiveBucket = new s3.Bucket(this, "RecommendationArchiveBucket", {
+      enforceSSL: true,
+      removalPolicy: cdk.RemovalPolicy.RETAIN,
+      lifecycleRules: [
+        {
+          transitions: [
+            {
+              storageClass: s3.StorageClass.INFREQUENT_ACCESS,
+              transitionAfter: cdk.Duration.days(30),
+            },
+          ],
+        },
+      ],
+    });
+
+    // Archives the recommendations that TTL deletes from JobRecommendationsTable
+    const recommendationArchiverLambda = new lambda.Function(this, "RecommendationArchiverLambda", {
+      runtime: lambda.Runtime.PYTHON_3_11,
+      handler: "index.lambda_handler",
+      timeout: cdk.Duration.minutes(1),
+      code: lambda.Code.fromAsset(
+        path.join(__dirname, "..", "lambda", "recommendation-archiver")
+      ),
+      environment: {
+        ARCHIVE_BUCKET_NAME: RecommendationArchiveBucket.bucketName,
+      },
+      architecture: lambdaArchitecture,
+      layers: [commonPythonLayer],
+    });
+
+    RecommendationArchiveBucket.grantPut(recommendationArchiverLambda);
+
+    recommendationArchiverLambda.addEventSource(
+      new DynamoEventSource(JobRecommendationsTable, {
+        startingPosition: lambda.StartingPosition.TRIM_HORIZON,
+        batchSize: 1000,
+        maxBatchingWindow: cdk.Duration.minutes(1), // Fewer, larger archive files
+        retryAttempts: 5,
+        bisectBatchOnError: true,
+        // Only deletions made by the TTL process, not by users or code
+        filters: [
+          lambda.FilterCriteria.filter({
+            eventName: lambda.FilterRule.isEqual("REMOVE"),
+            userIdentity: {
+              type: lambda.FilterRule.isEqual("Service"),
+              principalId: lambda.FilterRule.isEqual("dynamodb.amazonaws.com"),
+            },
+          }),
+        ],
+      })
+    );
+
+    // Job recommendations API for SMS links, backed by a Lambda that decodes
+    // compressed jobInformation (JOB_INFO_COMPRESSION)
+    const jobRecommendationsApiLambda = new lambda.Function(this, "JobRecommendationsApiLambda", {
+      runtime: lambda.Runtime.PYTHON_3_11,
+      handler: "index.lambda_handler",
+      timeout: cdk.Duration.seconds(10),
+      code: lambda.Code.fromAsset(
+        path.join(__dirname, "..", "lambda", "job-recommendations-api")
+      ),
+      environment: {
+        JOB_RECOMMENDATIONS_TABLE_NAME: JobRecommendationsTable.tableName,
+        JOB_CATALOG_TABLE_NAME: JobCatalogTable.tableName,
+      },
+      architecture: lambdaArchitecture,
+      layers: [commonPythonLayer],
+    });
 
+    JobRecommendationsTable.grantReadData(jobRecommendationsApiLambda);
+    JobCatalogTable.grantReadData(jobRecommendationsApiLambda);
 
-    // API Gateway with direct DynamoDB integration for job recommendations
     const jobRecommendationsApi = new apigateway.RestApi(this, 'JobRecommendationsApi', {
       restApiName: 'job-recommendations-api',
       description: 'Direct API for retrieving job recommendations from SMS links',
@@ -182,94 +301,13 @@ export class jobsearch1 extends cdk.Stack {
       },
     });
 
-    // Create IAM role for API Gateway to access DynamoDB
-    const apiGatewayDynamoDBRole = new iam.Role(this, 'ApiGatewayDynamoDBRole', {
-      assumedBy: new iam.ServicePrincipal('apigateway.amazonaws.com'),
-    });
-
-    // Grant the role permission to read from JobRecommendationsTable
-    JobRecommendationsTable.grantReadData(apiGatewayDynamoDBRole);
-
     // Create resource path: /job-recommendations/{userJobKey}/{createdAt}
     const jobRecommendationsResource = jobRecommendationsApi.root.addResource('job-recommendations');
     const userJobKeyResource = jobRecommendationsResource.addResource('{userJobKey}');
     const createdAtResource = userJobKeyResource.addResource('{createdAt}');
 
-    // Add GET method with direct DynamoDB integration
-    createdAtResource.addMethod('GET', new apigateway.AwsIntegration({
-      service: 'dynamodb',
-      action: 'Query',
-      options: {
-        credentialsRole: apiGatewayDynamoDBRole,
-        requestTemplates: {
-          'application/json': `{
-            "TableName": "${JobRecommendationsTable.tableName}",
-            "KeyConditionExpression": "userJobKey = :userJobKey",
-            "ExpressionAttributeValues": {
-              ":userJobKey": {
-                "S": "$util.urlDecode($input.params('userJobKey'))"
-              }
-            },
-            "ScanIndexForward": false,
-            "Limit": 1
-          }`
-        },
-        integrationResponses: [{
-          statusCode: '200',
-          responseParameters: {
-            'method.response.header.Access-Control-Allow-Origin': "'*'",
-            'method.response.header.Access-Control-Allow-Headers': "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'",
-            'method.response.header.Access-Control-Allow-Methods': "'GET,OPTIONS'"
-          },
-          responseTemplates: {
-            'application/json': `{
-              "userJobKey": "$input.path('$.Items[0].userJobKey.S')",
-              "createdAt": "$input.path('$.Items[0].createdAt.S')",
-              "email": "$input.path('$.Items[0].email.S')",
-              "jobCategory": "$input.path('$.Items[0].jobCategory.S')",
-              "jobInformation": $input.json('$.Items[0].jobInformation')
-            }`
-          }
-        }, {
-          statusCode: '404',
-          selectionPattern: '.*"__type":"com.amazon.coral.validate#ValidationException".*',
-          responseParameters: {
-            'method.response.header.Access-Control-Allow-Origin': "'*'",
-            'method.response.header.Access-Control-Allow-Headers': "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'",
-            'method.response.header.Access-Control-Allow-Methods': "'GET,OPTIONS'"
-          },
-          responseTemplates: {
-            'application/json': JSON.stringify({
-              error: 'Job recommendation not found',
-              userJobKey: '',
-              createdAt: '',
-              email: '',
-              jobCategory: '',
-              jobInformation: []
-            })
-          }
-        }]
-      }
-    }), {
-      methodResponses: [
-        {
-          statusCode: '200',
-          responseParameters: {
-            'method.response.header.Access-Control-Allow-Origin': true,
-            'method.response.header.Access-Control-Allow-Headers': true,
-            'method.response.header.Access-Control-Allow-Methods': true
-          }
-        },
-        {
-          statusCode: '404',
-          responseParameters: {
-            'method.response.header.Access-Control-Allow-Origin': true,
-            'method.response.header.Access-Control-Allow-Headers': true,
-            'method.response.header.Access-Control-Allow-Methods': true
-          }
-        }
-      ]
-    });
+    // The Lambda returns the CORS headers and the 404 for unknown keys itself
+    createdAtResource.addMethod('GET', new apigateway.LambdaIntegration(jobRecommendationsApiLambda));
 
     const saveProfile = new lambda.Function(this, "saveProfile", {
       runtime: lambda.Runtime.PYTHON_3_12,
@@ -282,6 +320,7 @@ export class jobsearch1 extends cdk.Stack {
         STUDENT_PROFILE_TABLE_NAME: StudentProfileTable.tableName,
       },
       architecture: lambdaArchitecture,
+      layers: [commonPythonLayer],
     });
 
     // Add Function URL for direct frontend access
@@ -290,7 +329,9 @@ export class jobsearch1 extends cdk.Stack {
       cors: {
         allowedOrigins: ["*"],
         allowedMethods: [lambda.HttpMethod.POST, lambda.HttpMethod.GET],
-        allowedHeaders: ["Content-Type"],
+        // If-None-Match/ETag: the profile page revalidates its cached profile (304 when unchanged)
+        allowedHeaders: ["Content-Type", "If-None-Match"],
+        exposedHeaders: ["ETag"],
       },
     });
 
@@ -310,6 +351,7 @@ export class jobsearch1 extends cdk.Stack {
           SAVE_PROFILE_FUNCTION_NAME: saveProfile.functionName,
         },
         architecture: lambdaArchitecture,
+        layers: [commonPythonLayer],
       }
     );
 
@@ -408,9 +450,18 @@ export class jobsearch1 extends cdk.Stack {
       }),
     });
 
+    // Dead-letter queue for users whose job search keeps failing after retries
+    const jobNotificationDLQ = new sqs.Queue(this, "JobNotificationDLQ", {
+      retentionPeriod: cdk.Duration.days(14),
+    });
+
     // SQS Queue for job notifications
     const jobNotificationQueue = new sqs.Queue(this, "JobNotificationQueue", {
       visibilityTimeout: cdk.Duration.minutes(16), // Must be greater than Lambda timeout (15 min)
+      deadLetterQueue: {
+        queue: jobNotificationDLQ,
+        maxReceiveCount: 3, // Failed records are retried individually via batchItemFailures
+      },
     });
 
     // Batch Processor Lambda
@@ -425,9 +476,14 @@ export class jobsearch1 extends cdk.Stack {
         ),
         timeout: cdk.Duration.minutes(5),
         architecture: lambdaArchitecture,
+        layers: [commonPythonLayer],
         environment: {
           STUDENT_PROFILE_TABLE_NAME: StudentProfileTable.tableName,
           SQS_QUEUE_URL: jobNotificationQueue.queueUrl,
+          // Runs are spread so they finish before the notification run (DailyNotificationRule, 16:00 UTC)
+          NOTIFICATION_CUTOFF_HOUR_UTC: "16",
+          SCHEDULE_MARGIN_MINUTES: "60",
+          MAX_SCHEDULE_LANES: "20",
         },
       }
     );
@@ -451,6 +507,12 @@ export class jobsearch1 extends cdk.Stack {
       new targets.LambdaFunction(batchProcessorLambda)
     );
 
+    // Processor containers polling the job notification queue at once. Each container has
+    // its own AgentCore limiter, so the account-wide start rate is AGENTCORE_MAX_TPS x this
+    // and open sessions reach MAX_CONCURRENCY x this; the TPS quota is split between them
+    const sqsProcessorMaxConcurrency = 2; // SQS event sources require at least 2
+    const agentCoreTpsQuota = 5; // InvokeAgentRuntime account quota (transactions per second)
+
     // SQS Processor Lambda to consume job notification messages
     const sqsProcessorLambda = new lambda.Function(this, "SQSProcessorLambda", {
       runtime: lambda.Runtime.PYTHON_3_11,
@@ -460,12 +522,24 @@ export class jobsearch1 extends cdk.Stack {
       ),
       timeout: cdk.Duration.minutes(15),
       architecture: lambdaArchitecture,
+      layers: [commonPythonLayer],
       environment: {
         BEDROCK_AGENTCORE_RUNTIME_ARN: "MANUALLY_ADD_HERE", // One manual step to be done later
         BEDROCK_AGENTCORE_QUALIFIER: "DEFAULT",
+        MAX_CONCURRENCY: "10", // Records processed in parallel per invocation (matches SQS batch size)
+        AGENTCORE_MAX_TPS: String(agentCoreTpsQuota / sqsProcessorMaxConcurrency), // Per-container share of the start rate quota
+        LIMITER_INITIAL_CONCURRENCY: "2", // Concurrent sessions at cold start, ramps up while calls succeed
+        STUDENT_PROFILE_TABLE_NAME: StudentProfileTable.tableName, // Completed batch sessions are recorded on the profile
+        SQS_QUEUE_URL: jobNotificationQueue.queueUrl, // Early messages are re-queued until their scheduled start
       },
     });
 
+    // Deferred messages are re-sent to the same queue with a delay
+    jobNotificationQueue.grantSendMessages(sqsProcessorLambda);
+
+    // Allow the processor to record completed batch sessions so re-delivered messages are not re-run
+    StudentProfileTable.grantReadWriteData(sqsProcessorLambda);
+
     // Changed from 'bedrock:InvokeAgent' to 'bedrock-agentcore:InvokeAgentRuntime' for AgentCore compatibility
     sqsProcessorLambda.addToRolePolicy(
       new iam.PolicyStatement({
@@ -479,9 +553,38 @@ export class jobsearch1 extends cdk.Stack {
     sqsProcessorLambda.addEventSource(
       new SqsEventSource(jobNotificationQueue, {
         batchSize: 10,
+        maxConcurrency: sqsProcessorMaxConcurrency, // Bounds the containers, and so the per-container limiters
+        reportBatchItemFailures: true, // Only failed records are retried, successful AgentCore runs are not repeated
       })
     );
 
+    // Fan-out delivery: the scheduled notification run enqueues shards of users here and
+    // worker invocations of the notification sender deliver them in parallel
+    const notificationShardDLQ = new sqs.Queue(this, "NotificationShardDLQ", {
+      retentionPeriod: cdk.Duration.days(14),
+    });
+
+    const notificationShardQueue = new sqs.Queue(this, "NotificationShardQueue", {
+      visibilityTimeout: cdk.Duration.minutes(6), // Must be greater than Lambda timeout (5 min)
+      deadLetterQueue: {
+        queue: notificationShardDLQ,
+        maxReceiveCount: 3,
+      },
+    });
+
+    // Notification run state per day (runId "run#YYYY-MM-DD"): delivery counts aggregated
+    // across shards ("SUMMARY"), the resume checkpoint ("CHECKPOINT") and the send ledger
+    // ("LEDGER#email#category#channel"); items expire after RUN_LEDGER_TTL_DAYS
+    const NotificationRunTable = new dynamodb.Table(this, "NotificationRunTable", {
+      partitionKey: { name: "runId", type: dynamodb.AttributeType.STRING },
+      sortKey: { name: "itemKey", type: dynamodb.AttributeType.STRING },
+      timeToLiveAttribute: "expiresAt",
+      removalPolicy: cdk.RemovalPolicy.DESTROY, // for production have retain
+    });
+
+    // Shard deliveries running at once; each worker sends at 1/WORKER_CONCURRENCY of the provider limits
+    const notificationWorkerConcurrency = 4;
+
     // Notification Sender Lambda for 9 AM daily notifications
     const notificationSenderLambda = new lambda.Function(
       this,
@@ -494,11 +597,31 @@ export class jobsearch1 extends cdk.Stack {
         ),
         timeout: cdk.Duration.minutes(5),
         architecture: lambdaArchitecture,
+        layers: [commonPythonLayer],
         environment: {
           STUDENT_PROFILE_TABLE_NAME: StudentProfileTable.tableName,
           JOB_RECOMMENDATIONS_TABLE_NAME: JobRecommendationsTable.tableName,
+          PENDING_INDEX_NAME: "PendingRecommendationsIndex",
+          PENDING_INDEX_SHARDS: "4", // Must match PENDING_INDEX_SHARDS of the agent runtime
           SENDER_EMAIL: senderEmail,
           SMS_ORIGINATION_NUMBER: senderNumber,
+          // "bulk" sends the SES digest template with SendBulkTemplatedEmail (50 per call)
+          EMAIL_SEND_MODE: "single",
+          SES_DIGEST_TEMPLATE_NAME: "JobRecommendationDigest",
+          // "true" sends one email and one SMS per user with a section per job category
+          DIGEST_MODE: "false",
+          // Provider limits for the concurrent dispatcher: SES account max send rate
+          // and the origination number's SMS throughput, in messages per second
+          SES_MAX_SEND_RATE: "14",
+          SMS_MPS: "1",
+          // "fanout" enqueues shards of SHARD_SIZE users to the shard queue instead of
+          // delivering the whole run in the scheduled invocation
+          NOTIFICATION_MODE: "single",
+          SHARD_QUEUE_URL: notificationShardQueue.queueUrl,
+          SHARD_SIZE: "50",
+          NOTIFICATION_RUN_TABLE_NAME: NotificationRunTable.tableName,
+          WORKER_CONCURRENCY: String(notificationWorkerConcurrency),
+          JOB_CATALOG_TABLE_NAME: JobCatalogTable.tableName,
           // The environment variable for amplify is addded after amplify is created
         },
       }
@@ -509,11 +632,30 @@ export class jobsearch1 extends cdk.Stack {
     // Grant permissions for notification sender
     StudentProfileTable.grantReadData(notificationSenderLambda);
     JobRecommendationsTable.grantReadWriteData(notificationSenderLambda);
+    NotificationRunTable.grantReadWriteData(notificationSenderLambda);
+    JobCatalogTable.grantReadData(notificationSenderLambda);
+    notificationShardQueue.grantSendMessages(notificationSenderLambda);
+
+    // Worker invocations: each shard message is delivered by its own invocation
+    notificationSenderLambda.addEventSource(
+      new SqsEventSource(notificationShardQueue, {
+        batchSize: 1,
+        maxConcurrency: Math.max(2, notificationWorkerConcurrency), // SQS event sources require at least 2
+        reportBatchItemFailures: true, // Only failed shards are retried
+      })
+    );
 
     notificationSenderLambda.addToRolePolicy(
       new iam.PolicyStatement({
         effect: iam.Effect.ALLOW,
-        actions: ["ses:SendEmail", "ses:SendRawEmail"],
+        actions: [
+          "ses:SendEmail",
+          "ses:SendRawEmail",
+          "ses:SendBulkTemplatedEmail",
+          "ses:GetTemplate",
+          "ses:CreateTemplate",
+          "ses:UpdateTemplate",
+        ],
         resources: ["*"],
       })
     );
@@ -745,6 +887,18 @@ export class jobsearch1 extends cdk.Stack {
       exportName: "JobRecommendationsTableName",
     });
 
+    new cdk.CfnOutput(this, "JobCatalogTableName", {
+      value: JobCatalogTable.tableName,
+      description: "DynamoDB table holding each job posting once (agent JOB_CATALOG_TABLE_NAME)",
+      exportName: "JobCatalogTableName",
+    });
+
+    new cdk.CfnOutput(this, "RecommendationArchiveBucketName", {
+      value: RecommendationArchiveBucket.bucketName,
+      description: "S3 bucket of expired job recommendations archived from JobRecommendationsTable",
+      exportName: "RecommendationArchiveBucketName",
+    });
+
     new cdk.CfnOutput(this, "ResumeBucketName", {
       value: ResumeBucket.bucketName,
       description: "S3 bucket for storing user resumes",
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Backfill: pending-index keys on unsent recommendations
+======================================================
+Recommendations saved before PendingRecommendationsIndex existed have no pendingShard or
+pendingKey, so the notification sender, which only reads that index, never sends them.
+This one-off scan finds unsent items without the keys and sets them with the same shard
+hash the agent and the sender use (jobsearch_common/pending_index.py).
+
+Run it once after the deploy that adds PendingRecommendationsIndex (see "Upgrading an
+Existing Deployment" in docs/DEPLOYMENT.MD), with the same PENDING_INDEX_SHARDS as the
+agent runtime and the notification sender:
+
+    python scripts/backfill_pending_index.py --table <JobRecommendationsTableName> --dry-run
+    python scripts/backfill_pending_index.py --table <JobRecommendationsTableName>
+
+Each update is conditional on the item still existing, still being unsent and still
+lacking pendingShard, so a notification run or a second backfill at the same time is
+safe and re-running the script only touches what is left. Expired items are skipped.
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda', 'layers', 'common', 'python'))
+
+from botocore.exceptions import ClientError  # noqa: E402
+from jobsearch_common import resource  # noqa: E402
+from jobsearch_common.pending_index import PENDING_INDEX_SHARDS, pending_key_for, pending_shard_for  # noqa: E402
+from jobsearch_common.retention import EXPIRES_ATTRIBUTE  # noqa: E402
+
+SCAN_FILTER = 'sentToUser = :false AND attribute_not_exists(pendingShard)'
+UPDATE_CONDITION = 'attribute_exists(userJobKey) AND sentToUser = :false AND attribute_not_exists(pendingShard)'
+
+
+def item_email(item):
+    """Email of a recommendation item; old items without email carry it in userJobKey (email#category)"""
+    return item.get('email') or item['userJobKey'].rsplit('#', 1)[0]
+
+
+def backfill_segment(client, table_name, segment, segments, shards, dry_run, now):
+    """Scan one parallel-scan segment and set the pending keys on its items; returns the counts"""
+    counts = {'scanned': 0, 'updated': 0, 'expired': 0, 'skipped': 0}
+    scan_kwargs = {
+        'TableName': table_name,
+        'Segment': segment,
+        'TotalSegments': segments,
+        'FilterExpression': SCAN_FILTER,
+        'ProjectionExpression': 'userJobKey, createdAt, email, #expires',
+        'ExpressionAttributeNames': {'#expires': EXPIRES_ATTRIBUTE},
+        'ExpressionAttributeValues': {':false': False},
+    }
+    while True:
+        response = client.scan(**scan_kwargs)
+        for item in response.get('Items', []):
+            counts['scanned'] += 1
+            if EXPIRES_ATTRIBUTE in item and int(item[EXPIRES_ATTRIBUTE]) <= now:
+                counts['expired'] += 1
+                continue
+            email = item_email(item)
+            if dry_run:
+                counts['updated'] += 1
+                continue
+            try:
+                client.update_item(
+                    TableName=table_name,
+                    Key={'userJobKey': item['userJobKey'], 'createdAt': item['createdAt']},
+                    UpdateExpression='SET pendingShard = :shard, pendingKey = :key',
+                    ConditionExpression=UPDATE_CONDITION,
+                    ExpressionAttributeValues={
+                        ':shard': pending_shard_for(email, shards),
+                        ':key': pending_key_for(email, item['createdAt']),
+                        ':false': False,
+                    }
+                )
+                counts['updated'] += 1
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                    raise
+                # Sent, deleted or backfilled since the scan read it
+                counts['skipped'] += 1
+        if 'LastEvaluatedKey' not in response:
+            return counts
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def backfill(table, shards=PENDING_INDEX_SHARDS, segments=4, dry_run=False, now=None):
+    """Set pendingShard/pendingKey on every unsent item of table that lacks them; returns the totals"""
+    now = int(time.time() if now is None else now)
+    # The resource's client is thread-safe and takes plain values, the Table resource is not
+    client = table.meta.client
+    with ThreadPoolExecutor(max_workers=segments) as executor:
+        results = list(executor.map(
+            lambda segment: backfill_segment(client, table.name, segment, segments, shards, dry_run, now),
+            range(segments)))
+    return {name: sum(counts[name] for counts in results) for name in results[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--table', required=True, help='JobRecommendationsTableName deployment output')
+    parser.add_argument('--shards', type=int, default=PENDING_INDEX_SHARDS,
+                        help='PENDING_INDEX_SHARDS of the agent and notification sender (default %(default)s)')
+    parser.add_argument('--segments', type=int, default=4, help='parallel scan segments (default %(default)s)')
+    parser.add_argument('--dry-run', action='store_true', help='count the items to backfill without writing')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    totals = backfill(resource('dynamodb').Table(args.table), args.shards, args.segments, args.dry_run)
+    action = 'would update' if args.dry_run else 'updated'
+    print(f"Scanned {totals['scanned']} unsent items without pending keys: {action} {totals['updated']}, "
+          f"{totals['expired']} expired (left for TTL), {totals['skipped']} changed meanwhile, "
+          f"in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Shared setup for the Python tests of the Lambda functions and the agent tools.
+
+Run from backend/:  python -m pytest tests
+
+Each Lambda function imports its sibling modules by bare name (index, run_ledger, ...),
+so load_lambda_module puts the function's directory first on sys.path and drops the
+modules of any other function before importing. The common layer is on the path as
+Lambda mounts it at /opt/python. No AWS calls are made: tests pass in fake clients.
+"""
+
+import ast
+import importlib
+import importlib.util
+import os
+import sys
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+LAMBDA_DIR = os.path.join(BACKEND, 'lambda')
+LAYER_DIR = os.path.join(LAMBDA_DIR, 'layers', 'common', 'python')
+AGENT_TOOLS_DIR = os.path.join(BACKEND, 'JobSearchAgent', 'tools')
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+if LAYER_DIR not in sys.path:
+    sys.path.insert(0, LAYER_DIR)
+if BACKEND not in sys.path:
+    sys.path.insert(0, BACKEND)
+
+
+def _function_modules():
+    """Names of loaded modules that belong to a Lambda function directory (not the layer)"""
+    names = []
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, '__file__', None) or ''
+        if path.startswith(LAMBDA_DIR) and not path.startswith(LAYER_DIR):
+            names.append(name)
+    return names
+
+
+def load_lambda_module(function, module='index', **environment):
+    """Fresh import of lambda/<function>/<module>.py with environment applied first"""
+    os.environ.update(environment)
+    for name in _function_modules():
+        del sys.modules[name]
+    function_dir = os.path.join(LAMBDA_DIR, function)
+    sys.path[:] = [entry for entry in sys.path if not entry.startswith(LAMBDA_DIR) or entry == LAYER_DIR]
+    sys.path.insert(0, function_dir)
+    return importlib.import_module(module)
+
+
+def load_agent_module(module):
+    """Import JobSearchAgent/tools/<module>.py on its own (the tools package __init__ imports the agent framework)"""
+    spec = importlib.util.spec_from_file_location(f"agent_{module}", os.path.join(AGENT_TOOLS_DIR, f"{module}.py"))
+    agent_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(agent_module)
+    return agent_module
+
+
+def module_code(path):
+    """The module's code without its docstring, as an AST dump, to compare the agent's copies with the layer"""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    if tree.body and isinstance(tree.body[0], ast.Expr) and isinstance(tree.body[0].value, ast.Constant):
+        tree.body = tree.body[1:]
+    return ast.dump(tree)
@@ -0,0 +1,93 @@
+import importlib.util
+import os
+
+from botocore.exceptions import ClientError
+
+from conftest import BACKEND, load_lambda_module
+
+index = load_lambda_module('notification-sender', JOB_RECOMMENDATIONS_TABLE_NAME='jobs',
+                           STUDENT_PROFILE_TABLE_NAME='profiles', SENDER_EMAIL='sender@example.com')
+
+_spec = importlib.util.spec_from_file_location(
+    'backfill_pending_index', os.path.join(BACKEND, 'scripts', 'backfill_pending_index.py'))
+backfill_pending_index = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(backfill_pending_index)
+
+NOW = 1_800_000_000
+
+
+class FakeJobClient:
+    """Scan and conditional update_item over a dict of items, split over segments by key"""
+
+    def __init__(self, items):
+        self.items = {(item['userJobKey'], item['createdAt']): item for item in items}
+        self.pages = 0
+
+    def _needs_backfill(self, item):
+        return item.get('sentToUser') is False and 'pendingShard' not in item
+
+    def scan(self, TableName, Segment, TotalSegments, ExclusiveStartKey=None, **kwargs):
+        self.pages += 1
+        keys = sorted(key for key in self.items if sum(map(ord, key[0])) % TotalSegments == Segment)
+        # One item per page, to exercise paging
+        if ExclusiveStartKey is not None:
+            keys = keys[keys.index((ExclusiveStartKey['userJobKey'], ExclusiveStartKey['createdAt'])) + 1:]
+        page = keys[:1]
+        response = {'Items': [dict(self.items[key]) for key in page if self._needs_backfill(self.items[key])]}
+        if len(keys) > 1:
+            response['LastEvaluatedKey'] = {'userJobKey': page[0][0], 'createdAt': page[0][1]}
+        return response
+
+    def update_item(self, TableName, Key, UpdateExpression, ConditionExpression, ExpressionAttributeValues):
+        item = self.items.get((Key['userJobKey'], Key['createdAt']))
+        if item is None or not self._needs_backfill(item):
+            raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException'}}, 'UpdateItem')
+        item['pendingShard'] = ExpressionAttributeValues[':shard']
+        item['pendingKey'] = ExpressionAttributeValues[':key']
+
+
+class FakeJobTable:
+    name = 'jobs'
+
+    def __init__(self, items):
+        self.meta = type('Meta', (), {'client': FakeJobClient(items)})()
+
+
+def _item(email, category, created_at, **extra):
+    item = {'userJobKey': f"{email}#{category}", 'createdAt': created_at, 'email': email, 'sentToUser': False}
+    item.update(extra)
+    return item
+
+
+def test_backfill_sets_the_keys_the_sender_queries():
+    items = [
+        _item('a@x.edu', 'swe', '2026-10-01T09:00:00Z'),
+        _item('b@x.edu', 'data', '2026-10-02T09:00:00Z'),
+        _item('c@x.edu', 'swe', '2026-10-03T09:00:00Z', sentToUser=True),
+        _item('d@x.edu', 'swe', '2026-10-04T09:00:00Z', expiresAt=NOW - 1),
+        _item('e@x.edu', 'swe', '2026-10-05T09:00:00Z', pendingShard='pending#0', pendingKey='kept'),
+    ]
+    del items[1]['email']  # old items may only carry the email in userJobKey
+    table = FakeJobTable(items)
+
+    totals = backfill_pending_index.backfill(table, shards=index.PENDING_INDEX_SHARDS, segments=2, now=NOW)
+
+    assert totals == {'scanned': 3, 'updated': 2, 'expired': 1, 'skipped': 0}
+    stored = table.meta.client.items
+    for email, key in (('a@x.edu', ('a@x.edu#swe', '2026-10-01T09:00:00Z')),
+                       ('b@x.edu', ('b@x.edu#data', '2026-10-02T09:00:00Z'))):
+        assert stored[key]['pendingShard'] == index.pending_shard_for(email)
+        assert stored[key]['pendingKey'] == f"{email}#{key[1]}"
+    assert 'pendingShard' not in stored[('c@x.edu#swe', '2026-10-03T09:00:00Z')]
+    assert 'pendingShard' not in stored[('d@x.edu#swe', '2026-10-04T09:00:00Z')]
+    assert stored[('e@x.edu#swe', '2026-10-05T09:00:00Z')]['pendingKey'] == 'kept'
+
+    # A second run finds nothing left to do
+    assert backfill_pending_index.backfill(table, segments=2, now=NOW)['updated'] == 0
+
+
+def test_dry_run_writes_nothing():
+    table = FakeJobTable([_item('a@x.edu', 'swe', '2026-10-01T09:00:00Z')])
+    totals = backfill_pending_index.backfill(table, segments=1, dry_run=True, now=NOW)
+    assert totals['updated'] == 1
+    assert 'pendingShard' not in table.meta.client.items[('a@x.edu#swe', '2026-10-01T09:00:00Z')]
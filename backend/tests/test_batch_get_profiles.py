@@ -0,0 +1,45 @@
+from conftest import load_lambda_module
+
+index = load_lambda_module('notification-sender', JOB_RECOMMENDATIONS_TABLE_NAME='jobs',
+                           STUDENT_PROFILE_TABLE_NAME='profiles', SENDER_EMAIL='sender@example.com')
+
+
+class ThrottledDynamoDB:
+    """BatchGetItem that returns the first key and leaves the rest unprocessed, every time"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def batch_get_item(self, RequestItems):
+        self.calls += 1
+        keys = RequestItems['profiles']['Keys']
+        served = keys[:1] if self.calls == 1 else []
+        unprocessed = keys[len(served):]
+        return {
+            'Responses': {'profiles': [dict(key, optInStatus=True) for key in served]},
+            'UnprocessedKeys': {'profiles': {'Keys': unprocessed}} if unprocessed else {},
+        }
+
+
+def test_unprocessed_keys_are_given_up_after_max_attempts(monkeypatch):
+    dynamodb = ThrottledDynamoDB()
+    monkeypatch.setattr(index, 'dynamodb', dynamodb)
+    monkeypatch.setattr(index.time, 'sleep', lambda seconds: None)
+    index.run_metrics.reset()
+
+    profiles = index.batch_get_profiles(['a@x.edu', 'b@x.edu', 'c@x.edu'], 'profiles')
+
+    assert list(profiles) == ['a_x_edu']
+    assert dynamodb.calls == index.PROFILE_BATCH_MAX_ATTEMPTS
+    assert index.run_metrics.counts['ProfilesUnresolved'] == 2
+    assert index.run_metrics.counts['ProfileRetries'] == index.PROFILE_BATCH_MAX_ATTEMPTS - 1
+
+
+def test_users_with_unresolved_profiles_are_skipped(monkeypatch):
+    monkeypatch.setattr(index, 'dynamodb', ThrottledDynamoDB())
+    monkeypatch.setattr(index.time, 'sleep', lambda seconds: None)
+    batch = [(email, {'swe': [{'userJobKey': f"{email}#swe"}]}) for email in ('a@x.edu', 'b@x.edu')]
+
+    joined = list(index._join_profiles(batch, 'profiles'))
+
+    assert [profile['actionID'] for profile, _ in joined] == ['a_x_edu']
@@ -0,0 +1,58 @@
+from urllib.parse import quote
+
+from conftest import load_lambda_module
+
+index = load_lambda_module('notification-sender', JOB_RECOMMENDATIONS_TABLE_NAME='jobs',
+                           STUDENT_PROFILE_TABLE_NAME='profiles', SENDER_EMAIL='sender@example.com',
+                           SMS_ORIGINATION_NUMBER='+15550100', AMPLIFY_APP_URL='https://app.example.com')
+
+
+class FakeSMS:
+    def __init__(self):
+        self.messages = []
+
+    def send_text_message(self, **params):
+        self.messages.append(params['MessageBody'])
+        return {'MessageId': 'm-1'}
+
+
+def _jobs(category, count):
+    return [{'userJobKey': f"a@x.edu#{category}", 'createdAt': f"2026-10-18T0{i}:00:00"} for i in range(count)]
+
+
+def _send(monkeypatch, sections):
+    sms = FakeSMS()
+    monkeypatch.setattr(index, 'sms_voice_v2', sms)
+    jobs = [job for _, category_jobs in sections for job in category_jobs]
+    index.send_sms_notification('+15550123', 'Ada Lovelace', jobs, None, 'a@x.edu', sections)
+    return sms.messages[0]
+
+
+def test_digest_sms_links_every_category(monkeypatch):
+    body = _send(monkeypatch, [('Data Analyst', _jobs('data-analyst', 2)),
+                               ('Software Engineer', _jobs('software-engineer', 1))])
+
+    assert 'View your 3 new recommendations:' in body
+    assert f"Data Analyst (2): https://app.example.com/chatbot?userJobKey={quote('a@x.edu#data-analyst')}" in body
+    assert f"Software Engineer (1): https://app.example.com/chatbot?userJobKey={quote('a@x.edu#software-engineer')}" in body
+    assert 'more categor' not in body
+    assert len(body) <= index.SMS_MAX_LENGTH
+
+
+def test_digest_sms_truncates_links_to_the_length_budget(monkeypatch):
+    monkeypatch.setattr(index, 'SMS_MAX_LENGTH', 360)
+    body = _send(monkeypatch, [(f"Category {n}", _jobs(f"category-{n}", 1)) for n in range(5)])
+
+    assert len(body) <= 360
+    assert 'Category 0 (1):' in body
+    assert 'Category 4 (1):' not in body
+    linked = body.count('/chatbot?')
+    assert body.endswith(f"+{5 - linked} more categories To unsubscribe: "
+                         f"https://app.example.com/unsubscribe?email={quote('a@x.edu')}&action=all")
+
+
+def test_single_category_sms_is_unchanged(monkeypatch):
+    sms = FakeSMS()
+    monkeypatch.setattr(index, 'sms_voice_v2', sms)
+    index.send_sms_notification('+15550123', 'Ada Lovelace', _jobs('data-analyst', 2), 'data-analyst', 'a@x.edu')
+    assert 'View your 2 new Data Analyst recommendations: https://app.example.com/chatbot?' in sms.messages[0]
@@ -0,0 +1,37 @@
+import time
+
+from conftest import load_lambda_module
+
+dispatcher = load_lambda_module('notification-sender', 'dispatcher')
+
+
+def test_bulk_costs_above_burst_are_charged_in_full():
+    rate = 1000.0
+    bucket = dispatcher.TokenBucket(rate, burst=20)
+    bucket.acquire(bucket.burst)  # start from an empty bucket
+
+    started = time.monotonic()
+    for _ in range(8):
+        bucket.acquire(50)
+    elapsed = time.monotonic() - started
+
+    assert elapsed >= 8 * 50 / rate
+
+
+def test_channel_bulk_sends_respect_rate():
+    rate = 2000.0
+    channel = dispatcher.Channel('email', rate, workers=4)
+    # Each call costs more than the whole bucket (burst = one second of rate)
+    recipients_per_call = 2500
+    calls = 3
+
+    started = time.monotonic()
+    futures = [channel.submit(lambda: None, cost=recipients_per_call) for _ in range(calls)]
+    for future in futures:
+        future.result()
+    elapsed = time.monotonic() - started
+    channel.shutdown()
+
+    # Only the initially full bucket (burst tokens) may go out without waiting
+    assert elapsed >= (calls * recipients_per_call - channel.bucket.burst) / rate
+    assert channel.stats()['Sent'] == calls * recipients_per_call
@@ -0,0 +1,21 @@
+import os
+
+from conftest import AGENT_TOOLS_DIR, LAYER_DIR, load_agent_module, module_code
+
+from jobsearch_common import identity
+
+EMAILS = ['student@university.edu', 'First.Last+jobs@Example.co.uk', 'a::b@x.edu', 'o\'neil@x.edu',
+          'josé.müller@universität.de', '学生@例子.中国', 'tab\there@x.edu', '', 'A-Z_0-9/*@x']
+
+
+def test_agent_copy_has_the_same_code_as_the_layer():
+    assert module_code(os.path.join(AGENT_TOOLS_DIR, 'identity.py')) == \
+        module_code(os.path.join(LAYER_DIR, 'jobsearch_common', 'identity.py'))
+
+
+def test_agent_copy_maps_emails_like_the_layer():
+    agent_identity = load_agent_module('identity')
+
+    for email in EMAILS:
+        assert agent_identity.sanitize_email_for_actor_id(email) == identity.sanitize_email_for_actor_id(email)
+    assert identity.sanitize_email_for_actor_id('josé@x.edu') == 'jos__x_edu'
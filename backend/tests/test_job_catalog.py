@@ -0,0 +1,80 @@
+import os
+from decimal import Decimal
+
+from conftest import AGENT_TOOLS_DIR, LAYER_DIR, load_agent_module, module_code
+
+from jobsearch_common import job_catalog
+
+agent_catalog = load_agent_module('job_catalog')
+
+JOBS = [
+    {'title': 'Data Engineer', 'company': 'Acme', 'salary': Decimal('120000'), 'fit': 'Strong SQL background'},
+    {'title': 'Analyste de données', 'company': 'Société Générale', 'location': 'Zürich', 'remote': True},
+    {'company': 'Acme', 'title': 'Data Engineer', 'salary': Decimal('120000'), 'fit': 'Also knows Spark'},
+]
+
+
+class FakeCatalogClient:
+    """batch_get_item / batch_write_item over a dict of catalog items keyed by jobKey"""
+
+    def __init__(self):
+        self.items = {}
+        self.writes = 0
+
+    def batch_get_item(self, RequestItems):
+        (table_name, request), = RequestItems.items()
+        found = [self.items[key['jobKey']] for key in request['Keys'] if key['jobKey'] in self.items]
+        return {'Responses': {table_name: found}}
+
+    def batch_write_item(self, RequestItems):
+        (requests,) = RequestItems.values()
+        for request in requests:
+            item = request['PutRequest']['Item']
+            self.items[item['jobKey']] = item
+            self.writes += 1
+        return {}
+
+
+class FakeCatalogTable:
+    name = 'catalog'
+
+    def __init__(self, client):
+        self.meta = type('Meta', (), {'client': client})()
+
+
+def _recommendation(refs):
+    return {'userJobKey': 'a@x.edu#data', 'createdAt': '2026-10-18T10:00:00', job_catalog.REFS_ATTRIBUTE: refs}
+
+
+def test_agent_copy_has_the_same_code_as_the_layer():
+    assert module_code(os.path.join(AGENT_TOOLS_DIR, 'job_catalog.py')) == \
+        module_code(os.path.join(LAYER_DIR, 'jobsearch_common', 'job_catalog.py'))
+
+
+def test_both_copies_hash_postings_to_the_same_key():
+    for job in JOBS:
+        assert agent_catalog.job_key(job) == job_catalog.job_key(job)
+    # The fit text and key order do not change a posting's key
+    assert job_catalog.job_key(JOBS[0]) == job_catalog.job_key(JOBS[2])
+    assert job_catalog.job_key(JOBS[0]) != job_catalog.job_key(JOBS[1])
+
+
+def test_layer_resolves_what_the_agent_stores():
+    client = FakeCatalogClient()
+    refs = agent_catalog.JobCatalog(FakeCatalogTable(client)).store([dict(job) for job in JOBS])
+    assert client.writes == 2  # the two Acme jobs share one posting
+
+    item, = job_catalog.JobCatalog(FakeCatalogTable(client)).resolve([_recommendation(refs)])
+    assert job_catalog.REFS_ATTRIBUTE not in item
+    assert item['jobInformation'] == JOBS
+
+
+def test_agent_resolves_what_the_layer_stores():
+    client = FakeCatalogClient()
+    refs = job_catalog.JobCatalog(FakeCatalogTable(client)).store([dict(job) for job in JOBS])
+
+    item, = agent_catalog.JobCatalog(FakeCatalogTable(client)).resolve([_recommendation(refs)])
+    assert item['jobInformation'] == JOBS
+    # Storing the same postings from the other copy writes nothing new
+    agent_catalog.JobCatalog(FakeCatalogTable(client)).store([dict(job) for job in JOBS])
+    assert client.writes == 2
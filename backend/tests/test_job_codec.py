@@ -0,0 +1,50 @@
+import os
+
+import pytest
+from conftest import AGENT_TOOLS_DIR, LAYER_DIR, load_agent_module, module_code
+
+from jobsearch_common import job_codec
+
+agent_codec = load_agent_module('job_codec')
+
+JOBS = [
+    {'title': 'Data Engineer', 'company': 'Acme', 'salary': 120000, 'fit': 'Strong SQL background'},
+    {'title': 'Analyste de données', 'company': 'Société Générale', 'location': 'Zürich', 'remote': True},
+]
+COMPRESSIONS = ['gzip'] + (['zstd'] if job_codec.zstandard else [])
+
+
+def _item():
+    return {'userJobKey': 'a@x.edu#data', 'createdAt': '2026-10-18T10:00:00', 'jobInformation': [dict(job) for job in JOBS]}
+
+
+def test_agent_copy_has_the_same_code_as_the_layer():
+    assert module_code(os.path.join(AGENT_TOOLS_DIR, 'job_codec.py')) == \
+        module_code(os.path.join(LAYER_DIR, 'jobsearch_common', 'job_codec.py'))
+
+
+@pytest.mark.parametrize('compression', COMPRESSIONS)
+def test_layer_decodes_what_the_agent_encodes(compression):
+    encoded = agent_codec.encode_job_information(_item(), compression)
+    assert 'jobInformation' not in encoded
+    assert encoded[job_codec.ENCODING_ATTRIBUTE] == f"{compression}/1"
+    assert job_codec.decode_job_information(encoded) == _item()
+
+
+@pytest.mark.parametrize('compression', COMPRESSIONS)
+def test_agent_decodes_what_the_layer_encodes(compression):
+    encoded = job_codec.encode_job_information(_item(), compression)
+    assert agent_codec.decode_job_information(encoded) == _item()
+
+
+def test_plain_items_pass_through_both_copies():
+    for codec in (agent_codec, job_codec):
+        assert codec.encode_job_information(_item(), 'none') == _item()
+        assert codec.decode_job_information(_item()) == _item()
+
+
+def test_unknown_format_version_is_rejected():
+    encoded = agent_codec.encode_job_information(_item(), 'gzip')
+    encoded[job_codec.ENCODING_ATTRIBUTE] = 'gzip/2'
+    with pytest.raises(ValueError):
+        job_codec.decode_job_information(encoded)
@@ -0,0 +1,68 @@
+import threading
+import time
+
+from botocore.exceptions import ClientError
+from conftest import load_lambda_module
+
+index = load_lambda_module('notification-sender', JOB_RECOMMENDATIONS_TABLE_NAME='jobs',
+                           STUDENT_PROFILE_TABLE_NAME='profiles', SENDER_EMAIL='sender@example.com')
+
+
+class FakeJobClient:
+    """Conditional update_item that records concurrency and the threads it ran on"""
+
+    def __init__(self, missing=()):
+        self.missing = set(missing)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.threads = set()
+        self.updated = []
+
+    def update_item(self, TableName, Key, **kwargs):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.threads.add(threading.current_thread())
+        try:
+            time.sleep(0.01)
+            if Key['userJobKey'] in self.missing:
+                raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException'}}, 'UpdateItem')
+            with self.lock:
+                self.updated.append(Key['userJobKey'])
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+class FakeJobTable:
+    name = 'jobs'
+
+    def __init__(self, client):
+        self.meta = type('Meta', (), {'client': client})()
+
+
+def _recommendations(count, user='a@x.edu'):
+    return [{'userJobKey': f"{user}#role{i}", 'createdAt': '2026-10-18T10:00:00'} for i in range(count)]
+
+
+def test_calls_share_one_pool():
+    first, second = FakeJobClient(), FakeJobClient()
+    assert index.mark_jobs_as_sent(_recommendations(4), FakeJobTable(first)) == (4, 0)
+    executor = index._mark_executor
+    assert index.mark_jobs_as_sent(_recommendations(4, 'b@x.edu'), FakeJobTable(second)) == (4, 0)
+
+    assert index._mark_executor is executor
+    pool_threads = set(executor._threads)
+    assert first.threads <= pool_threads and second.threads <= pool_threads
+    assert all(thread.name.startswith('mark-sent') for thread in pool_threads)
+
+
+def test_each_call_keeps_its_concurrency_limit(monkeypatch):
+    index.mark_jobs_as_sent(_recommendations(1), FakeJobTable(FakeJobClient()))  # pool with the default size
+    monkeypatch.setattr(index, 'MARK_SENT_CONCURRENCY', 2)
+    client = FakeJobClient(missing={'a@x.edu#role3'})
+
+    assert index.mark_jobs_as_sent(_recommendations(10), FakeJobTable(client)) == (9, 1)
+    assert client.max_in_flight == 2
+    assert len(client.updated) == 9
@@ -0,0 +1,102 @@
+import importlib.util
+import os
+
+from conftest import BACKEND
+
+# Loaded from its file: the tools package __init__ imports the agent framework
+_spec = importlib.util.spec_from_file_location(
+    'profile_cache', os.path.join(BACKEND, 'JobSearchAgent', 'tools', 'profile_cache.py'))
+profile_cache = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(profile_cache)
+
+
+class Store:
+    """Stored profiles, counting full loads and version reads"""
+
+    def __init__(self):
+        self.profiles = {'a': {'fullName': 'Ada', 'timestamp': '2026-10-18T10:00:00'}}
+        self.loads = 0
+        self.version_reads = 0
+
+    def loader(self, action_id):
+        def load():
+            self.loads += 1
+            profile = self.profiles.get(action_id)
+            return dict(profile) if profile else None
+        return load
+
+    def version(self, action_id):
+        def read():
+            self.version_reads += 1
+            profile = self.profiles.get(action_id)
+            return profile.get('timestamp') if profile else None
+        return read
+
+
+def _get(cache, store, action_id='a'):
+    cache.begin_request()
+    return cache.get(action_id, store.loader(action_id), store.version(action_id))
+
+
+def test_unchanged_profile_is_served_after_a_version_check():
+    cache, store = profile_cache.ProfileCache(version_check_seconds=0), Store()
+    _get(cache, store)
+    assert _get(cache, store)['fullName'] == 'Ada'
+    assert (store.loads, store.version_reads) == (1, 1)
+    assert cache.stats()['hits'] == 1
+
+
+def test_profile_saved_elsewhere_is_reloaded_on_next_request():
+    cache, store = profile_cache.ProfileCache(version_check_seconds=0), Store()
+    _get(cache, store)
+    # Another container (or save-profile) writes a newer profile
+    store.profiles['a'] = {'fullName': 'Ada Lovelace', 'timestamp': '2026-10-18T11:00:00'}
+
+    assert _get(cache, store)['fullName'] == 'Ada Lovelace'
+    assert store.loads == 2
+    assert cache.stats()['stale'] == 1
+
+
+def test_request_memo_skips_version_checks():
+    cache, store = profile_cache.ProfileCache(version_check_seconds=0), Store()
+    _get(cache, store)
+    cache.begin_request()
+    for _ in range(5):
+        cache.get('a', store.loader('a'), store.version('a'))
+    assert (store.loads, store.version_reads) == (1, 1)
+
+
+def test_version_check_interval():
+    cache, store = profile_cache.ProfileCache(version_check_seconds=3600), Store()
+    _get(cache, store)
+    store.profiles['a'] = {'fullName': 'Ada Lovelace', 'timestamp': '2026-10-18T11:00:00'}
+    assert _get(cache, store)['fullName'] == 'Ada'
+    assert store.version_reads == 0
+
+
+def test_missing_profile_is_cached_until_one_is_saved():
+    cache, store = profile_cache.ProfileCache(version_check_seconds=0), Store()
+    assert _get(cache, store, 'b') is None
+    assert _get(cache, store, 'b') is None
+    assert store.loads == 1
+    store.profiles['b'] = {'fullName': 'Bo', 'timestamp': '2026-10-18T12:00:00'}
+    assert _get(cache, store, 'b')['fullName'] == 'Bo'
+
+
+def test_default_interval_bounds_staleness_without_reads(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(profile_cache.time, 'monotonic', lambda: clock[0])
+    cache, store = profile_cache.ProfileCache(), Store()
+    assert cache.version_check_seconds == 30
+    _get(cache, store)
+    store.profiles['a'] = {'fullName': 'Ada Lovelace', 'timestamp': '2026-10-18T11:00:00'}
+
+    # Within the interval: served from memory, no DynamoDB reads at all
+    clock[0] += 29
+    assert _get(cache, store)['fullName'] == 'Ada'
+    assert (store.loads, store.version_reads) == (1, 0)
+
+    # Past it: one version read, and the saved profile is picked up
+    clock[0] += 2
+    assert _get(cache, store)['fullName'] == 'Ada Lovelace'
+    assert (store.loads, store.version_reads) == (2, 1)
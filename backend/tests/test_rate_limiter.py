@@ -0,0 +1,78 @@
+import json
+import threading
+import time
+
+from conftest import load_lambda_module
+
+index = load_lambda_module('sqs-processor', MAX_CONCURRENCY='2', DEADLINE_MARGIN_SECONDS='0')
+import rate_limiter  # noqa: E402  (the copy index imported)
+
+
+def _limiter(concurrency=1):
+    return rate_limiter.AdaptiveRateLimiter(initial_concurrency=concurrency, max_concurrency=concurrency,
+                                            rate_per_second=1000.0)
+
+
+def test_abandoned_lease_frees_its_slot_once():
+    limiter = _limiter()
+    lease = rate_limiter.LimiterLease(limiter)
+    closed = []
+    assert lease.acquire(timeout=0)
+    lease.on_abandon(lambda: closed.append(True))
+
+    lease.abandon()
+    lease.release('success')  # the worker finishing later
+
+    assert closed == [True]
+    metrics = limiter.metrics()
+    assert (metrics['InFlight'], metrics['Successes'], metrics['Errors']) == (0, 0, 0)
+    assert not lease.acquire(timeout=0)
+    assert rate_limiter.LimiterLease(limiter).acquire(timeout=0)
+
+
+class BlockingStream:
+    """AgentCore response body that blocks until closed, like a session that overruns"""
+
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        self.closed.wait(5)  # bounded, so a regression fails instead of hanging the run
+        raise ConnectionError('stream closed')
+
+    def close(self):
+        self.closed.set()
+
+
+class FakeAgentCore:
+    def __init__(self):
+        self.streams = []
+
+    def invoke_agent_runtime(self, **kwargs):
+        stream = BlockingStream()
+        self.streams.append(stream)
+        return {'response': stream}
+
+
+class Context:
+    def get_remaining_time_in_millis(self):
+        return 300
+
+
+def test_records_abandoned_at_the_deadline_release_their_slots(monkeypatch):
+    monkeypatch.setattr(index, 'limiter', _limiter(concurrency=2))
+    agentcore = FakeAgentCore()
+    monkeypatch.setattr(index, 'get_agentcore_client', lambda: agentcore)
+    monkeypatch.setattr(index, 'is_session_completed', lambda *args: False)
+    monkeypatch.setenv('BEDROCK_AGENTCORE_RUNTIME_ARN', 'arn:runtime')
+    records = [{'messageId': f"m{i}", 'body': json.dumps({'email': f"u{i}@x.edu", 'session_id': 's' * 40})}
+               for i in range(2)]
+
+    response = index.lambda_handler({'Records': records}, Context())
+
+    assert len(response['batchItemFailures']) == 2
+    # Slots are free as the handler returns, and the abandoned streams were closed
+    assert index.limiter.metrics()['InFlight'] == 0
+    assert all(stream.closed.is_set() for stream in agentcore.streams)
+    time.sleep(0.05)
+    assert index.limiter.metrics()['Errors'] == 0
@@ -0,0 +1,93 @@
+import ast
+import os
+import time
+
+from boto3.dynamodb.conditions import Attr
+from conftest import AGENT_TOOLS_DIR, LAYER_DIR, load_agent_module, load_lambda_module, module_code
+
+from jobsearch_common import retention
+
+agent_retention = load_agent_module('retention')
+sender = load_lambda_module('notification-sender', JOB_RECOMMENDATIONS_TABLE_NAME='jobs',
+                            STUDENT_PROFILE_TABLE_NAME='profiles', SENDER_EMAIL='sender@example.com')
+api = load_lambda_module('job-recommendations-api', JOB_RECOMMENDATIONS_TABLE_NAME='jobs')
+
+NOW = int(time.time())
+EXPIRED = NOW - 60
+LIVE = NOW + 86400
+
+
+def matches(condition, item):
+    """Evaluate the boto3 conditions not_expired_filter builds against a plain item"""
+    expression = condition.get_expression()
+    operator, values = expression['operator'], expression['values']
+    if operator == 'OR':
+        return any(matches(value, item) for value in values)
+    if operator == 'AND':
+        return all(matches(value, item) for value in values)
+    if operator == 'attribute_not_exists':
+        return values[0].name not in item
+    if operator == '>':
+        return values[0].name in item and item[values[0].name] > values[1]
+    raise AssertionError(f"unexpected operator {operator}")
+
+
+def _item(created_at, expires_at=None, email='a@x.edu'):
+    item = {'userJobKey': f"{email}#data", 'createdAt': created_at, 'email': email, 'jobInformation': []}
+    if expires_at is not None:
+        item[retention.EXPIRES_ATTRIBUTE] = expires_at
+    return item
+
+
+class FakeQueryTable:
+    """query over fixed items, newest first when asked, applying Limit and then the filter like DynamoDB"""
+
+    def __init__(self, items):
+        self.items = items
+        self.filters = []
+
+    def query(self, FilterExpression=None, ScanIndexForward=True, Limit=None, **kwargs):
+        self.filters.append(FilterExpression)
+        items = sorted(self.items, key=lambda item: item['createdAt'], reverse=not ScanIndexForward)
+        if Limit:
+            items = items[:Limit]
+        return {'Items': [dict(item) for item in items if FilterExpression is None or matches(FilterExpression, item)]}
+
+
+def test_agent_copy_has_the_same_code_as_the_layer():
+    assert module_code(os.path.join(AGENT_TOOLS_DIR, 'retention.py')) == \
+        module_code(os.path.join(LAYER_DIR, 'jobsearch_common', 'retention.py'))
+
+
+def test_agent_reader_filters_with_the_shared_condition():
+    with open(os.path.join(AGENT_TOOLS_DIR, 'dynamodb_tools.py'), encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    imported = {alias.name for node in ast.walk(tree)
+                if isinstance(node, ast.ImportFrom) and node.module == 'retention' for alias in node.names}
+    assert {'EXPIRES_ATTRIBUTE', 'not_expired_filter'} <= imported
+    assert not any(isinstance(node, ast.FunctionDef) and 'expired' in node.name for node in ast.walk(tree))
+
+
+def test_both_copies_keep_unexpired_items_only():
+    for module in (retention, agent_retention):
+        condition = module.not_expired_filter(now=NOW)
+        assert condition == Attr('expiresAt').not_exists() | Attr('expiresAt').gt(NOW)
+        assert matches(condition, _item('t1'))
+        assert matches(condition, _item('t1', LIVE))
+        assert not matches(condition, _item('t1', NOW))
+        assert not matches(condition, _item('t1', EXPIRED))
+
+
+def test_notification_sender_skips_expired_recommendations():
+    table = FakeQueryTable([_item('t1', EXPIRED), _item('t2', LIVE), _item('t3')])
+    items = list(sender.query_pending_for_users(table, ['a@x.edu']))
+    assert [item['createdAt'] for item in items] == ['t2', 't3']
+
+
+def test_recommendations_api_treats_an_expired_latest_item_as_not_found(monkeypatch):
+    table = FakeQueryTable([_item('t1', LIVE), _item('t2', EXPIRED)])
+    monkeypatch.setattr(api, 'dynamodb', type('Resource', (), {'Table': lambda self, name: table})())
+
+    assert api.lambda_handler({'pathParameters': {'userJobKey': 'a%40x.edu%23data'}}, None)['statusCode'] == 404
+    table.items[1][retention.EXPIRES_ATTRIBUTE] = LIVE
+    assert api.lambda_handler({'pathParameters': {'userJobKey': 'a%40x.edu%23data'}}, None)['statusCode'] == 200
@@ -0,0 +1,131 @@
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import pytest
+from botocore.exceptions import ClientError
+
+from conftest import load_lambda_module
+
+index = load_lambda_module('notification-sender', JOB_RECOMMENDATIONS_TABLE_NAME='jobs',
+                           STUDENT_PROFILE_TABLE_NAME='profiles', SENDER_EMAIL='sender@example.com')
+import run_ledger  # noqa: E402  (the copy index imported)
+
+
+class FakeRunClient:
+    """The run table operations RunLedger uses, with the claim condition evaluated in Python"""
+
+    def __init__(self):
+        self.items = {}
+
+    def put_item(self, TableName, Item, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues):
+        existing = self.items.get(Item['itemKey'])
+        values = ExpressionAttributeValues
+        allowed = (existing is None or existing['status'] == values[':failed']
+                   or (existing['status'] == values[':sending']
+                       and ('claimedAt' not in existing or existing['claimedAt'] < values[':stale'])))
+        if not allowed:
+            raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException'}}, 'PutItem')
+        self.items[Item['itemKey']] = dict(Item)
+
+    def get_item(self, TableName, Key, **kwargs):
+        item = self.items.get(Key['itemKey'])
+        return {'Item': dict(item)} if item else {}
+
+    def update_item(self, TableName, Key, UpdateExpression, ExpressionAttributeValues, **kwargs):
+        item = self.items.setdefault(Key['itemKey'], {'itemKey': Key['itemKey']})
+        if ':status' in ExpressionAttributeValues:
+            item['status'] = ExpressionAttributeValues[':status']
+        if ':email' in ExpressionAttributeValues:
+            item['lastEmail'] = ExpressionAttributeValues[':email']
+
+
+class FakeRunTable:
+    name = 'runs'
+
+    def __init__(self):
+        self.meta = type('Meta', (), {'client': FakeRunClient()})()
+
+
+@pytest.fixture
+def ledger():
+    return run_ledger.RunLedger(FakeRunTable(), 'run#2026-10-18')
+
+
+def _claim(ledger, key, status, age_seconds):
+    ledger._client.items[key] = {'itemKey': key, 'status': status, 'claimedAt': int(time.time()) - age_seconds}
+
+
+def test_stale_claim_is_reclaimed_and_sent(ledger):
+    _claim(ledger, 'LEDGER#a@x.edu#swe#email', run_ledger.SENDING, run_ledger.CLAIM_LEASE_SECONDS + 60)
+    assert ledger.send_once('LEDGER#a@x.edu#swe#email', lambda: 'MessageId') == 'MessageId'
+    assert ledger._client.items['LEDGER#a@x.edu#swe#email']['status'] == run_ledger.SENT
+
+
+def test_live_claim_is_in_flight_not_skipped(ledger):
+    _claim(ledger, 'LEDGER#a@x.edu#swe#email', run_ledger.SENDING, 10)
+    assert ledger.send_once('LEDGER#a@x.edu#swe#email', lambda: 'MessageId') == run_ledger.IN_FLIGHT
+
+
+def test_sent_is_skipped(ledger):
+    _claim(ledger, 'LEDGER#a@x.edu#swe#email', run_ledger.SENT, 10)
+    assert ledger.send_once('LEDGER#a@x.edu#swe#email', lambda: 'MessageId') == run_ledger.SKIPPED
+
+
+def _done(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def _failed(error):
+    future = Future()
+    future.set_exception(error)
+    return future
+
+
+def test_settle_marks_only_delivered_and_holds_checkpoint(ledger, monkeypatch):
+    marked = []
+    monkeypatch.setattr(index, 'mark_jobs_as_sent', lambda jobs, table: (marked.extend(jobs) or (len(jobs), 0)))
+    totals = {'users': 0, 'email_sent': 0, 'sms_sent': 0, 'skipped': 0, 'failed': 0, 'marked': 0, 'mark_failed': 0}
+    pending = deque([
+        {'sends': [('email', 'a', _done('MessageId'))], 'jobs': ['a-job']},
+        {'sends': [], 'jobs': [], 'checkpoint': 'a@x.edu'},
+        {'sends': [('email', 'b', _done(run_ledger.SKIPPED))], 'jobs': ['b-job']},
+        {'sends': [], 'jobs': [], 'checkpoint': 'b@x.edu'},
+        {'sends': [('email', 'c', _done(run_ledger.IN_FLIGHT))], 'jobs': ['c-job']},
+        {'sends': [], 'jobs': [], 'checkpoint': 'c@x.edu'},
+        {'sends': [('email', 'd', _failed(RuntimeError('SES down')))], 'jobs': ['d-job']},
+        {'sends': [], 'jobs': [], 'checkpoint': 'd@x.edu'},
+        {'sends': [('email', 'e', _done('MessageId'))], 'jobs': ['e-job']},
+        {'sends': [], 'jobs': [], 'checkpoint': 'e@x.edu'},
+    ])
+
+    index.settle_sends(pending, None, totals, ledger, wait=True)
+    ledger.save_checkpoint()
+
+    assert marked == ['a-job', 'b-job', 'e-job']
+    assert totals['failed'] == 2
+    # Resumes after b: c (claimed elsewhere) and d (failed) are retried
+    assert ledger._client.items['CHECKPOINT']['lastEmail'] == 'b@x.edu'
+
+
+def test_bulk_batch_in_flight_destination_is_not_marked(ledger, monkeypatch):
+    marked = []
+    monkeypatch.setattr(index, 'mark_jobs_as_sent', lambda jobs, table: (marked.extend(jobs) or (len(jobs), 0)))
+    monkeypatch.setattr(index, 'send_bulk_chunk', lambda ses, sender, destinations: ['Success'] * len(destinations))
+    _claim(ledger, 'LEDGER#b@x.edu#swe#email', run_ledger.SENDING, 10)
+    batch = [('a@x.edu', {}, ['a-job'], 'LEDGER#a@x.edu#swe#email'),
+             ('b@x.edu', {}, ['b-job'], 'LEDGER#b@x.edu#swe#email')]
+
+    statuses = index.send_bulk_batch('sender@example.com', batch, ledger)
+    assert statuses == ['Success', run_ledger.IN_FLIGHT]
+
+    totals = {'users': 0, 'email_sent': 0, 'sms_sent': 0, 'skipped': 0, 'failed': 0, 'marked': 0, 'mark_failed': 0}
+    pending = deque([{'sends': [('bulk', '2 destinations', _done(statuses))], 'jobs': [], 'batch': batch,
+                      'checkpoint': 'b@x.edu'}])
+    index.settle_sends(pending, None, totals, ledger, wait=True)
+    ledger.save_checkpoint()
+
+    assert marked == ['a-job']
+    assert 'CHECKPOINT' not in ledger._client.items
@@ -0,0 +1,83 @@
+import json
+import re
+import threading
+
+from conftest import load_lambda_module
+
+index = load_lambda_module('save-profile', STUDENT_PROFILE_TABLE_NAME='profiles')
+
+
+class FakeProfileClient:
+    """update_item with the SET ... = :value and if_not_exists forms build_profile_update produces"""
+
+    def __init__(self, items):
+        self.items = items
+        self.lock = threading.Lock()
+
+    def update_item(self, TableName, Key, UpdateExpression, ExpressionAttributeNames, ExpressionAttributeValues):
+        assert UpdateExpression.startswith('SET ')
+        with self.lock:
+            item = self.items.setdefault(Key['actionID'], dict(Key))
+            for name, keep, value in re.findall(r'(#\w+) = (if_not_exists\(#\w+, )?(:\w+)', UpdateExpression):
+                attribute = ExpressionAttributeNames[name]
+                if keep:
+                    item.setdefault(attribute, ExpressionAttributeValues[value])
+                else:
+                    item[attribute] = ExpressionAttributeValues[value]
+
+
+class FakeProfileTable:
+    name = 'profiles'
+
+    def __init__(self, items):
+        self.meta = type('Meta', (), {'client': FakeProfileClient(items)})()
+
+
+def _import(table, rows):
+    body = '\n'.join(json.dumps(row) for row in rows)
+    response = index.bulk_import({'body': body}, table)
+    assert response['statusCode'] == 200
+    return json.loads(response['body'])
+
+
+def test_import_merges_into_existing_profile():
+    items = {'a_x_edu': {
+        'actionID': 'a_x_edu', 'email': 'a@x.edu', 'fullName': 'Ada', 'headline': 'Analyst',
+        'optInStatus': True, 'communicationMethod': 'sms',
+        'lastBatchSessionId': 'batch-1', 'batchCostEstimateSeconds': 42,
+    }}
+    result = _import(FakeProfileTable(items), [{'email': 'a@x.edu', 'preferredJobRole': 'Data Engineer'}])
+
+    assert result['saved'] == 1
+    profile = items['a_x_edu']
+    assert profile['preferredJobRole'] == 'Data Engineer'
+    # Fields absent from the row and attributes owned by other components survive
+    assert (profile['fullName'], profile['headline'], profile['optInStatus']) == ('Ada', 'Analyst', True)
+    assert profile['communicationMethod'] == 'sms'
+    assert (profile['lastBatchSessionId'], profile['batchCostEstimateSeconds']) == ('batch-1', 42)
+
+
+def test_new_profiles_get_defaults():
+    items = {}
+    _import(FakeProfileTable(items), [{'email': 'b@x.edu', 'fullName': 'Bo'}])
+    assert items['b_x_edu']['fullName'] == 'Bo'
+    assert items['b_x_edu']['optInStatus'] is False
+    assert items['b_x_edu']['location'] == ''
+
+
+def test_rows_with_wrong_field_types_are_reported_per_row():
+    items = {}
+    result = _import(FakeProfileTable(items), [
+        {'email': 'a@x.edu', 'optInStatus': 'yes'},
+        {'email': 'b@x.edu', 'fullName': 'Bo'},
+        {'email': 'c@x.edu', 'phone': 5551234, 'education': ['BSc']},
+        {'email': 'b@x.edu', 'fullName': 'Bo B'},
+    ])
+
+    assert (result['saved'], result['invalid'], result['duplicate']) == (1, 2, 1)
+    statuses = [(r['row'], r['status'], r.get('error')) for r in result['results']]
+    assert statuses[0] == (0, 'invalid', 'optInStatus must be a boolean')
+    assert statuses[1] == (1, 'duplicate', 'replaced by row 3')
+    assert statuses[2] == (2, 'invalid', 'education must be a string; phone must be a string')
+    assert statuses[3] == (3, 'saved', None)
+    assert list(items) == ['b_x_edu'] and items['b_x_edu']['fullName'] == 'Bo B'
@@ -0,0 +1,86 @@
+import json
+
+from conftest import load_lambda_module
+
+sse = load_lambda_module('sqs-processor', 'sse')
+
+# BOM, a comment, CRLF, CR and LF line endings, multi-line data and multi-byte characters
+STREAM = (b'\xef\xbb\xbf'
+          b': keep-alive\r\n'
+          b'event: progress\r\n'
+          b'id: 1\r\n'
+          + 'data: {"thinking": "café ☕ 学生"}\r\n'.encode('utf-8') +
+          b'\r\n'
+          b'data: line one\r'
+          b'data: line two\r'
+          b'\r'
+          b'retry: 3000\n'
+          b'data:{"job_agent_result": "[]"}\n'
+          b'\n')
+EXPECTED = [
+    sse.SSEEvent(data='{"thinking": "café ☕ 学生"}', event='progress', id='1'),
+    sse.SSEEvent(data='line one\nline two', id='1'),
+    sse.SSEEvent(data='{"job_agent_result": "[]"}', id='1', retry=3000),
+]
+
+
+def _decode(chunks):
+    decoder = sse.SSEDecoder()
+    events = []
+    for chunk in chunks:
+        events.extend(decoder.feed(chunk))
+    return events + decoder.flush()
+
+
+def test_whole_stream():
+    assert _decode([STREAM]) == EXPECTED
+
+
+def test_stream_split_into_two_chunks_at_every_byte():
+    for split in range(len(STREAM) + 1):
+        assert _decode([STREAM[:split], STREAM[split:]]) == EXPECTED, split
+
+
+def test_stream_fed_one_byte_at_a_time():
+    assert _decode([STREAM[i:i + 1] for i in range(len(STREAM))]) == EXPECTED
+
+
+def test_character_split_mid_codepoint():
+    decoder = sse.SSEDecoder()
+    encoded = 'data: 学生\n\n'.encode('utf-8')
+    assert decoder.feed(encoded[:8]) == []  # ends inside the first character
+    assert decoder.feed(encoded[8:]) == [sse.SSEEvent(data='学生')]
+
+
+def test_crlf_split_across_chunks_is_one_line_ending():
+    decoder = sse.SSEDecoder()
+    assert decoder.feed(b'data: a\r') == []
+    # The \n completes the \r before it; only the following \r\n is the blank line
+    assert decoder.feed(b'\n\r\n') == [sse.SSEEvent(data='a')]
+    assert decoder.feed(b'data: b\r\r') == [sse.SSEEvent(data='b')]
+
+
+def test_unterminated_event_is_dropped_at_end_of_stream():
+    assert _decode([b'data: complete\n\ndata: partial']) == [sse.SSEEvent(data='complete')]
+
+
+def test_agent_events_round_trip():
+    # handle_agent_request's events, as AgentCore streams them
+    events = [{'thinking': 'token – é'}, {'job_agent_result': json.dumps([{'title': 'Engineer', 'fit': '学生'}])},
+              {'final_result': 'done'}]
+    stream = b''.join(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode('utf-8') for event in events)
+    chunks = [stream[i:i + 7] for i in range(0, len(stream), 7)]
+    assert [event.json() for event in sse.iter_events(chunks)] == events
+
+
+def test_iter_events_stops_reading_after_the_wanted_event():
+    read = []
+
+    def chunks():
+        for chunk in (b'event: progress\ndata: 1\n\n', b'event: result\ndata: 2\n\n', b'data: 3\n\n'):
+            read.append(chunk)
+            yield chunk
+
+    events = list(sse.iter_events(chunks(), until='result'))
+    assert [event.data for event in events] == ['1', '2']
+    assert len(read) == 2
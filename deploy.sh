@@ -203,6 +203,11 @@ ENVIRONMENT='{
       "name":  "ACTION",
       "value": "'"$ACTION"'",
       "type":  "PLAINTEXT"
+    },
+    {
+      "name":  "JOB_RECOMMENDATIONS_INDEX_STAGE",
+      "value": "'"${JOB_RECOMMENDATIONS_INDEX_STAGE:-}"'",
+      "type":  "PLAINTEXT"
     }
   ]
 }'
@@ -382,7 +382,7 @@ const JobGrid: React.FC<JobGridProps> = ({ jobs }) => {
       try {
         const userEmail = getUserEmail();
         if (userEmail) {
-          const profile = await getProfile(userEmail);
+          const profile = await getProfile(userEmail, ['preferredJobRole']);
           if (profile && profile.preferredJobRole && profile.preferredJobRole !== 'N/A' && profile.preferredJobRole.trim() !== '') {
             const autoEnabledNotifications: { [jobId: string]: boolean } = {};
             const autoEnabledJobIds = new Set<string>();
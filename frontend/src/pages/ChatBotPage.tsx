@@ -228,7 +228,7 @@ const ChatBotPage: React.FC = () => {
                 if (!foundUserName) {
                     const email = localStorage.getItem('userEmail') || location.state?.email;
                     if (email) {
-                        const profile = await getProfile(email);
+                        const profile = await getProfile(email, ['fullName']);
                         if (profile && profile.fullName && profile.fullName !== 'N/A' && profile.fullName.trim() !== '') {
                             foundUserName = profile.fullName;
                         }
@@ -294,7 +294,7 @@ const ChatBotPage: React.FC = () => {
                     // Load user profile to get full name
                     if (recommendations.email) {
                         try {
-                            const profile = await getProfile(recommendations.email);
+                            const profile = await getProfile(recommendations.email, ['fullName']);
                             if (profile && profile.fullName && profile.fullName !== 'N/A' && profile.fullName.trim() !== '') {
                                 setUserName(profile.fullName);
                                 // Cache it for future use
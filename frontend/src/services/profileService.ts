@@ -212,17 +212,61 @@ function fromBackendFormat(backendData: any): ProfileData {
   return uiData;
 }
 
-// Retrieve profile by email
-export const getProfile = async (email: string): Promise<ProfileData | null> => {
+// Profiles already fetched in this tab, revalidated with If-None-Match on the next load
+const PROFILE_CACHE_PREFIX = 'profileCache:';
+
+interface CachedProfile {
+  etag: string;
+  profile: any;
+}
+
+function readCachedProfile(url: string): CachedProfile | null {
+  try {
+    const raw = sessionStorage.getItem(PROFILE_CACHE_PREFIX + url);
+    return raw ? JSON.parse(raw) : null;
+  } catch {
+    return null;
+  }
+}
+
+function writeCachedProfile(url: string, etag: string | null, profile: any) {
+  try {
+    if (etag) {
+      sessionStorage.setItem(PROFILE_CACHE_PREFIX + url, JSON.stringify({ etag, profile }));
+    } else {
+      sessionStorage.removeItem(PROFILE_CACHE_PREFIX + url);
+    }
+  } catch {
+    // Storage full or unavailable: the next load simply fetches the whole profile
+  }
+}
+
+// Retrieve profile by email; fields limits the response to those profile fields
+export const getProfile = async (email: string, fields?: (keyof ProfileData)[]): Promise<ProfileData | null> => {
   try {
-    const url = `${SAVE_PROFILE_URL}?email=${encodeURIComponent(email)}`;
+    let url = `${SAVE_PROFILE_URL}?email=${encodeURIComponent(email)}`;
+    if (fields && fields.length > 0) {
+      url += `&fields=${encodeURIComponent(fields.join(','))}`;
+    }
+
+    // The ETag changes whenever the profile is saved, so a 304 means the cached copy is current
+    const cached = readCachedProfile(url);
+    const headers: Record<string, string> = { 'Content-Type': 'application/json' };
+    if (cached) {
+      headers['If-None-Match'] = cached.etag;
+    }
 
     const response = await fetch(url, {
       method: 'GET',
       mode: 'cors',
-      headers: { 'Content-Type': 'application/json' },
+      cache: 'no-store',
+      headers,
     });
 
+    if (response.status === 304 && cached) {
+      return fromBackendFormat(cached.profile);
+    }
+
     const raw = await response.text();
     let data: any = {};
     try {
@@ -239,6 +283,7 @@ export const getProfile = async (email: string): Promise<ProfileData | null> =>
     }
 
     if (data.profile) {
+      writeCachedProfile(url, response.headers.get('ETag'), data.profile);
       return fromBackendFormat(data.profile);
     } else {
       return null; // Profile not found